@@ -0,0 +1,166 @@
+# Semantic answer cache: serves a stored answer when a new prompt is the same question
+# as one answered recently, instead of paying for another Gemini tool loop.
+#
+# Prompts are matched first on their normalised text (no network call), then on the cosine
+# similarity of their Gemini embeddings against an in-memory matrix of cached prompts.
+# How long an answer stays valid depends on the tools that produced it.
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import google.generativeai as genai
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.95"))
+ANSWER_CACHE_EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Seconds an answer stays valid, by the tools used to produce it; an answer built from
+# several tools expires with the most volatile one.
+TOOL_ANSWER_TTLS = {
+    "get_taxi_availability": 30,
+    "count_taxis_within_radius": 30,
+    "get_nearest_taxis": 30,
+    "get_taxi_density_grid": 30,
+    "get_carpark_availability": 60,
+    "get_traffic_images": 60,
+    "get_feed_history": 60,
+    "get_current_weather": 300,
+    "perform_web_search": 6 * 3600,
+    "get_deepsearcher": 24 * 3600,
+}
+UNKNOWN_TOOL_TTL = 60
+NO_TOOL_TTL = 24 * 3600
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", text.strip().lower()))
+
+
+def answer_ttl(tools_used) -> float:
+    if not tools_used:
+        return NO_TOOL_TTL
+    return min(TOOL_ANSWER_TTLS.get(tool_name, UNKNOWN_TOOL_TTL) for tool_name in tools_used)
+
+
+def embed_prompt(text: str) -> np.ndarray:
+    result = genai.embed_content(model=ANSWER_CACHE_EMBEDDING_MODEL, content=text, task_type="SEMANTIC_SIMILARITY")
+    return np.asarray(result["embedding"], dtype=np.float32)
+
+
+class AnswerCache:
+    """
+    Fixed-capacity cache of (prompt, answer) pairs.
+
+    - Prompt embeddings are unit-normalised rows of one preallocated matrix, so a semantic
+      lookup is a single matrix-vector product over every live entry.
+    - Each slot carries an expiry time; expired slots never match and are reused first, and
+      when the cache is full the entry closest to expiry is replaced.
+    """
+
+    def __init__(self, embed=embed_prompt, max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 min_similarity: float = ANSWER_CACHE_MIN_SIMILARITY):
+        self.embed = embed
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._vectors = None  # (max_entries, dim), allocated once the dimension is known
+        self._expires = np.zeros(max_entries, dtype=np.float64)  # 0 = empty slot
+        self._entries = [None] * max_entries
+        self._exact = {}  # normalised prompt -> slot
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def lookup(self, prompt: str):
+        """
+        Returns (answer, embedding). `answer` is None on a miss; `embedding` (possibly None)
+        should be handed back to `store()` so the prompt is not embedded twice.
+        """
+        key = normalize_prompt(prompt)
+        now = time.time()
+        with self._lock:
+            slot = self._exact.get(key)
+            if slot is not None and self._expires[slot] > now:
+                self.exact_hits += 1
+                return self._entries[slot]["answer"], None
+
+        try:
+            vector = self._unit(self.embed(prompt))
+        except Exception as e:
+            print(f"ANSWER CACHE: Could not embed prompt, exact matching only: {e}")
+            with self._lock:
+                self.misses += 1
+            return None, None
+
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] == len(vector):
+                similarities = self._vectors @ vector
+                similarities[self._expires <= now] = -1.0
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.min_similarity:
+                    self.semantic_hits += 1
+                    return self._entries[best]["answer"], vector
+            self.misses += 1
+        return None, vector
+
+    def store(self, prompt: str, answer: str, tools_used=(), embedding=None):
+        if not answer:
+            return
+        key = normalize_prompt(prompt)
+        if embedding is None:
+            try:
+                embedding = self._unit(self.embed(prompt))
+            except Exception as e:
+                print(f"ANSWER CACHE: Could not embed prompt, not caching: {e}")
+                return
+
+        ttl = answer_ttl(tools_used)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(embedding):
+                self._vectors = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+                self._expires[:] = 0
+                self._entries = [None] * self.max_entries
+                self._exact.clear()
+
+            slot = self._exact.get(key)
+            if slot is None:
+                slot = int(np.argmin(self._expires))  # empty, expired, or soonest to expire
+                old = self._entries[slot]
+                if old is not None and self._exact.get(old["key"]) == slot:
+                    del self._exact[old["key"]]
+
+            self._vectors[slot] = embedding
+            self._expires[slot] = time.time() + ttl
+            self._entries[slot] = {"key": key, "answer": answer, "tools": sorted(set(tools_used))}
+            self._exact[key] = slot
+            self.stores += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "enabled": ANSWER_CACHE_ENABLED,
+                "entries": int(np.count_nonzero(self._expires > time.time())),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+            }
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,79 @@
+# Compares cold start of gemini.py with eager and lazy tool imports (tools/registry.py).
+#
+#   python benchmarks/bench_cold_start.py --runs 5
+#   python benchmarks/bench_cold_start.py --first-tool get_deepsearcher
+#
+# Every run is a fresh interpreter that imports gemini.py and reports the import time, RSS and
+# number of loaded modules; with --first-tool it then also times the first import of that tool.
+# No network calls are made (GEMINI_API_KEY is a placeholder; nothing calls Gemini).
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, os, sys, time
+start = time.perf_counter()
+import gemini
+import_s = time.perf_counter() - start
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+result = {"import_s": import_s, "rss_mb": rss_mb(), "modules": len(sys.modules)}
+first_tool = os.environ.get("BENCH_FIRST_TOOL")
+if first_tool:
+    start = time.perf_counter()
+    try:
+        gemini.tool_registry.get(first_tool)
+        result["first_tool_s"] = time.perf_counter() - start
+    except Exception as e:
+        result["first_tool_error"] = str(e)
+    result["rss_after_tool_mb"] = rss_mb()
+print("BENCH_RESULT " + json.dumps(result))
+"""
+
+
+def run_once(eager: bool, first_tool: str = None) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "cold-start-benchmark")
+    env["TOOL_REGISTRY_EAGER"] = "1" if eager else "0"
+    env.pop("TOOL_REGISTRY_WARMUP", None)
+    env.pop("DEEPSEARCHER_WARMUP", None)
+    if first_tool:
+        env["BENCH_FIRST_TOOL"] = first_tool
+    completed = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+                               capture_output=True, text=True, timeout=600)
+    for line in completed.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    raise RuntimeError(f"probe failed ({completed.returncode}):\n{completed.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time and RSS of gemini.py, eager vs lazy tool imports.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-tool", help="also time the first call's import of this tool in lazy mode")
+    args = parser.parse_args()
+
+    for mode, eager in (("eager", True), ("lazy", False)):
+        results = [run_once(eager, args.first_tool if not eager else None) for _ in range(args.runs)]
+        line = (f"{mode:<6} import median {statistics.median(r['import_s'] for r in results) * 1000:>8.0f} ms  "
+                f"min {min(r['import_s'] for r in results) * 1000:>8.0f} ms  "
+                f"RSS {statistics.median(r['rss_mb'] for r in results):>6.0f} MiB  "
+                f"modules {statistics.median(r['modules'] for r in results):>6.0f}")
+        if "first_tool_s" in results[0]:
+            line += (f"  first {args.first_tool} {statistics.median(r['first_tool_s'] for r in results) * 1000:.0f} ms"
+                     f" (RSS {statistics.median(r['rss_after_tool_mb'] for r in results):.0f} MiB)")
+        elif "first_tool_error" in results[0]:
+            line += f"  first {args.first_tool} failed: {results[0]['first_tool_error']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
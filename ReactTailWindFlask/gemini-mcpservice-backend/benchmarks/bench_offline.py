@@ -0,0 +1,236 @@
+# Offline end-to-end benchmark of the Flask app (gemini.py) against local stand-ins.
+#
+# data.gov.sg is replayed from recorded (or generated) payloads, Gemini is a scripted model that
+# emits chosen function-call sequences, Supabase is in memory and deepsearcher queries a stub
+# vector store (see offline_fakes.py and tests/fakes.py), so the numbers measure only this
+# backend's own work.
+#
+#   python benchmarks/bench_offline.py --scenario mixed --requests 1000 --concurrency 1,8,32
+#   python benchmarks/bench_offline.py --scenario chat --model-latency-ms 300 --upstream-latency-ms 40
+#   python benchmarks/bench_offline.py --record benchmarks/fixtures    # save live payloads once (needs network)
+#   python benchmarks/bench_offline.py --fixtures benchmarks/fixtures  # replay them
+import argparse
+import itertools
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_serving_modes import percentile
+from offline_fakes import ReplayAdapter, StubVectorStore, load_fixtures, record_fixtures
+from tests.fakes import InMemorySupabase, ScriptedModel, fake_embed
+
+CENTRAL = {"latitude": 1.2903, "longitude": 103.8520}
+
+# Prompt prefix -> Gemini turns: lists of (tool, args) calls, then the final text
+SCRIPTS = {
+    "How many taxis": [
+        [("count_taxis_within_radius", {**CENTRAL, "radius_m": 1000})],
+        "There are plenty of taxis within 1 km of the city centre right now.",
+    ],
+    "Which carparks": [
+        [("get_carpark_availability", {"lot_type": "C", "top_n": 5})],
+        "These five carparks have the most car lots available at the moment.",
+    ],
+    "Show traffic": [
+        [("get_traffic_images", {**CENTRAL, "limit": 3})],
+        "Here are the three cameras closest to the city centre.",
+    ],
+    "Weather and taxis": [
+        [("get_current_weather", {"location": "Tampines"}), ("get_nearest_taxis", {**CENTRAL, "n": 5})],
+        "It is cloudy in Tampines, and the five nearest taxis are listed above.",
+    ],
+    "Summarise the report": [
+        [("get_deepsearcher", {"search_info": "sustainability energy emissions"})],
+        "The report covers emissions, energy use, water and community programmes.",
+    ],
+    "Hello": ["Hello! Ask me about taxis, carparks, traffic or the weather in Singapore."],
+}
+CHAT_PROMPTS = [prefix + suffix for prefix, suffix in (
+    ("How many taxis", " are near the city centre?"),
+    ("Which carparks", " have space right now?"),
+    ("Show traffic", " cameras near the city centre"),
+    ("Weather and taxis", " in Tampines"),
+    ("Summarise the report", " on sustainability"),
+    ("Hello", " there"),
+)]
+
+# Scenario -> list of (weight, label); labels are resolved to requests by `make_request`
+SCENARIOS = {
+    "chat": [(1, "chat")],
+    "maps": [(1, "dengue"), (1, "rainfall")],
+    "history": [(1, "history")],
+    "mixed": [(6, "chat"), (1, "dengue"), (1, "rainfall"), (2, "history")],
+}
+
+
+def rss_mb() -> float:
+    """Current resident set size in MiB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        scale = 1 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def boot_app(args):
+    """Imports the app with every external service replaced by a local stand-in."""
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ["ANSWER_CACHE_ENABLED"] = "1" if args.answer_cache else "0"
+
+    from tools import http_client
+    adapter = ReplayAdapter(load_fixtures(args.fixtures, args.seed), latency=args.upstream_latency_ms / 1000)
+    session = http_client.get_session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    import chat_store
+    supabase = InMemorySupabase()
+    chat_store._supabase = supabase
+    backend = chat_store.SupabaseChatBackend()
+    for start in range(0, args.history_rows, 500):
+        backend.insert_pairs([(f"Seeded prompt {i}", f"Seeded answer {i}")
+                              for i in range(start, min(start + 500, args.history_rows))])
+
+    import gemini
+    gemini.model = ScriptedModel(SCRIPTS, latency=args.model_latency_ms / 1000)
+
+    from answer_cache import answer_cache
+    answer_cache.embed = fake_embed
+
+    from tools.registry import tool_registry
+    vector_store = StubVectorStore(latency=args.upstream_latency_ms / 1000)
+    tool_registry.override("get_deepsearcher", vector_store.get_deepsearcher)
+
+    return gemini.app, adapter, supabase
+
+
+def make_request(label: str, n: int, unique_prompts: bool):
+    """Returns (method, path, json_body) for the n-th request of a label."""
+    if label == "chat":
+        prompt = CHAT_PROMPTS[n % len(CHAT_PROMPTS)]
+        return "POST", "/gemini-response", {"text": f"{prompt} (#{n})" if unique_prompts else prompt}
+    if label == "dengue":
+        return "GET", "/denguecluster", None
+    if label == "rainfall":
+        return "GET", "/rainfallstations", None
+    if label == "history":
+        return "GET", "/chat-history?limit=50", None
+    raise ValueError(label)
+
+
+def run_level(app, scenario: str, total_requests: int, concurrency: int, unique_prompts: bool) -> dict:
+    """Sends `total_requests` requests of a scenario from `concurrency` threads; returns latencies per label."""
+    weighted = [label for weight, label in SCENARIOS[scenario] for _ in range(weight)]
+    schedule = itertools.islice(itertools.cycle(weighted), total_requests)
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = {}
+    errors = {}
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                label = next(schedule, None)
+                n = next(counter)
+            if label is None:
+                return
+            method, path, body = make_request(label, n, unique_prompts)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if response.status_code >= 400:
+                    errors[label] = errors.get(label, 0) + 1
+                else:
+                    latencies.setdefault(label, []).append(elapsed)
+
+    threads = [threading.Thread(target=worker, name=f"bench-{i}") for i in range(concurrency)]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"wall_s": time.perf_counter() - wall_start, "latencies": latencies, "errors": errors}
+
+
+def summarize(latencies: list, errors: int, wall_s: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall_s if wall_s else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_row(name: str, result: dict):
+    print(
+        f"  {name:<10} {result['requests']:>6} req {result['errors']:>4} err "
+        f"{result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+        f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the Flask app against local stand-ins.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--requests", type=int, default=600, help="requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--warmup", type=int, default=30, help="untimed requests before the first level")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="simulated Gemini latency per turn")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="simulated data.gov.sg round trip")
+    parser.add_argument("--history-rows", type=int, default=5000, help="chat history rows seeded into Supabase")
+    parser.add_argument("--answer-cache", action="store_true", help="enable the semantic answer cache")
+    parser.add_argument("--unique-prompts", action="store_true", help="make every chat prompt distinct")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python heap peak (slower)")
+    parser.add_argument("--fixtures", help="directory of recorded payloads (<name>.json); generated otherwise")
+    parser.add_argument("--record", metavar="DIR", help="record live data.gov.sg payloads into DIR and exit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return
+
+    rss_start = rss_mb()
+    app, adapter, supabase = boot_app(args)
+    print(f"booted in-process app: RSS {rss_start:.0f} -> {rss_mb():.0f} MiB, {supabase.count('user_prompts')} history rows")
+
+    run_level(app, args.scenario, args.warmup, min(4, max(1, args.warmup)), args.unique_prompts)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        rss_before = rss_mb()
+        if args.tracemalloc:
+            tracemalloc.reset_peak()
+        result = run_level(app, args.scenario, args.requests, concurrency, args.unique_prompts)
+        memory = f"RSS {rss_before:.0f} -> {rss_mb():.0f} MiB"
+        if args.tracemalloc:
+            memory += f", heap peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:.1f} MiB"
+        print(f"\n{args.scenario} @ concurrency {concurrency} ({result['wall_s']:.2f}s, {memory})")
+
+        all_latencies = [value for values in result["latencies"].values() for value in values]
+        print_row("all", summarize(all_latencies, sum(result["errors"].values()), result["wall_s"]))
+        for label in sorted(set(result["latencies"]) | set(result["errors"])):
+            print_row(label, summarize(result["latencies"].get(label, []), result["errors"].get(label, 0), result["wall_s"]))
+
+    print("\nupstream requests served by the replay adapter:")
+    for url, count in sorted(adapter.requests.items()):
+        print(f"  {count:>6}  {url}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Load test comparing the Flask (gemini.py) and ASGI (gemini_asgi.py) serving modes.
+#
+# Start both servers first, e.g.
+#   python gemini.py                                  # Flask on :5000
+#   uvicorn gemini_asgi:app --port 8000               # ASGI on :8000
+# then run
+#   python benchmarks/bench_serving_modes.py --requests 200 --concurrency 50
+#
+# ASGI tools still run on a thread pool (ASGI_TOOL_MAX_WORKERS), so for a server that exposes
+# tool_queue_seconds the report also shows how long tool calls waited for a free thread.
+# Compare runs with --concurrency above and below the pool size to see where it saturates.
+import argparse
+import asyncio
+import re
+import statistics
+import time
+
+import httpx
+
+DEFAULT_PROMPT = "How many taxis are available in Singapore right now?"
+TOOL_QUEUE_METRIC = "tool_queue_seconds"
+# Tool calls that waited longer than this for a thread count as queued
+QUEUED_BUCKET = "0.01"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def scrape_tool_queue(client: httpx.AsyncClient) -> dict:
+    """Totals of the server's tool_queue_seconds histogram, or None if it does not expose one."""
+    try:
+        response = await client.get("/metrics")
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    totals = {"sum": 0.0, "count": 0.0, "fast": 0.0}
+    found = False
+    for line in response.text.splitlines():
+        match = re.match(rf'{TOOL_QUEUE_METRIC}_(sum|count|bucket)\{{([^}}]*)\}} (\S+)$', line)
+        if not match:
+            continue
+        kind, labels, value = match.groups()
+        found = True
+        if kind == "bucket":
+            if f'le="{QUEUED_BUCKET}"' in labels:
+                totals["fast"] += float(value)
+        else:
+            totals[kind] += float(value)
+    return totals if found else None
+
+
+async def run_load(base_url: str, prompt: str, total_requests: int, concurrency: int, timeout: float) -> dict:
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def one_request():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/gemini-response", json={"text": prompt})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        queue_before = await scrape_tool_queue(client)
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+        wall_time = time.perf_counter() - wall_start
+        queue_after = await scrape_tool_queue(client)
+
+    latencies.sort()
+    tool_queue = None
+    if queue_before is not None and queue_after is not None:
+        calls = queue_after["count"] - queue_before["count"]
+        tool_queue = {
+            "tool_calls": int(calls),
+            "mean_wait_ms": (queue_after["sum"] - queue_before["sum"]) / calls * 1000 if calls else 0.0,
+            "queued_pct": 100 * (1 - (queue_after["fast"] - queue_before["fast"]) / calls) if calls else 0.0,
+        }
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "wall_s": wall_time,
+        "throughput_rps": len(latencies) / wall_time if wall_time else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "tool_queue": tool_queue,
+    }
+
+
+def print_report(name: str, result: dict):
+    print(
+        f"{name:<6} {result['requests']:>5} req  {result['errors']:>4} err  "
+        f"{result['throughput_rps']:>8.2f} req/s  "
+        f"p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms"
+    )
+    queue = result["tool_queue"]
+    if queue is not None:
+        print(
+            f"{'':<6} {queue['tool_calls']:>5} tool calls  mean wait for a pool thread {queue['mean_wait_ms']:>7.1f} ms  "
+            f"{queue['queued_pct']:>5.1f}% waited > {float(QUEUED_BUCKET) * 1000:.0f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Flask and ASGI /gemini-response under load.")
+    parser.add_argument("--flask-url", default="http://localhost:5000")
+    parser.add_argument("--asgi-url", default="http://localhost:8000")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    for name, url in (("flask", args.flask_url), ("asgi", args.asgi_url)):
+        result = asyncio.run(run_load(url, args.prompt, args.requests, args.concurrency, args.timeout))
+        print_report(name, result)
+
+
+if __name__ == "__main__":
+    main()
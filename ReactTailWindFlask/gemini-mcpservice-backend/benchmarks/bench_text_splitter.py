@@ -0,0 +1,71 @@
+# Compares tools/text_splitter.py with deepsearcher's split_docs_to_chunks on one large document.
+#
+#   python benchmarks/bench_text_splitter.py --size-mb 4
+#
+# The generated text has no repeated passages, so both splitters must produce identical chunks
+# and windows; the script checks that before reporting timings.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepsearcher.loader.splitter import split_docs_to_chunks as upstream_split
+from langchain_core.documents import Document
+
+from tools.text_splitter import split_docs_to_chunks as offset_split
+
+
+def make_document(size_mb: float, seed: int) -> Document:
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(5000)]
+    target = int(size_mb * 1024 * 1024)
+    parts, length = [], 0
+    while length < target:
+        sentence = " ".join(rng.choices(words, k=rng.randint(6, 20))).capitalize() + "."
+        if rng.random() < 0.1:
+            sentence += "\n\n"
+        elif rng.random() < 0.2:
+            sentence += "\n"
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return Document(page_content=" ".join(parts), metadata={"reference": "bench.txt"})
+
+
+def timed(split, document: Document, chunk_size: int, chunk_overlap: int):
+    # Both splitters read the reference from the metadata; upstream pops it from per-chunk copies
+    doc = Document(page_content=document.page_content, metadata=dict(document.metadata))
+    start = time.perf_counter()
+    chunks = split([doc], chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return chunks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the offset-tracking text splitter.")
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    document = make_document(args.size_mb, args.seed)
+    print(f"Document: {len(document.page_content) / 1024 / 1024:.2f} MB")
+
+    new_chunks, new_time = timed(offset_split, document, args.chunk_size, args.chunk_overlap)
+    old_chunks, old_time = timed(upstream_split, document, args.chunk_size, args.chunk_overlap)
+
+    identical = len(new_chunks) == len(old_chunks) and all(
+        a.text == b.text and a.reference == b.reference and a.metadata == b.metadata
+        for a, b in zip(new_chunks, old_chunks)
+    )
+    print(f"Chunks: {len(new_chunks)}  identical to upstream: {identical}")
+    print(f"  upstream split_docs_to_chunks: {old_time:8.3f}s")
+    print(f"  tools.text_splitter:           {new_time:8.3f}s  ({old_time / max(new_time, 1e-9):.1f}x)")
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# Benchmark-only stand-ins for the backend's external services, used by benchmarks/bench_offline.py.
+#
+# - ReplayAdapter: a requests transport adapter that answers data.gov.sg (and camera image)
+#   requests from recorded payloads, or from realistic generated ones when none are recorded.
+# - StubVectorStore: a tiny keyword-scored document store standing in for Milvus/deepsearcher.
+#
+# The payload generators, InMemorySupabase, ScriptedModel and fake_embed are shared with the
+# unit tests and live in tests/fakes.py. Nothing here opens a network connection.
+import io
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+from tests.fakes import (CAMERA_IMAGE_HOST, fake_embed, make_carpark_payload, make_forecast_payload, make_station_payload,
+                         make_taxi_payload, make_traffic_payload, random_point)
+
+TAXI_URL = "https://api.data.gov.sg/v1/transport/taxi-availability"
+CARPARK_URL = "https://api.data.gov.sg/v1/transport/carpark-availability"
+TRAFFIC_URL = "https://api.data.gov.sg/v1/transport/traffic-images"
+RAINFALL_URL = "https://api.data.gov.sg/v1/environment/rainfall"
+FORECAST_URL = "https://api.data.gov.sg/v1/environment/2-hour-weather-forecast"
+AIR_TEMPERATURE_URL = "https://api.data.gov.sg/v1/environment/air-temperature"
+DENGUE_POLL_PREFIX = "https://api-open.data.gov.sg/v1/public/api/datasets/"
+DENGUE_GEOJSON_URL = "https://offline.invalid/dengue-clusters.geojson"
+
+# Endpoints that `record_fixtures` saves and `ReplayAdapter` serves, by fixture file name
+RECORDABLE = {
+    "taxi-availability": TAXI_URL,
+    "carpark-availability": CARPARK_URL,
+    "traffic-images": TRAFFIC_URL,
+    "rainfall": RAINFALL_URL,
+    "2-hour-weather-forecast": FORECAST_URL,
+    "air-temperature": AIR_TEMPERATURE_URL,
+}
+
+
+# --- data.gov.sg payloads ---
+
+def make_dengue_geojson(rng, clusters: int = 60) -> dict:
+    features = []
+    for i in range(clusters):
+        lat, lon = random_point(rng)
+        ring = [[lon + 0.003 * np.cos(a), lat + 0.003 * np.sin(a)] for a in np.linspace(0, 2 * np.pi, 24)]
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [[[round(x, 6), round(y, 6)] for x, y in ring]]},
+            "properties": {"Name": f"kml_{i}", "Description": f"<b>Cluster {i}</b> cases: {rng.randint(2, 80)}"},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def make_camera_jpeg(width: int = 1920, height: int = 1080) -> bytes:
+    """A camera-sized JPEG (noise, so it compresses like a real frame), or opaque bytes without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\xff\xd8\xff\xe0" + os.urandom(200_000) + b"\xff\xd9"
+    pixels = np.random.default_rng(0).integers(0, 255, (height // 4, width // 4, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize((width, height))
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=75)
+    return out.getvalue()
+
+
+def generate_fixtures(seed: int = 0) -> dict:
+    """Realistic payloads for every replayed endpoint, keyed by fixture name."""
+    rng = random.Random(seed)
+    return {
+        "taxi-availability": make_taxi_payload(rng),
+        "carpark-availability": make_carpark_payload(rng),
+        "traffic-images": make_traffic_payload(rng),
+        "rainfall": make_station_payload(rng, 60, "S", "mm", 0.0, 2.0),
+        "2-hour-weather-forecast": make_forecast_payload(rng),
+        "air-temperature": make_station_payload(rng, 14, "T", "deg C", 25.0, 33.0),
+        "dengue-clusters": make_dengue_geojson(rng),
+    }
+
+
+def load_fixtures(directory: str = None, seed: int = 0) -> dict:
+    """Generated payloads, overridden by any `<name>.json` recordings found in `directory`."""
+    fixtures = generate_fixtures(seed)
+    if directory:
+        for name in list(fixtures):
+            path = os.path.join(directory, f"{name}.json")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    fixtures[name] = json.load(f)
+    return fixtures
+
+
+def record_fixtures(directory: str):
+    """Saves one live response of every recordable endpoint into `directory` (needs network)."""
+    os.makedirs(directory, exist_ok=True)
+    for name, url in RECORDABLE.items():
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        with open(os.path.join(directory, f"{name}.json"), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"recorded {name}: {len(response.content)} bytes")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter that serves recorded payloads instead of touching the network.
+
+    Mount it on the shared http_client session for "https://" and "http://"; unknown URLs get a
+    404. `latency` (seconds) is slept per request to model the upstream round trip.
+    """
+
+    def __init__(self, fixtures: dict, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self._bodies = {}
+        for name, url in RECORDABLE.items():
+            self._bodies[url] = (json.dumps(fixtures[name]).encode("utf-8"), "application/json")
+        self._bodies[DENGUE_GEOJSON_URL] = (json.dumps(fixtures["dengue-clusters"]).encode("utf-8"), "application/json")
+        self._dengue_poll = (json.dumps({"code": 0, "data": {"url": DENGUE_GEOJSON_URL}}).encode("utf-8"), "application/json")
+        self._camera_image = (make_camera_jpeg(), "image/jpeg")
+        self._lock = threading.Lock()
+        self.requests = {}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parts = urlsplit(request.url)
+        url = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        if url.startswith(DENGUE_POLL_PREFIX):
+            found = self._dengue_poll
+        elif parts.hostname == CAMERA_IMAGE_HOST:
+            found = self._camera_image
+        else:
+            found = self._bodies.get(url)
+        with self._lock:
+            self.requests[url] = self.requests.get(url, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.status_code = 200 if found else 404
+        response._content = found[0] if found else b'{"message": "no recording"}'
+        response.headers["Content-Type"] = found[1] if found else "application/json"
+        response.encoding = "utf-8"
+        response.reason = "OK" if found else "Not Found"
+        return response
+
+    def close(self):
+        pass
+
+
+# --- deepsearcher ---
+
+class StubRetrievalResult:
+    def __init__(self, text: str, reference: str, score: float):
+        self.text = text
+        self.reference = reference
+        self.score = score
+
+
+class StubVectorStore:
+    """In-memory stand-in for the Milvus collection queried by get_deepsearcher."""
+
+    def __init__(self, documents: dict = None, top_k: int = 5, latency: float = 0.0):
+        documents = documents or {
+            f"https://example.invalid/report-{i}.pdf": f"Sustainability report {i}: emissions, energy, water and community programmes."
+            for i in range(50)
+        }
+        self.references = list(documents)
+        self.texts = list(documents.values())
+        self.vectors = np.stack([fake_embed(text) for text in self.texts])
+        self.vectors /= np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.top_k = top_k
+        self.latency = latency
+
+    def query(self, question: str):
+        """Same return shape as deepsearcher.online_query.query: (answer, retrieved_results, tokens)."""
+        if self.latency:
+            time.sleep(self.latency)
+        vector = fake_embed(question)
+        norm = np.linalg.norm(vector)
+        scores = self.vectors @ (vector / norm if norm else vector)
+        top = np.argsort(-scores)[:self.top_k]
+        results = [StubRetrievalResult(self.texts[i], self.references[i], float(scores[i])) for i in top]
+        answer = " ".join(result.text for result in results[:2])
+        return answer, results, 0
+
+    def get_deepsearcher(self, search_info: str) -> dict:
+        """Drop-in for tools.deepsearcher_tool.get_deepsearcher, answering from this store."""
+        answer, results, tokens = self.query(search_info)
+        return {
+            "answer": answer,
+            "references": [{"reference": result.reference, "chunks": 1} for result in results],
+            "token_usage": tokens,
+        }
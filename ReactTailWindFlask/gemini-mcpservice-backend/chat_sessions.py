@@ -0,0 +1,185 @@
+# Server-side chat sessions, so follow-up prompts keep the context of the conversation.
+#
+# Each session keeps its Gemini history as plain content dicts. After every turn the history
+# is compacted (tool results from finished turns are replaced with small digests) and trimmed
+# to a token budget (the oldest exchanges are folded into a one-line recap), so the input
+# sent to Gemini per turn stays roughly flat however long the conversation runs.
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "1800"))  # seconds idle before eviction
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_TOKEN_BUDGET = int(os.getenv("CHAT_SESSION_TOKEN_BUDGET", "4000"))
+TOOL_DIGEST_MAX_CHARS = 600  # tool results up to this size are kept verbatim
+RECAP_MAX_PROMPTS = 10
+RECAP_PROMPT_CHARS = 200
+
+
+def estimate_tokens(value) -> int:
+    return len(json.dumps(value, default=str)) // 4
+
+
+def _shrink(value, depth: int = 0):
+    """Keeps the shape of a tool result but only its first few list items and short strings."""
+    if isinstance(value, dict):
+        if depth >= 4:
+            return f"<{len(value)} fields>"
+        return {key: _shrink(item, depth + 1) for key, item in value.items()}
+    if isinstance(value, list):
+        if depth >= 4:
+            return f"<{len(value)} items>"
+        shrunk = [_shrink(item, depth + 1) for item in value[:3]]
+        if len(value) > 3:
+            shrunk.append(f"<{len(value) - 3} more items>")
+        return shrunk
+    if isinstance(value, str) and len(value) > 200:
+        return value[:200] + "…"
+    return value
+
+
+def digest_tool_result(content):
+    """Replaces a bulky function_response payload from an earlier turn with a compact digest."""
+    if isinstance(content, dict) and "digest" in content and "original_chars" in content:
+        return content  # already digested on an earlier turn
+    serialized = json.dumps(content, default=str)
+    if len(serialized) <= TOOL_DIGEST_MAX_CHARS:
+        return content
+    digest = json.dumps(_shrink(content), default=str)
+    if len(digest) > TOOL_DIGEST_MAX_CHARS:
+        digest = digest[:TOOL_DIGEST_MAX_CHARS] + "…"
+    return {
+        "digest": digest,
+        "original_chars": len(serialized),
+        "note": "Result from an earlier turn, abbreviated. Call the tool again if current data is needed.",
+    }
+
+
+def content_to_dict(content) -> dict:
+    """Converts a Gemini history Content message into a plain dict accepted by start_chat."""
+    parts = []
+    for part in content.parts:
+        if part.function_call.name:
+            parts.append({"function_call": type(part.function_call).to_dict(part.function_call)})
+        elif part.function_response.name:
+            parts.append({"function_response": type(part.function_response).to_dict(part.function_response)})
+        elif part.text:
+            parts.append({"text": part.text})
+    return {"role": content.role, "parts": parts}
+
+
+def is_user_prompt(content: dict) -> bool:
+    return content["role"] == "user" and any("text" in part for part in content["parts"])
+
+
+def split_exchanges(history: list) -> list:
+    """Groups history into exchanges, each starting at a user text prompt."""
+    exchanges = []
+    for content in history:
+        if is_user_prompt(content) or not exchanges:
+            exchanges.append([])
+        exchanges[-1].append(content)
+    return exchanges
+
+
+class ChatSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.history = []  # list of content dicts
+        self.recap_prompts = []  # prompts of exchanges trimmed from the history
+        self.turns = 0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()  # one request at a time per session (Flask app)
+        self.async_lock = asyncio.Lock()  # the same, for the ASGI app's coroutines
+
+    @property
+    def is_new(self) -> bool:
+        return self.turns == 0
+
+    def gemini_history(self) -> list:
+        """History to pass to model.start_chat, led by a recap of trimmed exchanges if any."""
+        if not self.recap_prompts:
+            return list(self.history)
+        recap = "; ".join(self.recap_prompts)
+        return [
+            {"role": "user", "parts": [{"text": f"(Context) Earlier in this conversation I asked: {recap}"}]},
+            {"role": "model", "parts": [{"text": "Noted."}]},
+        ] + self.history
+
+    def update(self, chat_history, token_budget: int = CHAT_SESSION_TOKEN_BUDGET):
+        """Stores the Gemini history of a finished turn, compacted and trimmed to `token_budget`."""
+        history = [content_to_dict(content) for content in chat_history]
+        if self.recap_prompts:
+            history = history[2:]  # drop the recap pair added by gemini_history()
+        self._store(history, token_budget)
+
+    def record_exchange(self, user_prompt: str, answer: str, token_budget: int = CHAT_SESSION_TOKEN_BUDGET):
+        """Appends a prompt/answer pair that was served without a Gemini chat (e.g. from the answer cache)."""
+        self._store(self.history + [
+            {"role": "user", "parts": [{"text": user_prompt}]},
+            {"role": "model", "parts": [{"text": answer}]},
+        ], token_budget)
+
+    def _store(self, history: list, token_budget: int):
+        for content in history:
+            for part in content["parts"]:
+                if "function_response" in part:
+                    response = part["function_response"].get("response", {})
+                    if "content" in response:
+                        response["content"] = digest_tool_result(response["content"])
+
+        exchanges = split_exchanges(history)
+        total = sum(estimate_tokens(exchange) for exchange in exchanges)
+        while len(exchanges) > 1 and total > token_budget:
+            dropped = exchanges.pop(0)
+            total -= estimate_tokens(dropped)
+            prompt = next((part["text"] for part in dropped[0]["parts"] if "text" in part), "")
+            self.recap_prompts.append(prompt[:RECAP_PROMPT_CHARS])
+        self.recap_prompts = self.recap_prompts[-RECAP_MAX_PROMPTS:]
+
+        self.history = [content for exchange in exchanges for content in exchange]
+        self.turns += 1
+
+
+class ChatSessionStore:
+    """In-memory sessions, evicted when idle for longer than `ttl` or by LRU beyond `max_sessions`."""
+
+    def __init__(self, ttl: float = CHAT_SESSION_TTL, max_sessions: int = CHAT_SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: str = None) -> ChatSession:
+        """Returns the live session for `session_id`, or a new session if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(uuid.uuid4().hex)
+                self._sessions[session.id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session.id)
+            session.last_used = now
+            return session
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions)}
+
+    def _evict(self, now: float):
+        # Least recently used first, so expired sessions are at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+
+chat_sessions = ChatSessionStore()
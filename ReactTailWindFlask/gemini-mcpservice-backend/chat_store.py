@@ -0,0 +1,271 @@
+# Chat persistence: one process-wide Supabase client plus a write-behind queue that
+# batches prompt/response pairs into bulk inserts off the request path.
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from supabase import create_client, Client
+
+from tools.metrics import CHAT_STORE_WRITE_SECONDS, CHAT_STORE_ROWS
+
+CHAT_WRITE_QUEUE_SIZE = int(os.getenv("CHAT_WRITE_QUEUE_SIZE", "1000"))
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "50"))
+CHAT_WRITE_FLUSH_INTERVAL = float(os.getenv("CHAT_WRITE_FLUSH_INTERVAL", "1.0"))  # seconds
+
+_supabase = None
+_supabase_lock = threading.Lock()
+
+
+def get_supabase() -> Client:
+    """Returns the process-wide Supabase client, creating it on first use."""
+    global _supabase
+    if _supabase is None:
+        with _supabase_lock:
+            if _supabase is None:
+                url: str = os.environ.get("SUPABASE_URL")
+                key: str = os.environ.get("SUPABASE_KEY")
+                _supabase = create_client(url, key)
+    return _supabase
+
+
+class SupabaseChatBackend:
+    """Writes batches of (prompt_text, response_text) pairs with two bulk inserts."""
+
+    def insert_pairs(self, pairs):
+        supabase = get_supabase()
+
+        # ✅ Store user prompts in Supabase (PostgREST returns rows in insert order)
+        prompt_insert = supabase.table("user_prompts").insert([
+            {"prompt_text": prompt_text} for prompt_text, _ in pairs
+        ]).execute()
+
+        # ✅ Store Gemini responses against the inserted prompt IDs
+        supabase.table("chatbot_responses").insert([
+            {"prompt_id": row["id"], "response_text": response_text}
+            for row, (_, response_text) in zip(prompt_insert.data, pairs)
+        ]).execute()
+
+
+class InMemoryChatBackend:
+    """Local stand-in for Supabase, used by tests and offline benchmarks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.user_prompts = []
+        self.chatbot_responses = []
+        self.insert_calls = 0
+
+    def insert_pairs(self, pairs):
+        with self._lock:
+            self.insert_calls += 1
+            for prompt_text, response_text in pairs:
+                prompt_id = len(self.user_prompts) + 1
+                created_at = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
+                self.user_prompts.append({"id": prompt_id, "prompt_text": prompt_text, "created_at": created_at})
+                self.chatbot_responses.append({
+                    "id": len(self.chatbot_responses) + 1,
+                    "prompt_id": prompt_id,
+                    "response_text": response_text,
+                    "created_at": created_at,
+                })
+
+
+class ChatWriteQueue:
+    """
+    Bounded write-behind queue for chat prompt/response pairs.
+
+    - `put` never blocks the request; when the queue is full the pair is dropped and counted.
+    - A background thread drains up to `batch_size` pairs at a time (or whatever arrived within
+      `flush_interval`) and writes them with one bulk insert per table.
+    - `close` flushes everything still queued; it is registered with atexit.
+    """
+
+    def __init__(self, backend=None, maxsize: int = CHAT_WRITE_QUEUE_SIZE,
+                 batch_size: int = CHAT_WRITE_BATCH_SIZE, flush_interval: float = CHAT_WRITE_FLUSH_INTERVAL):
+        self.backend = backend or SupabaseChatBackend()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._closed = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def put(self, user_prompt: str, final_text: str) -> bool:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((user_prompt, final_text))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"CHAT STORE: Write queue full, dropped chat for prompt: {user_prompt[:80]}")
+            return False
+
+    def flush(self):
+        """Synchronously writes everything currently queued (used on shutdown and in tests)."""
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout: float = 10.0):
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="chat-write-queue", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._closed.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, block: bool):
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        try:
+            self.backend.insert_pairs(batch)
+            self.written += len(batch)
+            outcome = "ok"
+        except Exception as e:
+            self.failed += len(batch)
+            outcome = "error"
+            print(f"CHAT STORE: Failed to write {len(batch)} chat(s): {e}")
+        CHAT_STORE_WRITE_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+        CHAT_STORE_ROWS.inc(len(batch), outcome=outcome)
+
+
+CHAT_HISTORY_MAX_LIMIT = 200
+
+
+class InvalidHistoryCursor(ValueError):
+    """Raised when a `before`/`since` cursor is not a prompt ID (or, for `since`, an ISO timestamp)."""
+
+
+def parse_history_cursors(before=None, since=None):
+    """
+    Validates the raw query-string cursors before they reach PostgREST.
+
+    Returns (before, since) with `before` as an int and `since` as an int prompt ID or an ISO
+    timestamp string; raises InvalidHistoryCursor for anything else.
+    """
+    if before is not None:
+        if not str(before).isdigit():
+            raise InvalidHistoryCursor(f"'before' must be a prompt ID, got {before!r}.")
+        before = int(before)
+    if since is not None:
+        if str(since).isdigit():
+            since = int(since)
+        else:
+            try:
+                datetime.fromisoformat(str(since).replace("Z", "+00:00"))
+            except ValueError:
+                raise InvalidHistoryCursor(f"'since' must be a prompt ID or an ISO timestamp, got {since!r}.")
+    return before, since
+
+
+def _table_version(table: str) -> str:
+    # An estimated count is read from the planner's statistics for large tables instead of
+    # scanning them, so revalidating stays cheap as the history grows
+    latest = get_supabase().table(table).select("id, created_at", count="estimated").order("id", desc=True).limit(1).execute()
+    newest = latest.data[0] if latest.data else {}
+    return f"{newest.get('id', 0)}.{newest.get('created_at', '')}.{latest.count or 0}"
+
+
+def history_version() -> str:
+    """
+    Returns a version string for the whole chat history, used to validate ETags without
+    reading any history.
+
+    It combines the newest ID, its `created_at` and the estimated row count of both tables
+    (two one-row lookups, no exact COUNT), so it changes when prompts or responses are added,
+    including a prompt stored before its response, and when rows are deleted.
+    """
+    return f"{_table_version('user_prompts')}-{_table_version('chatbot_responses')}"
+
+
+def fetch_history_page(limit: int = 50, before: int = None, since: str = None) -> dict:
+    """
+    Returns one page of chat history, oldest first, as user/bot entries.
+
+    - Without cursors, returns the newest `limit` prompts.
+    - `before` (a prompt ID from a previous page's `next_cursor`) pages further back in time.
+    - `since` (a prompt ID or an ISO `created_at` timestamp) returns only prompts newer than it,
+      for incremental fetches.
+
+    The prompt/response join, filtering, ordering and limit all happen in the query.
+    Raises InvalidHistoryCursor for malformed cursors.
+    """
+    before, since = parse_history_cursors(before, since)
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_LIMIT))
+    query = get_supabase().table("user_prompts").select(
+        "id, prompt_text, created_at, chatbot_responses(response_text, created_at)"
+    )
+    if since is not None:
+        query = query.gt("id", since) if isinstance(since, int) else query.gt("created_at", since)
+        rows = query.order("id").limit(limit).execute().data
+    else:
+        if before is not None:
+            query = query.lt("id", before)
+        rows = list(reversed(query.order("id", desc=True).limit(limit).execute().data))
+
+    history = []
+    for row in rows:
+        history.append({
+            "role": "user",
+            "text": row["prompt_text"],
+            "created_at": row["created_at"],
+            "prompt_id": row["id"],
+        })
+        for response in row.get("chatbot_responses") or []:
+            history.append({
+                "role": "bot",
+                "text": response["response_text"],
+                "created_at": response["created_at"],
+                "prompt_id": row["id"],
+            })
+
+    return {
+        "history": history,
+        # Pass as `before` to load older history; None once the start has been reached.
+        "next_cursor": rows[0]["id"] if rows and since is None and len(rows) == limit else None,
+        # Pass as `since` to load only newer history.
+        "latest_id": rows[-1]["id"] if rows else None,
+    }
+
+
+# Process-wide write queue used by the chat endpoints.
+chat_write_queue = ChatWriteQueue()
+atexit.register(chat_write_queue.close)
@@ -1,37 +1,38 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 # client/gemini_api_client.py
 import os
 import json
-import requests # For calling the tool server
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 from dotenv import load_dotenv
 # Import the tool definition from the server directory (adjust path as needed)
 # This assumes client and server are siblings in the project structure
 import sys
-from tools.tool_definitions import WEATHER_TOOL, WEB_SEARCH_TOOL,CARPARK_AVAILABILITY_TOOL,TAXI_AVAILABILITY_TOOL,TRAFFIC_IMAGES_TOOL,DEEPSEARCHER_TOOL
-from tools.weather_tool import get_current_weather
-from tools.websearch_tool import perform_web_search
-from tools.carkpark_availability_tool import get_carpark_availability
-from tools.taxi_availability_tool import get_taxi_availability
-from tools.traffic_images_tool import get_traffic_images
-from tools.deepsearcher_tool import get_deepsearcher
-from supabase import create_client, Client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# Tool implementations are imported on first use through the registry, not here
+from tools.registry import tool_registry, TOOL_REGISTRY_EAGER, TOOL_REGISTRY_WARMUP, FEED_HISTORY_POLL
+from tools.result_shaping import shape_tool_result, shaping_stats, dumps
+from supabase import Client
+from geo_layers import dengue_layer, rainfall_layer, LayerUnavailable
+from chat_store import (chat_write_queue, get_supabase, fetch_history_page, history_version, parse_history_cursors,
+                        InvalidHistoryCursor)
+from answer_cache import answer_cache, ANSWER_CACHE_ENABLED
+from chat_sessions import chat_sessions
+from tools.metrics import (registry, new_trace_id, trace_id, record_gemini_usage, TRACE_HEADER, PROMETHEUS_CONTENT_TYPE,
+                           GEMINI_SEND_SECONDS, GEMINI_REQUEST_BYTES, TOOL_SECONDS,
+                           HTTP_REQUEST_SECONDS, HTTP_REQUEST_BYTES, HTTP_RESPONSE_BYTES)
 
 
 app = Flask(__name__)
-CORS(app)
-
-# Map tool names to their actual functions
-TOOL_EXECUTORS = {
-    "get_current_weather": get_current_weather,
-    "perform_web_search": perform_web_search,
-    "get_carpark_availability": get_carpark_availability,
-    "get_taxi_availability": get_taxi_availability,
-    "get_traffic_images": get_traffic_images,
-    "get_deepsearcher": get_deepsearcher
-}
+CORS(app, expose_headers=[TRACE_HEADER])
+
+# Bounded pool for running the tool calls of one Gemini turn concurrently (shared by all Flask requests;
+# gemini_asgi.py has its own, larger pool)
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+tool_pool = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..')) # Add project root to sys.path
 
@@ -50,6 +51,25 @@ if not GEMINI_API_KEY:
 
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Tool modules load on first call unless imported at startup or warmed up in the background
+if TOOL_REGISTRY_EAGER:
+    tool_registry.load_all()
+elif TOOL_REGISTRY_WARMUP:
+    tool_registry.warm_up()
+
+# Optionally build the deepsearcher runtime at startup instead of on the first tool call
+if os.getenv("DEEPSEARCHER_WARMUP") == "1":
+    threading.Thread(target=lambda: tool_registry.module("get_deepsearcher").warm_up_deepsearcher(),
+                     name="deepsearcher-import", daemon=True).start()
+
+# Optionally record feed snapshots in the background for get_feed_history
+if FEED_HISTORY_POLL:
+    tool_registry.module("get_feed_history").start_feed_history_poller()
+
+# Optionally keep every traffic camera's latest frame and thumbnail in the image cache
+if os.getenv("TRAFFIC_CAMERA_PREFETCH") == "1":
+    tool_registry.module("get_traffic_images").start_camera_prefetcher()
+
 # --- Gemini Model Configuration ---
 generation_config = {
     "temperature": 0.7,
@@ -68,58 +88,67 @@ model = genai.GenerativeModel(
     model_name="gemini-2.0-flash", # or "gemini-1.0-pro"
     generation_config=generation_config,
     safety_settings=safety_settings,
-    tools=[WEATHER_TOOL,WEB_SEARCH_TOOL,CARPARK_AVAILABILITY_TOOL,TRAFFIC_IMAGES_TOOL,TAXI_AVAILABILITY_TOOL,DEEPSEARCHER_TOOL] # Pass the tool schema here
+    tools=tool_registry.declarations # Pass the tool schema here
 )
 
-def execute_tool(tool_name, tool_args):
-    tool_name = tool_name
+def run_tool(tool_name, tool_args):
+    """
+    Executes one tool and returns (response, outcome).
+
+    `response` is the payload for Gemini's function_response; `outcome` is "ok", "error" (the
+    tool returned an error dict, e.g. a failed upstream fetch), "exception" or "not_found".
+    """
     args = tool_args
 
     print(f"TOOL SERVER: Received request to execute tool: {tool_name} with args: {args}")
 
-    if tool_name in TOOL_EXECUTORS:
+    if tool_name in tool_registry:
+        start = time.perf_counter()
+        outcome = "error"
         try:
-            executor = TOOL_EXECUTORS[tool_name]
+            executor = tool_registry.get(tool_name)
             result = executor(**args)
-            return {"result": result}  # ✅ Return plain dict, not jsonify
+            if not (isinstance(result, dict) and "error" in result):
+                outcome = "ok"
+            # Project and size-budget the result before it becomes a function_response
+            return {"result": shape_tool_result(tool_name, result)}, outcome  # ✅ Return plain dict, not jsonify
         except Exception as e:
+            outcome = "exception"
             print(f"TOOL SERVER: Error executing tool {tool_name}: {e}")
-            return {"error": f"Error executing tool {tool_name}: {str(e)}"}
+            return {"error": f"Error executing tool {tool_name}: {str(e)}"}, outcome
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool_name, outcome=outcome)
     else:
         print(f"TOOL SERVER: Tool '{tool_name}' not found.")
-        return {"error": f"Tool '{tool_name}' not found"}
+        return {"error": f"Tool '{tool_name}' not found"}, "not_found"
 
 
+def execute_tool(tool_name, tool_args):
+    """Executes one tool and returns only the payload for Gemini (see run_tool)."""
+    return run_tool(tool_name, tool_args)[0]
 
-def run_conversation_with_tools(user_prompt: str):
-    print(f"\n👤 User: {user_prompt}")
-    
-    # Initial message to Gemini
-    # When using tools, it's often better to manage history explicitly
-    # for complex conversations. For a single turn, this is simpler.
-    chat = model.start_chat(history=[]) # Start a new chat session for each run_conversation for simplicity
-    
-    response = chat.send_message(user_prompt)
-    
-    # Loop to handle potential multiple tool calls (though less common in simple queries)
-    while response.candidates[0].content.parts[0].function_call.name:
-        function_call_part = response.candidates[0].content.parts[0]
-        tool_name = function_call_part.function_call.name
-        tool_args = {key: value for key, value in function_call_part.function_call.args.items()}
 
-        print(f"🛠️ Gemini wants to call tool: {tool_name} with arguments: {tool_args}")
 
-        # Call our MCP tool server
-        # api_response = call_tool_server(tool_name, tool_args)
-        api_response = execute_tool(tool_name,tool_args)
+def get_function_calls(response):
+    """Returns every function_call part of the first candidate (Gemini may ask for several tools in one turn)."""
+    if not response.candidates:
+        return []
+    return [part.function_call for part in response.candidates[0].content.parts if part.function_call.name]
 
-        # Send the tool's response back to Gemini
-        # Note: The 'name' here must match the 'name' in the FunctionCall
 
-        # Construct the function response payload manually as a dictionary.
-        # This structure mimics what Part.from_function_response would create,
-        # and send_message can accept PartDict-like dictionaries.
-        manual_function_response_part = {
+def get_tool_calls(function_calls):
+    """Converts Gemini FunctionCall parts into plain (tool_name, tool_args) tuples."""
+    return [(fc.name, {key: value for key, value in fc.args.items()}) for fc in function_calls]
+
+
+def build_function_response_parts(calls, results):
+    """Pairs each (tool_name, tool_args) call with its result as a function_response part."""
+    # Construct the function response payloads manually as dictionaries.
+    # This structure mimics what Part.from_function_response would create,
+    # and send_message can accept PartDict-like dictionaries.
+    # Note: The 'name' here must match the 'name' in the FunctionCall
+    return [
+        {
             "function_response": {
                 "name": tool_name,
                 "response": { # This inner dict is the 'Struct' payload for Gemini.
@@ -129,39 +158,120 @@ def run_conversation_with_tools(user_prompt: str):
                 }
             }
         }
+        for (tool_name, _), api_response in zip(calls, results)
+    ]
+
+
+def execute_tools(function_calls):
+    """
+    Executes all function calls from one Gemini turn concurrently on the shared tool pool.
+
+    Returns (parts, outcomes): the matching function_response parts, in the same order as the
+    calls, ready to be sent back to Gemini in a single send_message, and each call's outcome.
+    """
+    calls = get_tool_calls(function_calls)
+    if len(calls) == 1:
+        runs = [run_tool(*calls[0])]
+    else:
+        futures = [tool_pool.submit(run_tool, tool_name, tool_args) for tool_name, tool_args in calls]
+        runs = [future.result() for future in futures]
+    return build_function_response_parts(calls, [result for result, _ in runs]), [outcome for _, outcome in runs]
+
+
+def send_message(chat, message):
+    """chat.send_message, with its duration, request size and token usage recorded."""
+    GEMINI_REQUEST_BYTES.observe(len(dumps(message)), kind="prompt" if isinstance(message, str) else "function_response")
+    with GEMINI_SEND_SECONDS.time(mode="blocking"):
+        response = chat.send_message(message)
+    record_gemini_usage(response)
+    return response
+
+
+def store_chat(user_prompt: str, final_text: str):
+    """Queues the prompt/response pair for a batched background write to Supabase."""
+    chat_write_queue.put(user_prompt, final_text)
+
+
+def lookup_cached_answer(user_prompt: str, session=None):
+    """
+    Returns (answer, prompt_embedding) from the answer cache; answer is None on a miss.
+    Only the first prompt of a conversation is served from the cache, since follow-ups
+    depend on the earlier turns.
+    """
+    if not ANSWER_CACHE_ENABLED or (session is not None and not session.is_new):
+        return None, None
+    return answer_cache.lookup(user_prompt)
+
+
+def cache_answer(user_prompt: str, final_text: str, tools_used, tool_failed: bool, prompt_embedding=None, session=None):
+    """
+    Caches a final answer unless one of the tools it was built from failed. Like the lookup,
+    only the first prompt of a conversation is cached, since follow-up answers depend on the
+    earlier turns; call it before `session.update`.
+    """
+    if not ANSWER_CACHE_ENABLED or not final_text or tool_failed:
+        return
+    if session is not None and not session.is_new:
+        return
+    answer_cache.store(user_prompt, final_text, tools_used, prompt_embedding)
+
+
+def any_tool_failed(outcomes) -> bool:
+    """True if any run_tool outcome is not "ok", including tools that returned an error dict."""
+    return any(outcome != "ok" for outcome in outcomes)
+
+
+def run_conversation_with_tools(user_prompt: str, session=None):
+    """
+    Runs one prompt through Gemini and its tools and returns the final text.
+
+    With a ChatSession the chat continues from the session's (compacted) history and the
+    session is updated afterwards; without one every call is a fresh single-turn chat.
+    The caller must hold `session.lock`.
+    """
+    print(f"\n👤 User: {user_prompt}")
+
+    cached_answer, prompt_embedding = lookup_cached_answer(user_prompt, session)
+    if cached_answer is not None:
+        print(f"\n✨ Gemini (cached): {cached_answer}")
+        store_chat(user_prompt, cached_answer)
+        if session is not None:
+            session.record_exchange(user_prompt, cached_answer)
+        return cached_answer
+    
+    chat = model.start_chat(history=session.gemini_history() if session is not None else [])
+    
+    response = send_message(chat, user_prompt)
+    function_calls = get_function_calls(response)
+    tools_used = []
+    tool_failed = False
+    
+    # Loop until Gemini stops asking for tools; each turn may request several tools at once
+    while function_calls:
+        for function_call in function_calls:
+            print(f"🛠️ Gemini wants to call tool: {function_call.name} with arguments: {dict(function_call.args.items())}")
+
+        function_response_parts, outcomes = execute_tools(function_calls)
+        tools_used.extend(function_call.name for function_call in function_calls)
+        tool_failed = tool_failed or any_tool_failed(outcomes)
         
-        print(f"↪️ GEMINI CLIENT: Sending tool response (manual dict) to Gemini: {manual_function_response_part}")
+        print(f"↪️ GEMINI CLIENT: Sending {len(function_response_parts)} tool response(s) to Gemini "
+              f"({len(dumps(function_response_parts))} bytes)")
         
-        # Send the function response back to the model.
-        response = chat.send_message(
-            [manual_function_response_part] 
-        )
-        # Check if Gemini wants to call another tool or gives a final answer
-        if not response.candidates[0].content.parts[0].function_call.name:
-            break # Exit loop if no more function calls
+        # Send all function responses back to the model in one message.
+        response = send_message(chat, function_response_parts)
+        # Check if Gemini wants to call more tools or gives a final answer
+        function_calls = get_function_calls(response)
 
     # Print the final response from Gemini
     if response.candidates and response.candidates[0].content.parts:
         final_text = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
         print(f"\n✨ Gemini: {final_text}")
 
-        url: str = os.environ.get("SUPABASE_URL")
-        key: str = os.environ.get("SUPABASE_KEY")
-        supabase: Client = create_client(url, key)
-
-        # ✅ Store user prompt in Supabase
-        prompt_insert = supabase.table("user_prompts").insert({
-            "prompt_text": user_prompt
-        }).execute()
-
-        # Get the inserted prompt's ID
-        prompt_id = prompt_insert.data[0]['id']
-
-        # ✅ Store Gemini response in Supabase
-        supabase.table("chatbot_responses").insert({
-            "prompt_id": prompt_id,
-            "response_text": final_text
-        }).execute()
+        store_chat(user_prompt, final_text)
+        cache_answer(user_prompt, final_text, tools_used, tool_failed, prompt_embedding, session)
+        if session is not None:
+            session.update(chat.history)
 
         return final_text
     else:
@@ -174,11 +284,162 @@ def run_conversation_with_tools(user_prompt: str):
 def get_response():
     data = request.get_json()
     user_prompt = data.get("text")  # Updated to match the frontend's JSON key
-    print("Received prompt from frontend:", user_prompt)
-    response = run_conversation_with_tools(user_prompt)
+    print(f"[{trace_id.get()}] Received prompt from frontend:", user_prompt)
+    session = chat_sessions.get_or_create(data.get("session_id"))
+    with session.lock:
+        response = run_conversation_with_tools(user_prompt, session)
     print(response)
-    return jsonify({"result": response})
+    return jsonify({"result": response, "session_id": session.id})
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Formats one server-sent event frame."""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+def stream_conversation_with_tools(user_prompt: str, session=None):
+    """
+    Streaming variant of run_conversation_with_tools that yields server-sent events:
+
+    - `start` as soon as the request is accepted, with the session id if there is one
+    - `tool_start` / `tool_end` around every tool call (tools of one turn still run concurrently)
+    - `token` for each partial text chunk generated by Gemini
+    - `done` with the complete text, or `error` if the conversation failed
 
+    The text of every Gemini turn is kept (e.g. "Let me check..." before a tool call), so the
+    `done` result and the stored chat match the concatenated `token` events the client saw.
+    """
+    print(f"\n👤 User (stream): {user_prompt}")
+    yield sse_event("start", {"prompt": user_prompt, "session_id": session.id if session is not None else None})
+
+    if session is not None:
+        session.lock.acquire()
+    try:
+        cached_answer, prompt_embedding = lookup_cached_answer(user_prompt, session)
+        if cached_answer is not None:
+            store_chat(user_prompt, cached_answer)
+            if session is not None:
+                session.record_exchange(user_prompt, cached_answer)
+            yield sse_event("token", {"text": cached_answer})
+            yield sse_event("done", {"result": cached_answer, "cached": True})
+            return
+
+        chat = model.start_chat(history=session.gemini_history() if session is not None else [])
+        message = user_prompt
+        full_text = ""
+        tools_used = []
+        tool_failed = False
+
+        while True:
+            GEMINI_REQUEST_BYTES.observe(len(dumps(message)), kind="prompt" if isinstance(message, str) else "function_response")
+            send_started = time.perf_counter()
+            response = chat.send_message(message, stream=True)
+            function_calls = []
+            for chunk in response:
+                if not chunk.candidates:
+                    continue
+                for part in chunk.candidates[0].content.parts:
+                    if part.function_call.name:
+                        function_calls.append(part.function_call)
+                    elif part.text:
+                        full_text += part.text
+                        yield sse_event("token", {"text": part.text})
+            GEMINI_SEND_SECONDS.observe(time.perf_counter() - send_started, mode="stream")
+            record_gemini_usage(response)
+
+            if not function_calls:
+                break
+
+            calls = get_tool_calls(function_calls)
+            for tool_name, tool_args in calls:
+                print(f"🛠️ Gemini wants to call tool: {tool_name} with arguments: {tool_args}")
+                yield sse_event("tool_start", {"name": tool_name, "args": tool_args})
+
+            futures = {tool_pool.submit(run_tool, tool_name, tool_args): index for index, (tool_name, tool_args) in enumerate(calls)}
+            results = [None] * len(calls)
+            outcomes = [None] * len(calls)
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index], outcomes[index] = future.result()
+                yield sse_event("tool_end", {"name": calls[index][0], "ok": outcomes[index] == "ok",
+                                             "outcome": outcomes[index]})
+
+            message = build_function_response_parts(calls, results)
+            tools_used.extend(tool_name for tool_name, _ in calls)
+            tool_failed = tool_failed or any_tool_failed(outcomes)
+
+        print(f"\n✨ Gemini (stream): {full_text}")
+        if full_text:
+            store_chat(user_prompt, full_text)
+            cache_answer(user_prompt, full_text, tools_used, tool_failed, prompt_embedding, session)
+            if session is not None:
+                session.update(chat.history)
+        yield sse_event("done", {"result": full_text})
+    except Exception as e:
+        print(f"GEMINI CLIENT: Error while streaming response: {e}")
+        yield sse_event("error", {"message": str(e)})
+    finally:
+        if session is not None:
+            session.lock.release()
+
+
+@app.route('/gemini-response/stream', methods=['POST'])
+def stream_response():
+    data = request.get_json()
+    user_prompt = data.get("text")
+    print(f"[{trace_id.get()}] Received prompt from frontend (stream):", user_prompt)
+    session = chat_sessions.get_or_create(data.get("session_id"))
+    return Response(
+        stream_conversation_with_tools(user_prompt, session),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+
+@app.before_request
+def start_request_trace():
+    request.environ["metrics.start"] = time.perf_counter()
+    new_trace_id(request.headers.get(TRACE_HEADER))
+
+
+@app.after_request
+def finish_request_trace(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    started = request.environ.get("metrics.start")
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method,
+                                     status=str(response.status_code))
+    if request.content_length:
+        HTTP_REQUEST_BYTES.observe(request.content_length, route=route)
+    if not response.is_streamed:
+        HTTP_RESPONSE_BYTES.observe(response.calculate_content_length() or 0, route=route)
+    response.headers[TRACE_HEADER] = trace_id.get() or ""
+    return response
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Counters and histograms of every chat stage, in the Prometheus text format."""
+    return Response(registry.render(), mimetype=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route('/tool-registry/stats')
+def get_tool_registry_stats():
+    """Which tool modules have been imported so far, and how long each import took."""
+    return jsonify(tool_registry.stats())
+
+
+@app.route('/tool-result-stats')
+def get_tool_result_stats():
+    """Payload sizes before and after result shaping, per tool."""
+    return jsonify(shaping_stats.snapshot())
+
+
+@app.route('/answer-cache/stats')
+def get_answer_cache_stats():
+    return jsonify(answer_cache.stats())
 
 
 @app.route("/chartdata")
@@ -192,97 +453,70 @@ def read_chart():
     ]
     return {"chart_data": data}
 
-@app.route("/denguecluster")
-def get_api():      
-    dataset_id = "d_dbfabf16158d1b0e1c420627c0819168"
-    url = f"https://api-open.data.gov.sg/v1/public/api/datasets/{dataset_id}/poll-download"
+def serve_geo_layer(layer):
+    """Serves a precomputed GeoJSON layer from memory with ETag/Last-Modified revalidation."""
+    try:
+        snapshot = layer.get()
+    except LayerUnavailable as e:
+        return jsonify({"error": str(e)}), 500
+
+    use_gzip = "gzip" in request.accept_encodings
+    response = Response(snapshot.gzip_body if use_gzip else snapshot.body, mimetype="application/json")
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Last-Modified"] = snapshot.last_modified
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(snapshot.etag + ("-gz" if use_gzip else ""))
+    return response.make_conditional(request)
+
+
+@app.route("/traffic-cameras")
+def traffic_cameras():
+    """Nearest cameras to ?latitude=&longitude= (or all cameras), with proxied image URLs."""
+    latitude = request.args.get("latitude", type=float)
+    longitude = request.args.get("longitude", type=float)
+    limit = request.args.get("limit", type=int)
+    result = tool_registry.get("get_traffic_images")(latitude=latitude, longitude=longitude, limit=limit)
+    return jsonify(result), (502 if "error" in result else 200)
+
+
+@app.route("/traffic-cameras/<camera_id>/image")
+def traffic_camera_image(camera_id):
+    """Serves a camera's latest frame (?size=full) or its thumbnail from the in-memory image cache."""
+    traffic = tool_registry.module("get_traffic_images")
+    try:
+        image = traffic.get_camera_image(camera_id, thumbnail=request.args.get("size") != "full")
+    except traffic.CameraNotFound:
+        return jsonify({"error": "CameraNotFound", "message": f"No camera {camera_id} in the current snapshot."}), 404
+    except traffic.CameraImageUnavailable as e:
+        return jsonify({"error": "CameraImageUnavailable", "message": str(e)}), 502
 
-    response = requests.get(url)
-    json_data = response.json()
+    # The cached bytes object is handed to the WSGI server as is, without copying
+    response = Response(image.body, mimetype=image.content_type, direct_passthrough=True)
+    response.headers["Cache-Control"] = "public, max-age=20"
+    response.set_etag(image.etag)
+    return response.make_conditional(request)
 
-    
 
-    if json_data['code'] != 0:
-        return jsonify({"error": json_data['errMsg']}), 500
+@app.route("/traffic-cameras/cache-stats")
+def traffic_camera_cache_stats():
+    return jsonify(tool_registry.module("get_traffic_images").camera_image_cache.stats())
 
-    # This URL contains the actual GeoJSON
-    geojson_url = json_data['data']['url']
-    geojson_response = requests.get(geojson_url)
-    print(geojson_response)
 
-    # Parse GeoJSON content and return it
-    try:
-        geojson_data = geojson_response.json()
-        return jsonify(geojson_data)
-    except ValueError:
-        return jsonify({"error": "Invalid GeoJSON response"}), 500
+@app.route("/denguecluster")
+def get_api():
+    return serve_geo_layer(dengue_layer)
 
 @app.route("/rainfallstations")
 def rainfall_geojson():
-    # Data.gov.sg rainfall API
-    api_url = "https://api.data.gov.sg/v1/environment/rainfall"
-    response = requests.get(api_url)
-    json_data = response.json()
-
-    # Extract stations and rainfall readings
-    stations = json_data["metadata"]["stations"]
-    readings = json_data["items"][0]["readings"]
-    reading_map = {r["station_id"]: r["value"] for r in readings}
-
-    print(json_data)
-
-    geojson = {
-        "type": "FeatureCollection",
-        "features": []
-    }
-
-    for station in stations:
-        station_id = station["id"]
-        value = reading_map.get(station_id)
-
-        # Optional: skip stations with no data
-        if value is None:
-            continue
-
-        feature = {
-            "type": "Feature",
-            "geometry": {
-                "type": "Point",
-                "coordinates": [station["location"]["longitude"], station["location"]["latitude"]],
-            },
-            "properties": {
-                "name": station["name"],
-                "stationId": station_id,
-                "rainfall_mm": value
-            }
-        }
-        
-        geojson["features"].append(feature)
-        # geojson["features"].append({
-        #         "type": "Feature",
-        #         "geometry": {
-        #             "type": "Point",
-        #             "coordinates": [103.85, 1.29],  # Sample coords near Marina Bay
-        #         },
-        #         "properties": {
-        #             "name": "Hardcoded Rain Station",
-        #             "stationId": "HARDCODED_1",
-        #             "rainfall_mm": 10.0
-        #         }
-        #     })
-
-    
-       
-
-    return jsonify(geojson)
+    return serve_geo_layer(rainfall_layer)
 
 @app.route('/supabase-info')
 def get_supabase_info():
     # Example static data
     data = {"data": "Hello"}
-    url: str = os.environ.get("SUPABASE_URL")
-    key: str = os.environ.get("SUPABASE_KEY")
-    supabase: Client = create_client(url, key)
+    supabase: Client = get_supabase()
     prompts_res = supabase.table("user_prompts").select("id, prompt_text, created_at").execute()
  
 
@@ -327,5 +561,32 @@ def get_supabase_info():
     return jsonify({"history": combined_sorted})
 
 
+@app.route('/chat-history')
+def get_chat_history():
+    """
+    Cursor-paginated chat history: ?limit=50&before=<prompt_id> or ?since=<prompt_id|timestamp>.
+
+    Responses carry a weak ETag derived from the newest rows and estimated row counts of both
+    tables, so a client that already has the current page gets a 304 after two one-row lookups.
+    Malformed cursors get a 400.
+    """
+    limit = request.args.get("limit", 50, type=int)
+    try:
+        before, since = parse_history_cursors(request.args.get("before"), request.args.get("since"))
+    except InvalidHistoryCursor as e:
+        return jsonify({"error": "InvalidCursor", "message": str(e)}), 400
+
+    etag = f"{history_version()}:{limit}:{before}:{since}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    response = jsonify(fetch_history_page(limit=limit, before=before, since=since))
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 if __name__ == '__main__':
     app.run(debug=True)
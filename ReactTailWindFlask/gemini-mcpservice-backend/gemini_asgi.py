@@ -0,0 +1,285 @@
+# Async (ASGI) serving mode for the chat backend.
+#
+# Same Gemini model, tools and Supabase tables as the Flask app in gemini.py, but every
+# request is a coroutine: Gemini calls use the async client, tool calls run on this app's
+# own tool pool (sized for many concurrent chats, unlike the Flask app's pool) without
+# blocking the event loop, answer-cache embeddings run on a separate pool so they never
+# queue behind tools, and Supabase writes go through the background write-behind queue in
+# chat_store.py. One process can therefore hold hundreds of concurrent chats.
+#
+# Tools themselves are still blocking (requests, NumPy, deepsearcher), so at most
+# ASGI_TOOL_MAX_WORKERS tool calls run at once across all chats and each data.gov.sg fetch
+# holds a pool thread for its whole round trip; further calls queue for a thread. The wait is
+# recorded in tool_queue_seconds{pool="asgi"} and reported by benchmarks/bench_serving_modes.py.
+#
+# It serves the chat endpoints (/gemini-response, /gemini-response/stream, /chat-history)
+# and /metrics; the map data and stats endpoints are only served by the Flask app.
+#
+# Run with:  uvicorn gemini_asgi:app --port 8000
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+
+from chat_store import chat_write_queue, fetch_history_page, history_version, parse_history_cursors, InvalidHistoryCursor
+from chat_sessions import chat_sessions
+from gemini import (
+    model, run_tool, get_function_calls, get_tool_calls, build_function_response_parts, store_chat,
+    lookup_cached_answer, cache_answer, any_tool_failed, sse_event,
+)
+from tools.metrics import (registry, new_trace_id, record_gemini_usage, TRACE_HEADER, PROMETHEUS_CONTENT_TYPE,
+                           GEMINI_SEND_SECONDS, GEMINI_REQUEST_BYTES, HTTP_REQUEST_SECONDS, TOOL_QUEUE_SECONDS)
+from tools.result_shaping import dumps
+
+# Tools are blocking (requests, NumPy, deepsearcher) but mostly wait on I/O or on a shared
+# snapshot fetch, so the pool is sized for concurrent chats rather than for CPU cores
+ASGI_TOOL_MAX_WORKERS = int(os.getenv("ASGI_TOOL_MAX_WORKERS", "64"))
+ASGI_ANSWER_CACHE_MAX_WORKERS = int(os.getenv("ASGI_ANSWER_CACHE_MAX_WORKERS", "16"))
+tool_pool = ThreadPoolExecutor(max_workers=ASGI_TOOL_MAX_WORKERS, thread_name_prefix="asgi-tool")
+answer_cache_pool = ThreadPoolExecutor(max_workers=ASGI_ANSWER_CACHE_MAX_WORKERS, thread_name_prefix="asgi-answer-cache")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Flush queued chat writes before the worker exits
+    await asyncio.get_running_loop().run_in_executor(None, chat_write_queue.close)
+    tool_pool.shutdown(wait=False)
+    answer_cache_pool.shutdown(wait=False)
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=[TRACE_HEADER],
+)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    start = time.perf_counter()
+    trace = new_trace_id(request.headers.get(TRACE_HEADER))
+    response = await call_next(request)
+    # Label by route template, never the raw path, so scanned or unknown URLs cannot grow the series
+    matched = request.scope.get("route")
+    route = getattr(matched, "path", None) or "unmatched"
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method,
+                                 status=str(response.status_code))
+    response.headers[TRACE_HEADER] = trace
+    return response
+
+
+class UserInput(BaseModel):
+    text: str
+    session_id: Optional[str] = None
+
+
+def _run_queued_tool(submitted: float, tool_name, tool_args):
+    TOOL_QUEUE_SECONDS.observe(time.perf_counter() - submitted, pool="asgi")
+    return run_tool(tool_name, tool_args)
+
+
+def run_tool_async(tool_name, tool_args):
+    """Runs one blocking tool call on the ASGI tool pool, recording how long it waited for a thread."""
+    return asyncio.get_running_loop().run_in_executor(tool_pool, _run_queued_tool, time.perf_counter(), tool_name, tool_args)
+
+
+async def execute_tools_async(function_calls):
+    """Runs all tool calls of one Gemini turn concurrently on the ASGI tool pool; returns (parts, outcomes) like execute_tools."""
+    calls = get_tool_calls(function_calls)
+    runs = await asyncio.gather(*(run_tool_async(tool_name, tool_args) for tool_name, tool_args in calls))
+    return build_function_response_parts(calls, [result for result, _ in runs]), [outcome for _, outcome in runs]
+
+
+async def send_message_async(chat, message):
+    """chat.send_message_async, with its duration, request size and token usage recorded."""
+    GEMINI_REQUEST_BYTES.observe(len(dumps(message)), kind="prompt" if isinstance(message, str) else "function_response")
+    with GEMINI_SEND_SECONDS.time(mode="async"):
+        response = await chat.send_message_async(message)
+    record_gemini_usage(response)
+    return response
+
+
+async def run_conversation_with_tools_async(user_prompt: str, session=None):
+    print(f"\n👤 User: {user_prompt}")
+    loop = asyncio.get_running_loop()
+
+    # The cache may need to embed the prompt, which is a blocking call
+    cached_answer, prompt_embedding = await loop.run_in_executor(answer_cache_pool, lookup_cached_answer, user_prompt, session)
+    if cached_answer is not None:
+        store_chat(user_prompt, cached_answer)
+        if session is not None:
+            session.record_exchange(user_prompt, cached_answer)
+        return cached_answer
+
+    chat = model.start_chat(history=session.gemini_history() if session is not None else [])
+    response = await send_message_async(chat, user_prompt)
+    function_calls = get_function_calls(response)
+    tools_used = []
+    tool_failed = False
+
+    while function_calls:
+        for function_call in function_calls:
+            print(f"🛠️ Gemini wants to call tool: {function_call.name} with arguments: {dict(function_call.args.items())}")
+
+        function_response_parts, outcomes = await execute_tools_async(function_calls)
+        tools_used.extend(function_call.name for function_call in function_calls)
+        tool_failed = tool_failed or any_tool_failed(outcomes)
+        response = await send_message_async(chat, function_response_parts)
+        function_calls = get_function_calls(response)
+
+    if response.candidates and response.candidates[0].content.parts:
+        final_text = "".join(part.text for part in response.candidates[0].content.parts if hasattr(part, 'text'))
+        print(f"\n✨ Gemini: {final_text}")
+        store_chat(user_prompt, final_text)  # write-behind, never blocks the event loop
+        await loop.run_in_executor(answer_cache_pool, cache_answer, user_prompt, final_text, tools_used, tool_failed,
+                                   prompt_embedding, session)
+        if session is not None:
+            session.update(chat.history)
+        return final_text
+    else:
+        print("\n✨ Gemini: (No text content in final response)")
+        print(f"Full response object: {response}")
+
+
+@app.post("/gemini-response")
+async def get_response(input: UserInput):
+    session = chat_sessions.get_or_create(input.session_id)
+    # Waiting on the asyncio lock holds no thread, and a cancelled wait (client disconnect) leaves it unlocked
+    async with session.async_lock:
+        response = await run_conversation_with_tools_async(input.text, session)
+    return {"result": response, "session_id": session.id}
+
+
+async def stream_conversation_with_tools_async(user_prompt: str, session=None):
+    """
+    Async counterpart of gemini.stream_conversation_with_tools, yielding the same server-sent
+    events. Gemini chunks are read with the async client and tools run on the ASGI tool pool,
+    so a streaming chat holds no thread while it waits.
+    """
+    print(f"\n👤 User (stream): {user_prompt}")
+    yield sse_event("start", {"prompt": user_prompt, "session_id": session.id if session is not None else None})
+    loop = asyncio.get_running_loop()
+
+    async def run_indexed(index, tool_name, tool_args):
+        return index, await run_tool_async(tool_name, tool_args)
+
+    if session is not None:
+        await session.async_lock.acquire()
+    try:
+        cached_answer, prompt_embedding = await loop.run_in_executor(answer_cache_pool, lookup_cached_answer, user_prompt, session)
+        if cached_answer is not None:
+            store_chat(user_prompt, cached_answer)
+            if session is not None:
+                session.record_exchange(user_prompt, cached_answer)
+            yield sse_event("token", {"text": cached_answer})
+            yield sse_event("done", {"result": cached_answer, "cached": True})
+            return
+
+        chat = model.start_chat(history=session.gemini_history() if session is not None else [])
+        message = user_prompt
+        full_text = ""
+        tools_used = []
+        tool_failed = False
+
+        while True:
+            GEMINI_REQUEST_BYTES.observe(len(dumps(message)), kind="prompt" if isinstance(message, str) else "function_response")
+            send_started = time.perf_counter()
+            response = await chat.send_message_async(message, stream=True)
+            function_calls = []
+            async for chunk in response:
+                if not chunk.candidates:
+                    continue
+                for part in chunk.candidates[0].content.parts:
+                    if part.function_call.name:
+                        function_calls.append(part.function_call)
+                    elif part.text:
+                        full_text += part.text
+                        yield sse_event("token", {"text": part.text})
+            GEMINI_SEND_SECONDS.observe(time.perf_counter() - send_started, mode="async_stream")
+            record_gemini_usage(response)
+
+            if not function_calls:
+                break
+
+            calls = get_tool_calls(function_calls)
+            for tool_name, tool_args in calls:
+                print(f"🛠️ Gemini wants to call tool: {tool_name} with arguments: {tool_args}")
+                yield sse_event("tool_start", {"name": tool_name, "args": tool_args})
+
+            results = [None] * len(calls)
+            outcomes = [None] * len(calls)
+            for finished in asyncio.as_completed([run_indexed(index, *call) for index, call in enumerate(calls)]):
+                index, (results[index], outcomes[index]) = await finished
+                yield sse_event("tool_end", {"name": calls[index][0], "ok": outcomes[index] == "ok",
+                                             "outcome": outcomes[index]})
+
+            message = build_function_response_parts(calls, results)
+            tools_used.extend(tool_name for tool_name, _ in calls)
+            tool_failed = tool_failed or any_tool_failed(outcomes)
+
+        print(f"\n✨ Gemini (stream): {full_text}")
+        if full_text:
+            store_chat(user_prompt, full_text)
+            await loop.run_in_executor(answer_cache_pool, cache_answer, user_prompt, full_text, tools_used, tool_failed,
+                                       prompt_embedding, session)
+            if session is not None:
+                session.update(chat.history)
+        yield sse_event("done", {"result": full_text})
+    except Exception as e:
+        print(f"GEMINI CLIENT: Error while streaming response: {e}")
+        yield sse_event("error", {"message": str(e)})
+    finally:
+        if session is not None:
+            session.async_lock.release()
+
+
+@app.post("/gemini-response/stream")
+async def stream_response(input: UserInput):
+    session = chat_sessions.get_or_create(input.session_id)
+    return StreamingResponse(
+        stream_conversation_with_tools_async(input.text, session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against a weak ETag value."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == f'"{etag}"' for tag in tags)
+
+
+# A plain function: FastAPI runs it on its thread pool, so the Supabase lookups do not block the loop
+@app.get("/chat-history")
+def get_chat_history(request: Request, limit: int = 50, before: Optional[str] = None, since: Optional[str] = None):
+    """Same contract as the Flask route: cursor pagination, a weak ETag with 304s, and 400 for bad cursors."""
+    try:
+        before, since = parse_history_cursors(before, since)
+    except InvalidHistoryCursor as e:
+        return JSONResponse({"error": "InvalidCursor", "message": str(e)}, status_code=400)
+
+    etag = f"{history_version()}:{limit}:{before}:{since}"
+    headers = {"ETag": f'W/"{etag}"'}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+    headers["Cache-Control"] = "no-cache"
+    return JSONResponse(fetch_history_page(limit=limit, before=before, since=since), headers=headers)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
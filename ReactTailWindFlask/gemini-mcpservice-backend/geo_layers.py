@@ -0,0 +1,138 @@
+# Precomputed GeoJSON map layers (/denguecluster, /rainfallstations).
+#
+# A background refresher rebuilds each layer on its dataset's cadence and keeps the latest
+# version in memory as compact JSON bytes plus a gzip copy, with an ETag and Last-Modified.
+# Serving a map layer is then a memory copy instead of upstream round-trips.
+import gzip
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+
+from tools import http_client
+
+DENGUE_DATASET_ID = "d_dbfabf16158d1b0e1c420627c0819168"
+DENGUE_REFRESH_INTERVAL = 60 * 60  # dataset is published daily; check hourly
+RAINFALL_REFRESH_INTERVAL = 5 * 60  # readings are updated every 5 minutes
+RETRY_INTERVAL = 30  # after a failed refresh
+
+
+class LayerUnavailable(Exception):
+    """Raised when a layer has never been built successfully."""
+
+
+class GeoLayerSnapshot:
+    def __init__(self, geojson):
+        self.body = json.dumps(geojson, separators=(",", ":")).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body, compresslevel=6)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.built_at = time.time()
+        self.last_modified = formatdate(self.built_at, usegmt=True)
+
+
+class GeoLayer:
+    """
+    One map layer kept fresh in memory.
+
+    - `build` is a zero-argument callable that fetches upstream data and returns GeoJSON.
+    - The first `get()` builds the layer synchronously and starts the background refresher.
+    - If a refresh fails, the previous snapshot keeps being served and the refresh is retried.
+    """
+
+    def __init__(self, name: str, build, refresh_interval: float):
+        self.name = name
+        self.build = build
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get(self) -> GeoLayerSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.refresh()
+                self._start_refresher()
+            snapshot = self._snapshot
+        if snapshot is None:
+            raise LayerUnavailable(self._last_error or f"Layer '{self.name}' is not available")
+        return snapshot
+
+    def refresh(self) -> bool:
+        try:
+            snapshot = GeoLayerSnapshot(self.build())
+        except Exception as e:
+            self._last_error = str(e)
+            print(f"GEO LAYERS: Failed to refresh '{self.name}': {e}")
+            return False
+        if self._snapshot is None or snapshot.etag != self._snapshot.etag:
+            self._snapshot = snapshot
+            print(f"GEO LAYERS: Refreshed '{self.name}' ({len(snapshot.body)} bytes, {len(snapshot.gzip_body)} gzipped)")
+        self._last_error = None
+        return True
+
+    def _start_refresher(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"geo-layer-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        delay = self.refresh_interval if self._snapshot is not None else RETRY_INTERVAL
+        while True:
+            time.sleep(delay)
+            delay = self.refresh_interval if self.refresh() else RETRY_INTERVAL
+
+
+def build_dengue_geojson() -> dict:
+    url = f"https://api-open.data.gov.sg/v1/public/api/datasets/{DENGUE_DATASET_ID}/poll-download"
+
+    response = http_client.get(url)
+    response.raise_for_status()
+    json_data = response.json()
+
+    if json_data['code'] != 0:
+        raise ValueError(json_data['errMsg'])
+
+    # This URL contains the actual GeoJSON
+    geojson_url = json_data['data']['url']
+    geojson_response = http_client.get(geojson_url)
+    geojson_response.raise_for_status()
+    return geojson_response.json()
+
+
+def build_rainfall_geojson() -> dict:
+    # Data.gov.sg rainfall API
+    api_url = "https://api.data.gov.sg/v1/environment/rainfall"
+    response = http_client.get(api_url)
+    response.raise_for_status()
+    json_data = response.json()
+
+    # Extract stations and rainfall readings
+    stations = json_data["metadata"]["stations"]
+    readings = json_data["items"][0]["readings"]
+    reading_map = {r["station_id"]: r["value"] for r in readings}
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [station["location"]["longitude"], station["location"]["latitude"]],
+            },
+            "properties": {
+                "name": station["name"],
+                "stationId": station["id"],
+                "rainfall_mm": reading_map[station["id"]],
+            },
+        }
+        for station in stations
+        if reading_map.get(station["id"]) is not None  # skip stations with no data
+    ]
+    return {"type": "FeatureCollection", "features": features}
+
+
+dengue_layer = GeoLayer("denguecluster", build_dengue_geojson, DENGUE_REFRESH_INTERVAL)
+rainfall_layer = GeoLayer("rainfallstations", build_rainfall_geojson, RAINFALL_REFRESH_INTERVAL)
@@ -0,0 +1,63 @@
+# Shared setup for the backend unit tests.
+#
+#   cd ReactTailWindFlask/gemini-mcpservice-backend && python -m pytest -q tests
+#
+# tests/ is a package, so pytest puts the backend directory on sys.path and tests import
+# modules the same way the app does. The service stand-ins are in tests/fakes.py; nothing
+# opens a network connection.
+import os
+
+import pytest
+
+from tests.fakes import ScriptedModel, fake_embed
+
+# gemini.py refuses to import without a key; tests never call Gemini
+os.environ.setdefault("GEMINI_API_KEY", "unit-tests")
+
+
+class OfflineGemini:
+    """gemini.py wired to a scripted model, in-memory tools and a recorded chat store."""
+
+    def __init__(self, gemini, monkeypatch, override_tool):
+        self.gemini = gemini
+        self.monkeypatch = monkeypatch
+        self.override_tool = override_tool
+        self.stored = []  # (prompt, text) pairs passed to store_chat
+
+    def script(self, scripts: dict):
+        self.monkeypatch.setattr(self.gemini, "model", ScriptedModel(scripts))
+
+    def tool(self, name: str, function):
+        """Registers (or replaces) a tool implementation for the duration of the test."""
+        self.override_tool(name, function)
+
+    def enable_answer_cache(self):
+        from answer_cache import AnswerCache
+        cache = AnswerCache(embed=fake_embed)
+        self.monkeypatch.setattr(self.gemini, "ANSWER_CACHE_ENABLED", True)
+        self.monkeypatch.setattr(self.gemini, "answer_cache", cache)
+        return cache
+
+
+@pytest.fixture
+def override_tool():
+    """override_tool(name, function) replaces a tool in the tool registry until the test ends."""
+    from tools.registry import tool_registry
+    replaced = []
+
+    def override(name: str, function):
+        replaced.append((name, tool_registry.override(name, function)))
+
+    yield override
+    for name, previous in reversed(replaced):
+        tool_registry.override(name, previous)
+
+
+@pytest.fixture
+def offline_gemini(monkeypatch, override_tool):
+    # Tools are imported lazily, but gemini.py itself still needs supabase and google-generativeai
+    gemini = pytest.importorskip("gemini")
+    offline = OfflineGemini(gemini, monkeypatch, override_tool)
+    monkeypatch.setattr(gemini, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(gemini, "store_chat", lambda prompt, text: offline.stored.append((prompt, text)))
+    return offline
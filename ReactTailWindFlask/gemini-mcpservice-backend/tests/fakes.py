@@ -0,0 +1,436 @@
+# Local stand-ins for the backend's external services, shared by the unit tests and
+# benchmarks/bench_offline.py.
+#
+# - make_*_payload: realistic data.gov.sg payloads.
+# - InMemorySupabase: the subset of the supabase-py query builder used by chat_store.py.
+# - ScriptedModel: a google.generativeai GenerativeModel stand-in that replays chosen
+#   function-call sequences per prompt and then answers with text.
+# - fake_embed: a deterministic stand-in for text-embedding-004.
+#
+# Nothing here opens a network connection.
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+SGT = timezone(timedelta(hours=8))
+SG_LAT = (1.25, 1.45)
+SG_LON = (103.62, 104.0)
+CAMERA_IMAGE_HOST = "images.data.gov.sg"
+
+
+# --- data.gov.sg payloads ---
+
+def _now() -> str:
+    return datetime.now(SGT).strftime("%Y-%m-%dT%H:%M:%S+08:00")
+
+
+def random_point(rng):
+    return round(rng.uniform(*SG_LAT), 6), round(rng.uniform(*SG_LON), 6)
+
+
+def make_taxi_payload(rng, taxis: int = 3000) -> dict:
+    coordinates = [[lon, lat] for lat, lon in (random_point(rng) for _ in range(taxis))]
+    return {
+        "type": "FeatureCollection",
+        "crs": {"type": "link", "properties": {"href": "http://spatialreference.org/ref/epsg/4326/ogcwkt/", "type": "ogcwkt"}},
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "MultiPoint", "coordinates": coordinates},
+            "properties": {"timestamp": _now(), "taxi_count": taxis, "api_info": {"status": "healthy"}},
+        }],
+    }
+
+
+def make_carpark_payload(rng, carparks: int = 2000) -> dict:
+    carpark_data = []
+    for i in range(carparks):
+        info = []
+        for lot_type in rng.sample(["C", "Y", "H"], rng.randint(1, 2)):
+            total = rng.randint(20, 600)
+            info.append({"total_lots": str(total), "lot_type": lot_type, "lots_available": str(rng.randint(0, total))})
+        carpark_data.append({"carpark_info": info, "carpark_number": f"CP{i:04d}", "update_datetime": _now()[:19]})
+    return {"items": [{"timestamp": _now(), "carpark_data": carpark_data}], "api_info": {"status": "healthy"}}
+
+
+def make_traffic_payload(rng, cameras: int = 90) -> dict:
+    stamp = int(time.time())
+    return {
+        "items": [{
+            "timestamp": _now(),
+            "cameras": [
+                {
+                    "timestamp": _now(),
+                    "image": f"https://{CAMERA_IMAGE_HOST}/traffic-images/{stamp}/{1000 + i}.jpg",
+                    "location": dict(zip(("latitude", "longitude"), random_point(rng))),
+                    "camera_id": str(1000 + i),
+                    "image_metadata": {"height": 1080, "width": 1920, "md5": hashlib.md5(f"{stamp}-{i}".encode()).hexdigest()},
+                }
+                for i in range(cameras)
+            ],
+        }],
+        "api_info": {"status": "healthy"},
+    }
+
+
+def _stations(rng, count: int, prefix: str) -> list:
+    return [
+        {"id": f"{prefix}{i:03d}", "device_id": f"{prefix}{i:03d}", "name": f"Station {prefix}{i:03d}",
+         "location": dict(zip(("latitude", "longitude"), random_point(rng)))}
+        for i in range(count)
+    ]
+
+
+def make_station_payload(rng, count: int, prefix: str, unit: str, low: float, high: float) -> dict:
+    stations = _stations(rng, count, prefix)
+    return {
+        "metadata": {"stations": stations, "reading_type": "DBT 1M F", "reading_unit": unit},
+        "items": [{"timestamp": _now(), "readings": [
+            {"station_id": s["id"], "value": round(rng.uniform(low, high), 1)} for s in stations
+        ]}],
+        "api_info": {"status": "healthy"},
+    }
+
+
+FORECAST_AREAS = [
+    "Ang Mo Kio", "Bedok", "Bishan", "Bukit Batok", "Bukit Merah", "Bukit Panjang", "Bukit Timah", "Central Water Catchment",
+    "Changi", "Choa Chu Kang", "Clementi", "City", "Geylang", "Hougang", "Jalan Bahar", "Jurong East", "Jurong Island",
+    "Jurong West", "Kallang", "Lim Chu Kang", "Mandai", "Marine Parade", "Novena", "Pasir Ris", "Paya Lebar", "Pioneer",
+    "Pulau Tekong", "Pulau Ubin", "Punggol", "Queenstown", "Seletar", "Sembawang", "Sengkang", "Sentosa", "Serangoon",
+    "Southern Islands", "Sungei Kadut", "Tampines", "Tanglin", "Tengah", "Toa Payoh", "Tuas", "Western Islands",
+    "Western Water Catchment", "Woodlands", "Yishun",
+]
+
+
+def make_forecast_payload(rng) -> dict:
+    conditions = ["Partly Cloudy (Day)", "Cloudy", "Light Showers", "Thundery Showers", "Fair (Day)"]
+    areas = [{"name": name, "label_location": dict(zip(("latitude", "longitude"), random_point(rng)))} for name in FORECAST_AREAS]
+    return {
+        "area_metadata": areas,
+        "items": [{
+            "update_timestamp": _now(), "timestamp": _now(),
+            "valid_period": {"start": _now(), "end": _now()},
+            "forecasts": [{"area": name, "forecast": rng.choice(conditions)} for name in FORECAST_AREAS],
+        }],
+        "api_info": {"status": "healthy"},
+    }
+
+
+# --- Supabase ---
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Query:
+    def __init__(self, db, table: str):
+        self.db = db
+        self.table = table
+        self._columns = "*"
+        self._count = None
+        self._rows = None  # rows to insert
+        self._filters = []
+        self._order = None
+        self._limit = None
+
+    def select(self, columns: str = "*", count: str = None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, rows):
+        self._rows = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row[column] < value)
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda row: row[column] == value)
+        return self
+
+    def order(self, column, desc: bool = False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def execute(self):
+        if self._rows is not None:
+            return _Result(self.db.insert(self.table, self._rows))
+        data = self.db.select(self.table, self._columns, self._filters, self._order, self._limit)
+        count = None
+        if self._count is not None:
+            self.db.count_modes.append(self._count)
+            count = self.db.select_count(self.table, self._filters)
+        return _Result(data, count)
+
+
+class InMemorySupabase:
+    """
+    Stand-in for the supabase-py client covering the queries chat_store.py issues: bulk
+    inserts, select with an embedded `chatbot_responses(...)` join and a row count
+    (every count mode returns the exact count; `count_modes` records which were requested),
+    gt/lt/eq, order and limit. `delete` removes a row directly, to simulate edits made elsewhere.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = {"user_prompts": [], "chatbot_responses": []}
+        self._responses_by_prompt = {}
+        self._last_ids = {}
+        self.count_modes = []
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def insert(self, table: str, rows: list) -> list:
+        with self._lock:
+            stored = self._tables.setdefault(table, [])
+            inserted = []
+            for row in rows:
+                self._last_ids[table] = self._last_ids.get(table, 0) + 1
+                row = {"id": self._last_ids[table], "created_at": datetime.now(timezone.utc).isoformat(), **row}
+                stored.append(row)
+                inserted.append(dict(row))
+                if table == "chatbot_responses":
+                    self._responses_by_prompt.setdefault(row["prompt_id"], []).append(row)
+            return inserted
+
+    def select(self, table: str, columns: str, filters, order, limit) -> list:
+        with self._lock:
+            rows = self._tables.get(table, [])
+            if order is not None:
+                column, desc = order
+                # Rows are stored in id order, so id ordering needs no sort
+                rows = rows[::-1] if column == "id" and desc else rows if column == "id" else \
+                    sorted(rows, key=lambda row: row[column], reverse=desc)
+            selected = []
+            for row in rows:
+                if all(f(row) for f in filters):
+                    selected.append(row)
+                    if limit is not None and len(selected) >= limit:
+                        break
+            if "chatbot_responses(" in columns:
+                return [{**row, "chatbot_responses": list(self._responses_by_prompt.get(row["id"], []))} for row in selected]
+            return [dict(row) for row in selected]
+
+    def select_count(self, table: str, filters) -> int:
+        """Number of rows matching `filters`, ignoring any limit."""
+        with self._lock:
+            return sum(1 for row in self._tables.get(table, []) if all(f(row) for f in filters))
+
+    def delete(self, table: str, row_id: int):
+        with self._lock:
+            self._tables[table] = [row for row in self._tables.get(table, []) if row["id"] != row_id]
+            for responses in self._responses_by_prompt.values():
+                responses[:] = [row for row in responses if not (table == "chatbot_responses" and row["id"] == row_id)]
+
+    def count(self, table: str) -> int:
+        with self._lock:
+            return len(self._tables.get(table, []))
+
+
+# --- Gemini ---
+
+class FakeFunctionCall:
+    def __init__(self, name: str = "", args: dict = None):
+        self.name = name
+        self.args = args or {}
+
+    @staticmethod
+    def to_dict(function_call) -> dict:
+        return {"name": function_call.name, "args": dict(function_call.args)}
+
+
+class FakeFunctionResponse:
+    def __init__(self, name: str = "", response: dict = None):
+        self.name = name
+        self.response = response or {}
+
+    @staticmethod
+    def to_dict(function_response) -> dict:
+        return {"name": function_response.name, "response": function_response.response}
+
+
+class FakePart:
+    def __init__(self, text: str = "", function_call: FakeFunctionCall = None, function_response: FakeFunctionResponse = None):
+        self.text = text
+        self.function_call = function_call or FakeFunctionCall()
+        self.function_response = function_response or FakeFunctionResponse()
+
+
+class FakeContent:
+    def __init__(self, role: str, parts: list):
+        self.role = role
+        self.parts = parts
+
+    @classmethod
+    def from_message(cls, role: str, message):
+        """Builds a content from a str, a list of part dicts, or a content dict."""
+        if isinstance(message, dict) and "parts" in message:
+            return cls.from_message(message["role"], message["parts"])
+        if isinstance(message, str):
+            return cls(role, [FakePart(text=message)])
+        parts = []
+        for part in message:
+            if "function_response" in part:
+                parts.append(FakePart(function_response=FakeFunctionResponse(**part["function_response"])))
+            elif "function_call" in part:
+                parts.append(FakePart(function_call=FakeFunctionCall(**part["function_call"])))
+            else:
+                parts.append(FakePart(text=part.get("text", "")))
+        return cls(role, parts)
+
+
+class FakeUsage:
+    def __init__(self, prompt: int, candidates: int):
+        self.prompt_token_count = prompt
+        self.candidates_token_count = candidates
+        self.total_token_count = prompt + candidates
+
+
+class _Candidate:
+    def __init__(self, content: FakeContent):
+        self.content = content
+
+
+class FakeResponse:
+    def __init__(self, content: FakeContent, usage: FakeUsage):
+        self.candidates = [_Candidate(content)]
+        self.usage_metadata = usage
+
+
+class FakeStreamResponse:
+    """
+    Iterates (sync or async) over one chunk per text word (or one function-call chunk),
+    like a streamed reply.
+    """
+
+    def __init__(self, content: FakeContent, usage: FakeUsage, chunk_delay: float):
+        self._content = content
+        self._chunk_delay = chunk_delay
+        self.usage_metadata = usage
+
+    def _chunks(self):
+        """(delay before the chunk, chunk) pairs."""
+        for part in self._content.parts:
+            if part.function_call.name:
+                yield 0.0, FakeResponse(FakeContent("model", [part]), self.usage_metadata)
+                continue
+            words = part.text.split(" ")
+            for i, word in enumerate(words):
+                yield self._chunk_delay, FakeResponse(FakeContent("model", [FakePart(text=word + (" " if i < len(words) - 1 else ""))]), self.usage_metadata)
+
+    def __iter__(self):
+        for delay, chunk in self._chunks():
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    async def __aiter__(self):
+        for delay, chunk in self._chunks():
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+def content_dict(content: FakeContent) -> dict:
+    parts = []
+    for part in content.parts:
+        if part.function_call.name:
+            parts.append({"function_call": FakeFunctionCall.to_dict(part.function_call)})
+        elif part.function_response.name:
+            parts.append({"function_response": FakeFunctionResponse.to_dict(part.function_response)})
+        else:
+            parts.append({"text": part.text})
+    return {"role": content.role, "parts": parts}
+
+
+class ScriptedChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = [FakeContent.from_message(c["role"], c) if isinstance(c, dict) else c for c in history or []]
+        self._script = None
+        self._turn = 0
+
+    def _reply(self, message) -> FakeContent:
+        self.history.append(FakeContent.from_message("user", message))
+        if isinstance(message, str):
+            self._script = self.model.script_for(message)
+            self._turn = 0
+        if self.model.latency:
+            time.sleep(self.model.latency)
+        step = self._script[self._turn] if self._turn < len(self._script) else "Done."
+        self._turn += 1
+        if isinstance(step, str):
+            content = FakeContent("model", [FakePart(text=step)])
+        else:
+            content = FakeContent("model", [
+                FakePart(text=call) if isinstance(call, str) else FakePart(function_call=FakeFunctionCall(call[0], dict(call[1])))
+                for call in step
+            ])
+        self.history.append(content)
+        return content
+
+    def _usage(self, content) -> FakeUsage:
+        prompt = sum(len(json.dumps(content_dict(c), default=str)) for c in self.history[:-1]) // 4
+        return FakeUsage(prompt, len(json.dumps(content_dict(content), default=str)) // 4)
+
+    def send_message(self, message, stream: bool = False):
+        content = self._reply(message)
+        usage = self._usage(content)
+        if stream:
+            return FakeStreamResponse(content, usage, self.model.chunk_delay)
+        return FakeResponse(content, usage)
+
+    async def send_message_async(self, message, stream: bool = False):
+        return await asyncio.to_thread(self.send_message, message, stream)
+
+
+class ScriptedModel:
+    """
+    Stand-in for genai.GenerativeModel. `scripts` maps a prompt prefix to a list of steps;
+    each step is either a list of (tool_name, args) calls for one turn (optionally led by text
+    strings, e.g. "Let me check..."), or the final text.
+    Prompts matching no prefix are answered directly with `default_answer`.
+    """
+
+    def __init__(self, scripts: dict, latency: float = 0.0, chunk_delay: float = 0.0,
+                 default_answer: str = "Hello! How can I help you today?"):
+        self.scripts = scripts
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.default_answer = default_answer
+
+    def script_for(self, prompt: str) -> list:
+        for prefix, script in self.scripts.items():
+            if prompt.startswith(prefix):
+                return script
+        return [self.default_answer]
+
+    def start_chat(self, history=None):
+        return ScriptedChat(self, history)
+
+
+# --- Embeddings ---
+
+def fake_embed(text: str, dim: int = 256) -> np.ndarray:
+    """Deterministic hashed bag-of-words embedding, so similar prompts get similar vectors."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in text.lower().split():
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % dim] += 1.0
+    return vector
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+
+import pytest
+
+# The app needs the full web dependency set (fastapi, supabase, google-generativeai)
+gemini_asgi = pytest.importorskip("gemini_asgi")
+from fastapi.testclient import TestClient
+
+import chat_store
+import gemini
+from chat_sessions import ChatSession
+from tests.fakes import InMemorySupabase, ScriptedModel
+from tests.test_streaming import parse_events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = TestClient(gemini_asgi.app)
+    client.stored = []
+    monkeypatch.setattr(gemini, "ANSWER_CACHE_ENABLED", False)
+    monkeypatch.setattr(gemini_asgi, "store_chat", lambda prompt, text: client.stored.append((prompt, text)))
+    return client
+
+
+def test_tool_calls_of_one_turn_run_concurrently_on_the_asgi_pool(client, monkeypatch, override_tool):
+    both_running = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def get_current_weather(location):
+        threads.append(threading.current_thread().name)
+        both_running.wait()
+        return {"area": location, "forecast": "Cloudy"}
+
+    override_tool("get_current_weather", get_current_weather)
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({"Weather": [
+        [("get_current_weather", {"location": "Bedok"}), ("get_current_weather", {"location": "Tampines"})],
+        "Cloudy in Bedok and Tampines.",
+    ]}))
+
+    response = client.post("/gemini-response", json={"text": "Weather in Bedok and Tampines?"})
+
+    assert response.json()["result"] == "Cloudy in Bedok and Tampines."
+    assert len(threads) == 2
+    assert all(name.startswith("asgi-tool") for name in threads)
+    assert client.stored == [("Weather in Bedok and Tampines?", "Cloudy in Bedok and Tampines.")]
+
+
+def test_tool_calls_record_their_wait_for_a_pool_thread(client, monkeypatch, override_tool):
+    override_tool("get_current_weather", lambda location: {"area": location, "forecast": "Cloudy"})
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({"Weather": [
+        [("get_current_weather", {"location": "Bedok"}), ("get_current_weather", {"location": "Tampines"})],
+        "Cloudy.",
+    ]}))
+    before = gemini_asgi.TOOL_QUEUE_SECONDS.count(pool="asgi")
+
+    client.post("/gemini-response", json={"text": "Weather in Bedok and Tampines?"})
+
+    assert gemini_asgi.TOOL_QUEUE_SECONDS.count(pool="asgi") == before + 2
+
+
+def test_answers_without_tools(client, monkeypatch):
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({}))
+
+    response = client.post("/gemini-response", json={"text": "Hello"})
+
+    assert response.json()["result"] == "Hello! How can I help you today?"
+
+
+def test_session_id_continues_the_chat(client, monkeypatch):
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({}))
+
+    first = client.post("/gemini-response", json={"text": "Hello"}).json()
+    second = client.post("/gemini-response", json={"text": "Hello again", "session_id": first["session_id"]}).json()
+
+    assert second["session_id"] == first["session_id"]
+    session = gemini_asgi.chat_sessions.get_or_create(first["session_id"])
+    assert session.turns == 2
+
+
+def test_stream_route_sends_server_sent_events(client, monkeypatch, override_tool):
+    threads = []
+
+    def get_current_weather(location):
+        threads.append(threading.current_thread().name)
+        return {"area": location, "forecast": "Cloudy"}
+
+    override_tool("get_current_weather", get_current_weather)
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({"Weather": [
+        ["Let me check.", ("get_current_weather", {"location": "Bedok"}), ("get_current_weather", {"location": "Tampines"})],
+        "Cloudy in Bedok and Tampines.",
+    ]}))
+
+    response = client.post("/gemini-response/stream", json={"text": "Weather in Bedok and Tampines?"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    events = parse_events(response.text)
+    names = [event for event, _ in events]
+    streamed = "".join(data["text"] for event, data in events if event == "token")
+    assert names[0] == "start" and names[-1] == "done"
+    assert names.count("tool_start") == names.count("tool_end") == 2
+    assert names.index("tool_end") > names.index("tool_start")
+    assert streamed == "Let me check.Cloudy in Bedok and Tampines."
+    assert events[-1][1]["result"] == streamed
+    assert all(name.startswith("asgi-tool") for name in threads)
+    assert client.stored == [("Weather in Bedok and Tampines?", streamed)]
+
+
+def test_stream_releases_the_session_lock(client, monkeypatch):
+    monkeypatch.setattr(gemini_asgi, "model", ScriptedModel({}))
+    session = ChatSession("s1")
+
+    async def consume():
+        return "".join([event async for event in gemini_asgi.stream_conversation_with_tools_async("Hello", session)])
+
+    events = parse_events(asyncio.run(consume()))
+
+    assert events[-1][0] == "done"
+    assert not session.async_lock.locked()
+    assert session.turns == 1
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    db = InMemorySupabase()
+    monkeypatch.setattr(chat_store, "_supabase", db)
+    return db
+
+
+def test_chat_history_pages_and_revalidates_with_etag(client, supabase):
+    chat_store.SupabaseChatBackend().insert_pairs([("a", "A"), ("b", "B")])
+
+    first = client.get("/chat-history?limit=1")
+    unchanged = client.get("/chat-history?limit=1", headers={"If-None-Match": first.headers["etag"]})
+    chat_store.SupabaseChatBackend().insert_pairs([("c", "C")])
+    changed = client.get("/chat-history?limit=1", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200
+    assert first.headers["etag"].startswith('W/"')
+    assert [entry["text"] for entry in first.json()["history"]] == ["b", "B"]
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
+    assert [entry["text"] for entry in changed.json()["history"]] == ["c", "C"]
+
+
+def test_chat_history_rejects_a_bad_cursor(client, supabase):
+    response = client.get("/chat-history?before=latest")
+
+    assert response.status_code == 400
+    assert response.json()["error"] == "InvalidCursor"
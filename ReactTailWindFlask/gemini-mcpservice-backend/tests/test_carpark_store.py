@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from tests.fakes import make_carpark_payload
+from tools import carkpark_availability_tool
+from tools.carpark_store import CarparkAvailabilityStore, get_carpark_store
+from tools.snapshot_cache import SnapshotCache
+
+
+def snapshot(timestamp="2025-01-01T08:00:00+08:00"):
+    return {"items": [{"timestamp": timestamp, "carpark_data": [
+        {"carpark_number": "HE12", "update_datetime": "2025-01-01T07:59:00", "carpark_info": [
+            {"total_lots": "100", "lot_type": "C", "lots_available": "40"},
+            {"total_lots": "20", "lot_type": "Y", "lots_available": "5"},
+        ]},
+        {"carpark_number": "HLM", "update_datetime": "2025-01-01T07:58:00", "carpark_info": [
+            {"total_lots": "300", "lot_type": "C", "lots_available": "250"},
+        ]},
+        {"carpark_number": "BM29", "update_datetime": "2025-01-01T07:57:00", "carpark_info": [
+            {"total_lots": "50", "lot_type": "C", "lots_available": "0"},
+            {"total_lots": "10", "lot_type": "H", "lots_available": ""},
+        ]},
+    ]}]}
+
+
+@pytest.fixture
+def store():
+    return CarparkAvailabilityStore.from_snapshot(snapshot())
+
+
+def keys(rows):
+    return [(row["carpark_number"], row["lot_type"]) for row in rows]
+
+
+def test_rows_are_flattened_per_lot_type(store):
+    rows, total = store.query()
+
+    assert len(store) == total == 5
+    assert keys(rows) == [("HLM", "C"), ("HE12", "C"), ("HE12", "Y"), ("BM29", "C"), ("BM29", "H")]
+    assert rows[0] == {"carpark_number": "HLM", "lot_type": "C", "total_lots": 300, "lots_available": 250,
+                       "update_datetime": "2025-01-01T07:58:00"}
+
+
+def test_carpark_numbers_match_case_insensitively(store):
+    rows, total = store.query(carpark_numbers=["he12", "BM29"])
+
+    assert total == 4
+    assert {row["carpark_number"] for row in rows} == {"HE12", "BM29"}
+
+
+def test_filters_combine(store):
+    rows, total = store.query(lot_type="c", min_available=1)
+
+    assert keys(rows) == [("HLM", "C"), ("HE12", "C")]
+    assert total == 2
+
+
+def test_top_n_truncates_but_total_counts_every_match(store):
+    rows, total = store.query(lot_type="C", top_n=1)
+
+    assert keys(rows) == [("HLM", "C")]
+    assert total == 3
+
+
+@pytest.mark.parametrize("top_n", [0, -2])
+def test_top_n_below_one_is_rejected(store, top_n):
+    with pytest.raises(ValueError):
+        store.query(top_n=top_n)
+
+
+def test_store_is_memoised_per_snapshot_timestamp():
+    first = get_carpark_store(snapshot("2025-01-01T09:00:00+08:00"))
+
+    assert get_carpark_store(snapshot("2025-01-01T09:00:00+08:00")) is first
+    assert get_carpark_store(snapshot("2025-01-01T09:01:00+08:00")) is not first
+
+
+@pytest.fixture
+def carpark_tool(monkeypatch):
+    payload = make_carpark_payload(random.Random(5), carparks=300)
+    monkeypatch.setattr(carkpark_availability_tool, "snapshot_cache", SnapshotCache())
+    monkeypatch.setattr(carkpark_availability_tool, "_fetch_carpark_availability", lambda params: payload)
+    return carkpark_availability_tool.get_carpark_availability
+
+
+def test_tool_returns_the_default_top_rows(carpark_tool):
+    result = carpark_tool()
+
+    assert len(result["carparks"]) == carkpark_availability_tool.DEFAULT_TOP_N
+    assert result["total_matches"] > carkpark_availability_tool.DEFAULT_TOP_N
+    available = [row["lots_available"] for row in result["carparks"]]
+    assert available == sorted(available, reverse=True)
+
+
+def test_tool_returns_every_row_of_requested_carparks(carpark_tool):
+    numbers = [f"CP{i:04d}" for i in range(30)]
+
+    result = carpark_tool(carpark_numbers=numbers)
+
+    assert len(result["carparks"]) == result["total_matches"] >= 30
+    assert {row["carpark_number"] for row in result["carparks"]} == set(numbers)
+
+
+@pytest.mark.parametrize("top_n", [0, -1])
+def test_tool_rejects_top_n_below_one(carpark_tool, top_n):
+    result = carpark_tool(top_n=top_n)
+
+    assert result["error"] == "InvalidArgument"
+    assert "carparks" not in result
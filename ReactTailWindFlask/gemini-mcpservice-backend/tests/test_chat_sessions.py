@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from chat_sessions import ChatSession, ChatSessionStore, digest_tool_result, TOOL_DIGEST_MAX_CHARS
+from tests.fakes import FakeContent
+
+
+def exchange(prompt: str, answer: str, tool_result=None) -> list:
+    contents = [{"role": "user", "parts": [{"text": prompt}]}]
+    if tool_result is not None:
+        contents += [
+            {"role": "model", "parts": [{"function_call": {"name": "get_taxi_availability", "args": {}}}]},
+            {"role": "user", "parts": [{"function_response": {"name": "get_taxi_availability",
+                                                              "response": {"content": tool_result}}}]},
+        ]
+    return contents + [{"role": "model", "parts": [{"text": answer}]}]
+
+
+def test_bulky_tool_results_are_digested():
+    session = ChatSession("s")
+    bulky = {"result": {"taxis": [[103.8 + i / 1000, 1.3] for i in range(2000)]}}
+
+    session._store(exchange("Taxis?", "Many.", bulky), token_budget=100_000)
+
+    content = session.history[2]["parts"][0]["function_response"]["response"]["content"]
+    assert content["original_chars"] == len(json.dumps(bulky))
+    assert len(json.dumps(content)) < 2 * TOOL_DIGEST_MAX_CHARS
+    assert digest_tool_result(content) is content  # already digested stays as is
+
+
+def test_small_tool_results_are_kept_verbatim():
+    small = {"result": {"area": "Tampines", "forecast": "Cloudy"}}
+
+    assert digest_tool_result(small) is small
+
+
+def test_history_is_trimmed_to_budget_with_a_recap():
+    session = ChatSession("s")
+    for i in range(30):
+        session.record_exchange(f"Question {i} " + "padding " * 20, f"Answer {i} " + "padding " * 20, token_budget=400)
+
+    history = session.gemini_history()
+    assert session.turns == 30
+    assert sum(len(json.dumps(content)) for content in session.history) // 4 <= 400
+    assert history[0]["parts"][0]["text"].startswith("(Context) Earlier in this conversation I asked:")
+    assert history[-1]["parts"][0]["text"].startswith("Answer 29")
+    assert len(session.recap_prompts) <= 10
+
+
+def test_update_drops_the_recap_pair_before_storing():
+    session = ChatSession("s")
+    session.recap_prompts = ["An earlier question"]
+    session.history = exchange("Q1", "A1")
+
+    chat_history = [FakeContent.from_message(c["role"], c) for c in session.gemini_history() + exchange("Q2", "A2")]
+    session.update(chat_history, token_budget=100_000)
+
+    assert [c["parts"][0]["text"] for c in session.history if c["role"] == "user"] == ["Q1", "Q2"]
+
+
+def test_store_evicts_idle_and_least_recently_used_sessions(monkeypatch):
+    import chat_sessions
+    now = [0.0]
+    monkeypatch.setattr(chat_sessions.time, "monotonic", lambda: now[0])
+    store = ChatSessionStore(ttl=60, max_sessions=2)
+
+    a = store.get_or_create()
+    b = store.get_or_create()
+    assert store.get_or_create(a.id) is a
+    store.get_or_create()  # evicts b, the least recently used
+    assert store.get_or_create(b.id) is not b
+
+    now[0] += 61
+    assert store.get_or_create(a.id) is not a
+
+
+def test_only_first_turn_answers_are_cached(offline_gemini):
+    cache = offline_gemini.enable_answer_cache()
+    offline_gemini.script({})
+    session = ChatSession("s")
+
+    offline_gemini.gemini.run_conversation_with_tools("What can you do?", session)
+    offline_gemini.gemini.run_conversation_with_tools("And what about tomorrow?", session)
+
+    assert cache.stats()["stores"] == 1
+    assert cache.lookup("And what about tomorrow?")[0] is None
+
+
+def test_cancelled_asgi_request_does_not_hold_the_session_lock():
+    import gemini_asgi
+    from chat_sessions import chat_sessions
+
+    async def scenario():
+        session = chat_sessions.get_or_create()
+        await session.async_lock.acquire()
+        waiting = asyncio.ensure_future(gemini_asgi.get_response(gemini_asgi.UserInput(text="hi", session_id=session.id)))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        session.async_lock.release()
+        return session.async_lock.locked()
+
+    assert asyncio.run(scenario()) is False
@@ -0,0 +1,88 @@
+import pytest
+
+import chat_store
+from tests.fakes import InMemorySupabase
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    db = InMemorySupabase()
+    monkeypatch.setattr(chat_store, "_supabase", db)
+    return db
+
+
+def store(*pairs):
+    chat_store.SupabaseChatBackend().insert_pairs(list(pairs))
+
+
+def test_history_pages_back_from_the_newest_prompt(supabase):
+    store(*[(f"prompt {i}", f"answer {i}") for i in range(5)])
+
+    newest = chat_store.fetch_history_page(limit=2)
+    older = chat_store.fetch_history_page(limit=2, before=newest["next_cursor"])
+
+    assert [entry["text"] for entry in newest["history"]] == ["prompt 3", "answer 3", "prompt 4", "answer 4"]
+    assert [entry["text"] for entry in older["history"]] == ["prompt 1", "answer 1", "prompt 2", "answer 2"]
+    assert newest["latest_id"] == 5
+
+
+def test_since_returns_only_newer_prompts(supabase):
+    store(("a", "A"), ("b", "B"), ("c", "C"))
+
+    page = chat_store.fetch_history_page(since="1")
+
+    assert [entry["text"] for entry in page["history"] if entry["role"] == "user"] == ["b", "c"]
+    assert page["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursors", [{"before": "abc"}, {"before": "-1"}, {"since": "yesterday"}, {"since": "1; drop"}])
+def test_malformed_cursors_are_rejected(supabase, cursors):
+    with pytest.raises(chat_store.InvalidHistoryCursor):
+        chat_store.fetch_history_page(**cursors)
+
+
+def test_iso_timestamp_is_a_valid_since_cursor():
+    assert chat_store.parse_history_cursors(since="2025-01-01T00:00:00Z") == (None, "2025-01-01T00:00:00Z")
+    assert chat_store.parse_history_cursors(before="7", since="3") == (7, 3)
+
+
+def test_history_version_changes_on_inserts_and_deletes(supabase):
+    empty = chat_store.history_version()
+    store(("a", "A"), ("b", "B"))
+    after_insert = chat_store.history_version()
+    supabase.delete("chatbot_responses", 1)
+    after_delete = chat_store.history_version()
+    supabase.table("user_prompts").insert([{"prompt_text": "response pending"}]).execute()
+    after_lone_prompt = chat_store.history_version()
+
+    assert len({empty, after_insert, after_delete, after_lone_prompt}) == 4
+
+
+def test_history_version_avoids_exact_counts(supabase):
+    store(("a", "A"))
+
+    chat_store.history_version()
+
+    assert supabase.count_modes == ["estimated", "estimated"]
+
+
+def test_chat_history_route_returns_400_for_bad_cursor(supabase, offline_gemini):
+    client = offline_gemini.gemini.app.test_client()
+
+    response = client.get("/chat-history?before=latest")
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "InvalidCursor"
+
+
+def test_chat_history_route_revalidates_with_etag(supabase, offline_gemini):
+    client = offline_gemini.gemini.app.test_client()
+    store(("a", "A"))
+    first = client.get("/chat-history?limit=10")
+
+    unchanged = client.get("/chat-history?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+    store(("b", "B"))
+    changed = client.get("/chat-history?limit=10", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert unchanged.status_code == 304
+    assert changed.status_code == 200
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from chat_store import ChatWriteQueue, InMemoryChatBackend
+
+
+class BlockingBackend(InMemoryChatBackend):
+    """Holds every insert until `release` is set, so the queue can be filled behind it."""
+
+    def __init__(self):
+        super().__init__()
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def insert_pairs(self, pairs):
+        self.entered.set()
+        self.release.wait(5)
+        super().insert_pairs(pairs)
+
+
+class FailingBackend:
+    def insert_pairs(self, pairs):
+        raise ConnectionError("supabase is down")
+
+
+def prompts(backend) -> list:
+    return [row["prompt_text"] for row in backend.user_prompts]
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_drain_thread_writes_in_batches():
+    backend = InMemoryChatBackend()
+    writes = ChatWriteQueue(backend, batch_size=4, flush_interval=0.01)
+
+    for i in range(10):
+        assert writes.put(f"p{i}", f"r{i}")
+    wait_until(lambda: writes.written == 10)
+
+    assert prompts(backend) == [f"p{i}" for i in range(10)]
+    assert 3 <= backend.insert_calls <= 10
+    writes.close()
+
+
+def test_full_queue_drops_and_counts():
+    backend = BlockingBackend()
+    writes = ChatWriteQueue(backend, maxsize=2, batch_size=1, flush_interval=0.01)
+
+    writes.put("p0", "r0")
+    assert backend.entered.wait(5)  # the drain thread holds p0 in a blocked insert
+    assert writes.put("p1", "r1")
+    assert writes.put("p2", "r2")
+    assert not writes.put("p3", "r3")
+
+    assert writes.stats()["dropped"] == 1
+    backend.release.set()
+    writes.close()
+    assert prompts(backend) == ["p0", "p1", "p2"]
+
+
+def test_close_drains_remaining_pairs_in_order():
+    backend = BlockingBackend()
+    writes = ChatWriteQueue(backend, batch_size=3, flush_interval=0.01)
+
+    writes.put("p0", "r0")
+    assert backend.entered.wait(5)
+    for i in range(1, 8):
+        writes.put(f"p{i}", f"r{i}")
+    backend.release.set()
+    writes.close()
+
+    assert prompts(backend) == [f"p{i}" for i in range(8)]
+    assert writes.stats() == {"queued": 0, "written": 8, "dropped": 0, "failed": 0}
+
+
+def test_flush_writes_queued_pairs_synchronously(monkeypatch):
+    backend = InMemoryChatBackend()
+    writes = ChatWriteQueue(backend, batch_size=2)
+    monkeypatch.setattr(writes, "_ensure_started", lambda: None)  # no drain thread
+
+    for i in range(5):
+        writes.put(f"p{i}", f"r{i}")
+    assert writes.stats()["queued"] == 5
+    writes.flush()
+
+    assert prompts(backend) == [f"p{i}" for i in range(5)]
+    assert backend.insert_calls == 3
+
+
+def test_failed_writes_are_counted_not_raised():
+    writes = ChatWriteQueue(FailingBackend(), flush_interval=0.01)
+
+    writes.put("p0", "r0")
+    writes.close()
+
+    assert writes.stats()["failed"] == 1
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("deepsearcher")
+from deepsearcher.vector_db import RetrievalResult
+
+from tools.deepsearch_rerank import ConcurrentRerankDeepSearch, cosine_similarities
+
+QUERY_VECTOR = np.array([1.0, 0.0, 0.0])
+
+
+def chunk(name: str, similarity: float) -> RetrievalResult:
+    """A chunk whose embedding has the given cosine similarity to QUERY_VECTOR."""
+    embedding = np.array([similarity, np.sqrt(1 - similarity ** 2), 0.0])
+    return RetrievalResult(embedding=embedding, text=name, reference=f"{name}.pdf", metadata={})
+
+
+class FakeLLM:
+    """Accepts chunks whose text starts with 'good'; records the chunks it was asked about."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.asked = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def chat(self, messages):
+        content = messages[0]["content"]
+        text = content[content.index("<chunk>") + len("<chunk>"):content.index("</chunk>")]
+        with self._lock:
+            self.asked.append(text)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(content="YES" if text.startswith("good") else "NO", total_tokens=10)
+
+    @staticmethod
+    def remove_think(content: str) -> str:
+        return content
+
+
+class FakeVectorDB:
+    def __init__(self, results: dict):
+        self.results = results  # collection -> retrieved chunks
+
+    def list_collections(self, dim):
+        return [SimpleNamespace(collection_name=name) for name in self.results]
+
+    def search_data(self, collection, vector, query_text):
+        return self.results[collection]
+
+
+def agent(results: dict, llm: FakeLLM, **kwargs) -> ConcurrentRerankDeepSearch:
+    embedding_model = SimpleNamespace(dimension=3, embed_query=lambda text: QUERY_VECTOR)
+    return ConcurrentRerankDeepSearch(llm=llm, embedding_model=embedding_model, vector_db=FakeVectorDB(results),
+                                      route_collection=False, **kwargs)
+
+
+def test_cosine_similarities_ignore_vector_length():
+    results = [chunk("a", 0.9), chunk("b", 0.5)]
+    results[0].embedding = results[0].embedding * 10
+
+    np.testing.assert_allclose(cosine_similarities(QUERY_VECTOR, results), [0.9, 0.5], rtol=1e-5)
+
+
+def test_chunks_below_the_cutoff_never_reach_the_llm():
+    llm = FakeLLM()
+    search = agent({"reports": [chunk("good-close", 0.9), chunk("bad-close", 0.8), chunk("good-far", 0.6)]}, llm,
+                   min_vector_similarity=0.75)
+
+    accepted, tokens = asyncio.run(search._search_chunks_from_vectordb("emissions", []))
+
+    assert sorted(llm.asked) == ["bad-close", "good-close"]
+    assert [result.text for result in accepted] == ["good-close"]
+    assert tokens == 20
+
+
+def test_reranks_run_concurrently_up_to_the_limit():
+    llm = FakeLLM(delay=0.05)
+    results = {f"c{i}": [chunk(f"good-{i}-{j}", 0.9) for j in range(4)] for i in range(3)}
+    search = agent(results, llm, rerank_concurrency=3)
+
+    started = time.perf_counter()
+    accepted, _ = asyncio.run(search._search_chunks_from_vectordb("emissions", []))
+    elapsed = time.perf_counter() - started
+
+    assert len(accepted) == 12
+    assert llm.max_in_flight == 3
+    assert elapsed < 12 * 0.05
@@ -0,0 +1,194 @@
+import inspect
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+# Needs the deepsearcher runtime dependencies (firecrawl, pymilvus, ...) to be installed
+deepsearcher_ingest = pytest.importorskip("tools.deepsearcher_ingest")
+from langchain_core.documents import Document
+
+from tools.text_splitter import split_docs_to_chunks
+
+CHUNK_SIZE = 60
+
+
+class FakeMilvusClient:
+    """
+    The subset of MilvusClient used by incremental ingestion: paged query and delete by
+    reference or id. Like Milvus, a query without a limit is rejected beyond `max_query_window` rows.
+    """
+
+    def __init__(self, rows: dict, max_query_window: int = 16384):
+        self.rows = rows
+        self.max_query_window = max_query_window
+        self.queries = 0
+
+    def query(self, collection_name, filter, output_fields, limit=None, offset=0):
+        self.queries += 1
+        reference = json.loads(re.fullmatch(r"reference == (.*)", filter).group(1))
+        matches = [{"id": row_id, "metadata": row["metadata"]} for row_id, row in sorted(self.rows.items())
+                   if row["reference"] == reference]
+        if limit is None:
+            if len(matches) > self.max_query_window:
+                raise ValueError("query result exceeds the window, set a limit")
+            return matches
+        assert offset + limit <= self.max_query_window
+        return matches[offset:offset + limit]
+
+    def delete(self, collection_name, ids=None, filter=None):
+        if ids is not None:
+            for row_id in ids:
+                self.rows.pop(row_id, None)
+            return {"delete_count": len(ids)}
+        keep = json.loads(re.fullmatch(r"reference not in (.*)", filter).group(1))
+        doomed = [row_id for row_id, row in self.rows.items() if row["reference"] not in keep]
+        for row_id in doomed:
+            del self.rows[row_id]
+        return {"delete_count": len(doomed)}
+
+
+class FakeVectorDB:
+    def __init__(self):
+        self.rows = {}
+        self.client = FakeMilvusClient(self.rows)
+        self.fail_after_batches = None  # raise on insert once this many batches went in
+        self.batches = 0
+        self._next_id = 0
+
+    def insert_data(self, collection, chunks):
+        if self.fail_after_batches is not None and self.batches >= self.fail_after_batches:
+            raise RuntimeError("insert rejected")
+        self.batches += 1
+        for chunk in chunks:
+            self._next_id += 1
+            self.rows[self._next_id] = {"reference": chunk.reference, "text": chunk.text, "metadata": dict(chunk.metadata)}
+
+    def texts(self, reference):
+        return sorted(row["text"] for row in self.rows.values() if row["reference"] == reference)
+
+
+class FakeEmbedding:
+    dimension = 4
+
+    def __init__(self):
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return [[0.0] * self.dimension for _ in texts]
+
+
+@pytest.fixture
+def runtime(monkeypatch, tmp_path):
+    configuration = SimpleNamespace(vector_db=FakeVectorDB(), embedding_model=FakeEmbedding())
+    monkeypatch.setattr(deepsearcher_ingest, "deepsearcher_runtime", SimpleNamespace(get=lambda: configuration))
+    configuration.manifest = deepsearcher_ingest.IngestManifest(str(tmp_path / "manifest.sqlite3"))
+    return configuration
+
+
+def document(reference: str, paragraphs: list) -> Document:
+    return Document(page_content="\n\n".join(paragraphs), metadata={"reference": reference})
+
+
+def expected_texts(doc: Document) -> list:
+    return sorted({chunk.text for chunk in split_docs_to_chunks([doc], chunk_size=CHUNK_SIZE, chunk_overlap=0)})
+
+
+def sync(runtime, docs, **kwargs):
+    pipeline = deepsearcher_ingest.IngestPipeline(
+        "kb", chunk_size=CHUNK_SIZE, chunk_overlap=0, batch_size=2, embed_workers=1,
+        embed_requests_per_minute=0, incremental=True, manifest=runtime.manifest, **kwargs,
+    )
+    return pipeline.run([[doc] for doc in docs])["sync"]
+
+
+PARAGRAPHS = [f"Paragraph {i} of the sustainability report, about topic {i}." for i in range(8)]
+
+
+def test_unchanged_document_skips_splitting_and_embedding(runtime):
+    doc = document("report.pdf", PARAGRAPHS)
+    sync(runtime, [doc])
+    embedded = runtime.embedding_model.texts
+
+    result = sync(runtime, [doc])
+
+    assert result["unchanged_documents"] == 1 and result["new_chunks"] == 0
+    assert runtime.embedding_model.texts == embedded
+    assert runtime.vector_db.texts("report.pdf") == expected_texts(doc)
+
+
+def test_changed_document_keeps_unchanged_chunks_and_then_hits_the_fast_path(runtime):
+    sync(runtime, [document("report.pdf", PARAGRAPHS)])
+    changed = document("report.pdf", PARAGRAPHS[:-1] + ["A rewritten final paragraph with new numbers."])
+
+    first = sync(runtime, [changed])
+    second = sync(runtime, [changed])
+
+    assert first["changed_documents"] == 1 and first["kept_chunks"] > 0 and first["deleted_chunks"] > 0
+    assert runtime.vector_db.texts("report.pdf") == expected_texts(changed)
+    # Kept chunks still carry the old doc_hash; the manifest makes the next run a no-op anyway
+    assert second["unchanged_documents"] == 1 and second["new_chunks"] == 0
+
+
+def test_failed_inserts_never_lose_content_and_are_resumed(runtime):
+    original = document("report.pdf", PARAGRAPHS)
+    sync(runtime, [original])
+    rewritten = document("report.pdf", [p.replace("Paragraph", "Section") for p in PARAGRAPHS])
+    runtime.vector_db.fail_after_batches = runtime.vector_db.batches + 1
+
+    with pytest.raises(RuntimeError):
+        sync(runtime, [rewritten])
+
+    # Every old chunk is still there next to the few new ones that made it in
+    assert set(expected_texts(original)) <= set(runtime.vector_db.texts("report.pdf"))
+
+    runtime.vector_db.fail_after_batches = None
+    resumed = sync(runtime, [rewritten])
+    assert resumed["changed_documents"] == 1
+    assert runtime.vector_db.texts("report.pdf") == expected_texts(rewritten)
+    assert sync(runtime, [rewritten])["unchanged_documents"] == 1
+
+
+def test_prune_only_when_requested(runtime):
+    sync(runtime, [document("a.pdf", PARAGRAPHS[:2]), document("b.pdf", PARAGRAPHS[2:4])])
+
+    sync(runtime, [document("a.pdf", PARAGRAPHS[:2])])
+    assert runtime.vector_db.texts("b.pdf")
+
+    sync(runtime, [document("a.pdf", PARAGRAPHS[:2])], prune_missing=True)
+    assert runtime.vector_db.texts("b.pdf") == []
+    assert runtime.manifest.get("kb", "b.pdf") is None
+
+
+def test_stream_loaders_do_not_prune_by_default():
+    for loader in (deepsearcher_ingest.stream_load_from_website, deepsearcher_ingest.stream_load_from_local_files):
+        assert inspect.signature(loader).parameters["prune_missing"].default is False
+
+
+def test_existing_rows_are_read_in_pages(runtime, monkeypatch):
+    monkeypatch.setattr(deepsearcher_ingest, "INGEST_QUERY_PAGE_SIZE", 3)
+    doc = document("report.pdf", PARAGRAPHS)
+    sync(runtime, [doc])
+    stored = len(runtime.vector_db.texts("report.pdf"))
+    runtime.vector_db.client.queries = 0
+
+    result = sync(runtime, [doc])
+
+    assert stored > 3
+    assert result["unchanged_documents"] == 1
+    assert result["kept_chunks"] == stored
+    assert runtime.vector_db.client.queries == stored // 3 + 1
+
+
+def test_repeated_reference_in_one_run_is_stored_once(runtime):
+    first = document("report.pdf", PARAGRAPHS[:4])
+    repeat = document("report.pdf", PARAGRAPHS[4:])
+
+    result = sync(runtime, [first, repeat])
+
+    assert result["new_documents"] == 1
+    assert result["duplicate_documents"] == 1
+    assert runtime.vector_db.texts("report.pdf") == expected_texts(first)
+    assert runtime.manifest.get("kb", "report.pdf")[1] == len(expected_texts(first))
@@ -0,0 +1,108 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+# Needs the deepsearcher runtime dependencies (firecrawl, pymilvus, ...) to be installed
+deepsearcher_tool = pytest.importorskip("tools.deepsearcher_tool")
+
+from tools.embedding_cache import EmbeddingCache
+
+
+class FakeMilvusClient:
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.checks = 0
+
+    def list_collections(self):
+        self.checks += 1
+        if not self.healthy:
+            raise ConnectionError("Milvus is down")
+        return []
+
+
+def make_runtime(client):
+    return SimpleNamespace(
+        module_factory=None, llm=None, file_loader=None, web_crawler=None,
+        embedding_model=SimpleNamespace(model="fake", dimension=3),
+        vector_db=SimpleNamespace(client=client),
+        default_searcher=SimpleNamespace(rag_agents=[]),
+        naive_rag=SimpleNamespace(embedding_model=None),
+    )
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Each build takes the next result: a Milvus client to wrap, or an exception to raise."""
+    results = []
+
+    def build_runtime(config):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return make_runtime(result)
+
+    monkeypatch.setattr(deepsearcher_tool, "configuration", SimpleNamespace(**vars(make_runtime(None))))
+    monkeypatch.setattr(deepsearcher_tool, "build_config", lambda: None)
+    monkeypatch.setattr(deepsearcher_tool, "_build_runtime", build_runtime)
+    return results
+
+
+@pytest.fixture
+def make_deepsearcher(tmp_path):
+    runtimes = []
+
+    def make(interval):
+        runtime = deepsearcher_tool.DeepSearcherRuntime(health_check_interval=interval)
+        runtime._embedding_cache = EmbeddingCache(path=str(tmp_path / "embeddings.db"))
+        runtimes.append(runtime)
+        return runtime
+
+    yield make
+    for runtime in runtimes:
+        runtime.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_get_initialises_once_without_health_checks(builds, make_deepsearcher):
+    client = FakeMilvusClient()
+    builds.append(client)
+    runtime = make_deepsearcher(interval=3600)
+
+    configuration = runtime.get()
+    for _ in range(5):
+        runtime.get()
+
+    assert configuration.vector_db.client is client
+    assert client.checks == 0
+    assert builds == []
+
+
+def test_refresher_swaps_in_a_rebuilt_runtime_after_a_failed_check(builds, make_deepsearcher):
+    broken, replacement = FakeMilvusClient(healthy=False), FakeMilvusClient()
+    builds.extend([broken, replacement])
+    runtime = make_deepsearcher(interval=0.01)
+
+    configuration = runtime.get()
+    wait_for(lambda: configuration.vector_db.client is replacement)
+
+    assert broken.checks >= 1
+    assert configuration.default_searcher.rag_agents == []
+    assert configuration.embedding_model.cache is runtime._embedding_cache
+
+
+def test_failed_rebuild_keeps_the_current_runtime(builds, make_deepsearcher):
+    broken = FakeMilvusClient(healthy=False)
+    builds.extend([broken, RuntimeError("no Milvus"), RuntimeError("no Milvus")])
+    runtime = make_deepsearcher(interval=0.01)
+
+    configuration = runtime.get()
+    wait_for(lambda: len(builds) <= 1)
+
+    assert configuration.vector_db.client is broken
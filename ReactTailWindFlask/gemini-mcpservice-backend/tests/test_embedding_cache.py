@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("deepsearcher")
+from tools.embedding_cache import EmbeddingCache, CachedEmbedding
+
+
+class CountingEmbedding:
+    """Minimal deepsearcher embedding model that records every upstream request."""
+
+    model = "counting"
+    dimension = 8
+
+    def __init__(self):
+        self.requests = []
+
+    def embed_query(self, text):
+        self.requests.append([text])
+        return [float(len(text))] * self.dimension
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        return [[float(len(text))] * self.dimension for text in texts]
+
+
+def vector(dim: int = 1536) -> np.ndarray:
+    return np.zeros(dim, dtype=np.float32)
+
+
+def test_memory_lru_is_bounded_by_bytes(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), memory_bytes=3 * vector().nbytes)
+
+    cache.put_many({f"k{i}": vector() for i in range(5)})
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 3
+    assert stats["memory_bytes"] == 3 * vector().nbytes
+
+
+def test_evicted_vectors_are_served_from_sqlite(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), memory_bytes=vector().nbytes)
+    cache.put_many({"old": vector() + 1, "new": vector() + 2})
+
+    found = cache.get_many(["old", "new", "missing"])
+
+    assert set(found) == {"old", "new"}
+    assert float(found["old"][0]) == 1.0
+    assert cache.stats()["memory_bytes"] <= vector().nbytes
+
+
+def test_replacing_a_key_does_not_double_count(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), memory_bytes=10 * vector().nbytes)
+
+    cache.put_many({"k": vector()})
+    cache.put_many({"k": vector()})
+
+    assert cache.stats()["memory_bytes"] == vector().nbytes
+
+
+def test_cached_embedding_dedupes_and_reuses(tmp_path):
+    inner = CountingEmbedding()
+    embedding = CachedEmbedding(inner, EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+
+    first = embedding.embed_documents(["a", "bb", "a"])
+    second = embedding.embed_documents(["bb", "ccc"])
+
+    assert inner.requests == [["a", "bb"], ["ccc"]]
+    assert first[0] == first[2] and second[0] == first[1]
+    assert embedding.embed_query("a") == embedding.embed_query("a")
+    assert inner.requests[-1] == ["a"] and len(inner.requests) == 3
@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+from tools import feed_history
+from tools.feed_history import FeedHistoryStore, get_feed_history, parse_timestamp
+
+BISHAN = (1.35, 103.85)
+NEAR = [103.8505, 1.3505]  # about 80 m from BISHAN, as [lon, lat]
+FAR = [103.95, 1.35]  # about 11 km away
+
+
+def at(minute: int) -> str:
+    return f"2026-01-05T10:{minute:02d}:00+08:00"
+
+
+def taxi_snapshot(minute: int, coordinates: list) -> dict:
+    return {"features": [{"geometry": {"type": "MultiPoint", "coordinates": coordinates},
+                          "properties": {"timestamp": at(minute), "taxi_count": len(coordinates)}}]}
+
+
+def carpark_snapshot(minute: int, lots: dict) -> dict:
+    """`lots` maps (carpark_number, lot_type) to lots available."""
+    carparks = {}
+    for (number, lot_type), available in lots.items():
+        carparks.setdefault(number, []).append({"total_lots": "100", "lot_type": lot_type, "lots_available": str(available)})
+    return {"items": [{"timestamp": at(minute), "carpark_data": [
+        {"carpark_number": number, "carpark_info": info} for number, info in carparks.items()
+    ]}]}
+
+
+def camera_snapshot(minute: int, images: dict) -> dict:
+    """`images` maps camera id to its current image URL."""
+    return {"items": [{"timestamp": at(minute), "cameras": [
+        {"camera_id": camera_id, "image": image, "timestamp": at(minute),
+         "location": {"latitude": 1.3, "longitude": 103.8}}
+        for camera_id, image in images.items()
+    ]}]}
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = FeedHistoryStore(str(tmp_path / "feed_history.sqlite3"))
+    monkeypatch.setattr(feed_history, "_store", store)
+    return store
+
+
+def history(feed: str, **kwargs) -> dict:
+    return get_feed_history(feed, start_time="2026-01-05T10:00:00", end_time="2026-01-05T11:00:00", **kwargs)
+
+
+@pytest.mark.parametrize("values", [["HE12", "HLM", "BM29"], ["", "C"], []])
+def test_packed_strings_round_trip(values):
+    unpacked = feed_history._unpack_strings(feed_history._pack_strings(values))
+
+    assert unpacked.tolist() == values
+
+
+def test_taxi_positions_round_trip_as_float32(store):
+    coordinates = [NEAR, FAR, [103.7, 1.41]]
+    store.record_taxi(taxi_snapshot(0, coordinates))
+
+    [(timestamp, count, blob)] = store.scan("taxi_snapshots", "timestamp, taxi_count, positions", 0, 2**31)
+
+    assert (timestamp, count) == (at(0), 3)
+    np.testing.assert_array_equal(np.frombuffer(blob, dtype=np.float32).reshape(-1, 2),
+                                  np.array(coordinates, dtype=np.float32))
+
+
+def test_a_snapshot_is_recorded_once(store):
+    assert store.record_taxi(taxi_snapshot(0, [NEAR]))
+    assert not store.record_taxi(taxi_snapshot(0, [NEAR]))
+
+
+def test_prune_drops_old_rows_from_every_table(store):
+    for minute in (0, 30):
+        store.record_taxi(taxi_snapshot(minute, [NEAR]))
+        store.record_carpark(carpark_snapshot(minute, {("HE12", "C"): 10}))
+        store.record_cameras(camera_snapshot(minute, {"1001": "a.jpg"}))
+
+    store.prune(int(parse_timestamp(at(15)).timestamp()))
+
+    for table in ("taxi_snapshots", "carpark_snapshots", "camera_snapshots"):
+        assert [row[0] for row in store.scan(table, "timestamp", 0, 2**31)] == [at(30)]
+
+
+def test_taxi_window_totals_and_radius_counts(store):
+    store.record_taxi(taxi_snapshot(0, [NEAR, FAR]))
+    store.record_taxi(taxi_snapshot(10, [NEAR, NEAR, FAR]))
+    store.record_taxi(taxi_snapshot(20, [FAR]))
+
+    total = history("taxi")
+    nearby = history("taxi", latitude=BISHAN[0], longitude=BISHAN[1], radius_m=1000)
+
+    assert total["snapshots"] == 3 and (total["start"], total["end"]) == (at(0), at(20))
+    assert total["stats"] == {"first": 2, "last": 1, "change": -1, "min": 1, "max": 3, "mean": 2.0}
+    assert nearby["metric"] == "taxis_within_1000m"
+    assert [point["value"] for point in nearby["series"]] == [1, 2, 0]
+
+
+def test_taxi_totals_do_not_load_positions(store, monkeypatch):
+    store.record_taxi(taxi_snapshot(0, [NEAR, FAR]))
+    scanned = []
+    scan = store.scan
+    monkeypatch.setattr(store, "scan", lambda table, columns, *args: scanned.append(columns) or scan(table, columns, *args))
+
+    history("taxi")
+    history("taxi", latitude=BISHAN[0], longitude=BISHAN[1])
+
+    assert scanned == ["timestamp, taxi_count", "timestamp, taxi_count, positions"]
+
+
+def test_carpark_window_overall_per_carpark_and_lot_type(store):
+    store.record_carpark(carpark_snapshot(0, {("HE12", "C"): 10, ("HE12", "Y"): 4, ("HLM", "C"): 50}))
+    store.record_carpark(carpark_snapshot(10, {("HE12", "C"): 6, ("HE12", "Y"): 2, ("HLM", "C"): 70}))
+
+    overall = history("carpark")
+    selected = history("carpark", carpark_numbers=["he12", "HLM"])
+    cars_only = history("carpark", carpark_numbers=["HE12"], lot_type="c")
+
+    assert overall["metric"] == "lots_available_all_carparks"
+    assert overall["stats"]["first"] == 64 and overall["stats"]["last"] == 78
+    assert selected["per_carpark"]["HE12"]["first"] == 14 and selected["per_carpark"]["HE12"]["change"] == -6
+    assert selected["per_carpark"]["HLM"]["last"] == 70
+    assert [point["value"] for point in cars_only["series"]] == [10, 6]
+
+
+def test_camera_window_counts_and_deduplicates_repeated_frames(store):
+    store.record_cameras(camera_snapshot(0, {"1001": "a.jpg", "1002": "x.jpg"}))
+    store.record_cameras(camera_snapshot(1, {"1001": "a.jpg"}))
+    store.record_cameras(camera_snapshot(2, {"1001": "b.jpg", "1002": "y.jpg"}))
+
+    result = history("traffic_cameras", camera_id=1001)
+
+    assert [point["value"] for point in result["series"]] == [2, 1, 2]
+    assert [image["image"] for image in result["camera_images"]] == ["a.jpg", "b.jpg"]
+
+
+def test_series_is_downsampled_but_keeps_both_ends(store):
+    for minute in range(40):
+        store.record_taxi(taxi_snapshot(minute, [NEAR] * (minute + 1)))
+
+    result = history("taxi")
+
+    assert len(result["series"]) == feed_history.MAX_SERIES_POINTS
+    assert result["series"][0]["timestamp"] == at(0) and result["series"][-1]["timestamp"] == at(39)
+    assert result["stats"]["max"] == 40
+
+
+@pytest.mark.parametrize("feed, kwargs, error", [
+    ("taxi", {}, "NoHistory"),
+    ("buses", {}, "UnknownFeed"),
+    ("taxi", {"start_time": "yesterday"}, "InvalidTime"),
+])
+def test_errors_are_returned_as_tool_results(store, feed, kwargs, error):
+    assert get_feed_history(feed, **kwargs)["error"] == error
@@ -0,0 +1,134 @@
+import gzip
+import json
+import random
+
+import pytest
+import requests
+
+import geo_layers
+from geo_layers import GeoLayer, GeoLayerSnapshot, LayerUnavailable
+from tests.fakes import make_station_payload
+
+GEOJSON = {"type": "FeatureCollection", "features": [{"type": "Feature", "properties": {"name": "a"}}]}
+
+
+class JsonResponse:
+    def __init__(self, payload, status: int = 200):
+        self.payload = payload
+        self.status_code = status
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+def layer(build, name="test"):
+    # A long interval keeps the background refresher asleep for the whole test
+    return GeoLayer(name, build, refresh_interval=3600)
+
+
+def test_snapshot_is_compact_json_with_a_gzip_copy():
+    snapshot = GeoLayerSnapshot(GEOJSON)
+
+    assert json.loads(snapshot.body) == GEOJSON
+    assert b" " not in snapshot.body
+    assert gzip.decompress(snapshot.gzip_body) == snapshot.body
+    assert snapshot.etag == GeoLayerSnapshot(GEOJSON).etag
+    assert snapshot.etag != GeoLayerSnapshot({"type": "FeatureCollection", "features": []}).etag
+
+
+def test_first_get_builds_once():
+    builds = []
+    geo = layer(lambda: builds.append(1) or GEOJSON)
+
+    first, second = geo.get(), geo.get()
+
+    assert first is second
+    assert builds == [1]
+
+
+def test_failed_refresh_keeps_the_previous_snapshot():
+    results = [GEOJSON, RuntimeError("upstream down")]
+
+    def build():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    geo = layer(build)
+    before = geo.get()
+
+    assert geo.refresh() is False
+    assert geo.get() is before
+
+
+def test_unchanged_refresh_keeps_the_snapshot_object():
+    geo = layer(lambda: dict(GEOJSON))
+    before = geo.get()
+
+    assert geo.refresh() is True
+    assert geo.get() is before
+
+
+def test_layer_that_never_built_is_unavailable():
+    def build():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(LayerUnavailable, match="upstream down"):
+        layer(build).get()
+
+
+def test_dengue_layer_follows_the_poll_download_url(monkeypatch):
+    responses = {"https://example.test/dengue.geojson": JsonResponse(GEOJSON)}
+    monkeypatch.setattr(geo_layers.http_client, "get", lambda url, **kwargs: responses.get(
+        url, JsonResponse({"code": 0, "data": {"url": "https://example.test/dengue.geojson"}})))
+
+    assert geo_layers.build_dengue_geojson() == GEOJSON
+
+
+def test_dengue_poll_download_error_is_raised_as_http_error(monkeypatch):
+    monkeypatch.setattr(geo_layers.http_client, "get", lambda url, **kwargs: JsonResponse({"message": "busy"}, status=503))
+
+    with pytest.raises(requests.HTTPError):
+        geo_layers.build_dengue_geojson()
+
+
+def test_rainfall_layer_skips_stations_without_readings(monkeypatch):
+    payload = make_station_payload(random.Random(1), 5, "S", "mm", 0.0, 2.0)
+    payload["items"][0]["readings"][0]["value"] = None
+    monkeypatch.setattr(geo_layers.http_client, "get", lambda url, **kwargs: JsonResponse(payload))
+
+    geojson = geo_layers.build_rainfall_geojson()
+
+    assert [f["properties"]["stationId"] for f in geojson["features"]] == ["S001", "S002", "S003", "S004"]
+    assert geojson["features"][0]["geometry"]["type"] == "Point"
+
+
+@pytest.fixture
+def client(offline_gemini, monkeypatch):
+    monkeypatch.setattr(offline_gemini.gemini, "dengue_layer", layer(lambda: GEOJSON, "denguecluster"))
+    return offline_gemini.gemini.app.test_client()
+
+
+def test_route_serves_gzip_when_accepted(client):
+    response = client.get("/denguecluster", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data)) == GEOJSON
+
+
+def test_route_answers_304_for_a_matching_etag(client):
+    plain = client.get("/denguecluster")
+    zipped = client.get("/denguecluster", headers={"Accept-Encoding": "gzip"})
+
+    revalidated = client.get("/denguecluster", headers={"If-None-Match": plain.headers["ETag"]})
+
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["ETag"] != zipped.headers["ETag"]
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
@@ -0,0 +1,159 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from requests.adapters import HTTPAdapter
+
+from tools import http_client
+from tools.metrics import UPSTREAM_RESPONSE_BYTES, UPSTREAM_SECONDS
+
+
+class ScriptedServer:
+    """Loopback HTTP server answering each request with the next queued (status, headers)."""
+
+    def __init__(self):
+        self.responses = []
+        self.hits = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                server.hits.append((self.command, time.monotonic()))
+                status, headers = server.responses.pop(0) if server.responses else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/feed"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    server = ScriptedServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_FACTOR", 0)
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_JITTER", 0)
+    monkeypatch.setattr(http_client, "HTTP_MAX_RETRIES", 2)
+    session = http_client._build_session()
+    yield session
+    session.close()
+
+
+def test_retries_5xx_until_success(server, session):
+    server.responses = [(503, {}), (502, {}), (200, {})]
+
+    response = session.get(server.url)
+
+    assert response.status_code == 200
+    assert len(server.hits) == 3
+
+
+def test_returns_last_response_when_retries_run_out(server, session):
+    server.responses = [(503, {})] * 5
+
+    response = session.get(server.url)
+
+    assert response.status_code == 503
+    assert len(server.hits) == 3  # first try + HTTP_MAX_RETRIES
+
+
+def test_honours_retry_after_on_429(server, session):
+    server.responses = [(429, {"Retry-After": "1"}), (200, {})]
+
+    response = session.get(server.url)
+
+    assert response.status_code == 200
+    (_, first), (_, second) = server.hits
+    assert second - first >= 0.9
+
+
+def test_does_not_retry_post(server, session):
+    server.responses = [(503, {}), (200, {})]
+
+    response = session.post(server.url)
+
+    assert response.status_code == 503
+    assert len(server.hits) == 1
+
+
+def test_backoff_uses_jitter(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_JITTER", 0.2)
+
+    retry = http_client._build_session().get_adapter("https://api.data.gov.sg").max_retries
+
+    assert retry.backoff_jitter == 0.2
+    assert retry.respect_retry_after_header
+    assert set(retry.status_forcelist) == {429, 500, 502, 503, 504}
+
+
+@pytest.fixture
+def sent_timeouts(monkeypatch):
+    timeouts = []
+
+    def send(self, request, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        raise ConnectionAbortedError("not sent")
+
+    monkeypatch.setattr(HTTPAdapter, "send", send)
+    return timeouts
+
+
+def test_default_timeout_applies_when_caller_sets_none(sent_timeouts):
+    session = http_client._build_session()
+
+    with pytest.raises(ConnectionAbortedError):
+        session.get("https://api.data.gov.sg/v1/transport/taxi-availability")
+
+    assert sent_timeouts == [(http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT)]
+
+
+def test_caller_timeout_is_kept(sent_timeouts):
+    session = http_client._build_session()
+
+    with pytest.raises(ConnectionAbortedError):
+        session.get("https://api.data.gov.sg/v1/transport/taxi-availability", timeout=2)
+
+    assert sent_timeouts == [2]
+
+
+def test_get_records_duration_and_body_size(server, session, monkeypatch):
+    monkeypatch.setattr(http_client, "_session", session)
+    server.responses = [(503, {}), (200, {})]
+    seconds = UPSTREAM_SECONDS.count(host="127.0.0.1", status="200")
+    sizes = UPSTREAM_RESPONSE_BYTES.count(host="127.0.0.1")
+
+    http_client.get(server.url)
+
+    # One observation per call, with retries included in its duration
+    assert UPSTREAM_SECONDS.count(host="127.0.0.1", status="200") == seconds + 1
+    assert UPSTREAM_RESPONSE_BYTES.count(host="127.0.0.1") == sizes + 1
+
+
+def test_get_records_failed_requests(sent_timeouts, monkeypatch):
+    monkeypatch.setattr(http_client, "_session", http_client._build_session())
+    before = UPSTREAM_SECONDS.count(host="api.data.gov.sg", status="error")
+
+    with pytest.raises(ConnectionAbortedError):
+        http_client.get("https://api.data.gov.sg/v1/transport/taxi-availability")
+
+    assert UPSTREAM_SECONDS.count(host="api.data.gov.sg", status="error") == before + 1
@@ -0,0 +1,62 @@
+import pytest
+
+from tools.metrics import HTTP_REQUEST_SECONDS, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("job_seconds", "Job time.", ["kind"], buckets=[0.1, 1])
+
+    histogram.observe(0.05, kind="a")
+    histogram.observe(0.5, kind="a")
+    histogram.observe(5, kind="a")
+
+    lines = registry.render().splitlines()
+    assert 'job_seconds_bucket{kind="a",le="0.1"} 1' in lines
+    assert 'job_seconds_bucket{kind="a",le="1.0"} 2' in lines
+    assert 'job_seconds_bucket{kind="a",le="+Inf"} 3' in lines
+    assert 'job_seconds_count{kind="a"} 3' in lines
+
+
+def test_counter_rejects_unknown_labels():
+    counter = MetricsRegistry().counter("jobs_total", "Jobs.", ["kind"])
+
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+
+    assert counter.value(kind="a") == 3
+    with pytest.raises(ValueError):
+        counter.inc(route="/x")
+
+
+def test_registering_a_name_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+
+    assert registry.counter("jobs_total", "Jobs.") is registry.counter("jobs_total", "Jobs.")
+
+
+@pytest.fixture
+def client():
+    # The app needs the full web dependency set (fastapi, supabase, google-generativeai)
+    gemini_asgi = pytest.importorskip("gemini_asgi")
+    from fastapi.testclient import TestClient
+    return TestClient(gemini_asgi.app)
+
+
+def test_asgi_requests_are_labelled_by_route_template(client):
+    before = HTTP_REQUEST_SECONDS.count(route="/metrics", method="GET", status="200")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert HTTP_REQUEST_SECONDS.count(route="/metrics", method="GET", status="200") == before + 1
+
+
+def test_asgi_unknown_paths_share_one_series(client):
+    before = HTTP_REQUEST_SECONDS.count(route="unmatched", method="GET", status="404")
+
+    for i in range(3):
+        assert client.get(f"/scan/{i}/wp-login.php").status_code == 404
+
+    assert HTTP_REQUEST_SECONDS.count(route="unmatched", method="GET", status="404") == before + 3
+    assert "/scan/" not in client.get("/metrics").text
@@ -0,0 +1,49 @@
+import json
+
+from tools.result_shaping import fit_to_budget, shape_tool_result, dumps
+
+
+def carparks(n: int) -> dict:
+    return {"timestamp": "2025-01-01T12:00:00+08:00",
+            "carparks": [{"carpark_number": f"CP{i:04d}", "lots_available": i, "total_lots": 100} for i in range(n)]}
+
+
+def test_small_results_are_returned_unchanged():
+    value = carparks(3)
+
+    assert fit_to_budget(value, max_bytes=10_000) is value
+
+
+def test_largest_list_is_cut_to_fit_with_aggregates_over_all_items():
+    value = carparks(500)
+
+    shaped = fit_to_budget(value, max_bytes=2000)
+
+    assert len(dumps(shaped)) <= 2000
+    assert shaped["carparks"] == value["carparks"][:len(shaped["carparks"])]  # ranked head is kept
+    note = shaped["carparks_truncated"]
+    assert note["total"] == 500 and note["shown"] == len(shaped["carparks"])
+    assert note["aggregates_over_all"]["lots_available"] == {"sum": sum(range(500)), "min": 0, "max": 499}
+    assert len(value["carparks"]) == 500  # the input is not modified
+
+
+def test_top_level_lists_and_long_strings_are_cut():
+    shaped_list = fit_to_budget([{"n": i} for i in range(1000)], max_bytes=500)
+    shaped_text = fit_to_budget({"answer": "x" * 5000}, max_bytes=1000)
+
+    assert isinstance(shaped_list, list) and len(dumps(shaped_list)) <= 500
+    assert len(dumps(shaped_text)) <= 1000 and shaped_text["answer"].endswith("…")
+
+
+def test_result_that_cannot_shrink_becomes_a_preview():
+    shaped = fit_to_budget({f"field_{i}": i for i in range(500)}, max_bytes=300)
+
+    assert shaped["truncated"] is True
+    assert len(dumps(shaped)) <= 300
+    assert json.loads(dumps(shaped))["preview"].startswith('{"field_0":0')
+
+
+def test_error_results_are_not_projected():
+    error = {"error": "HTTPError", "message": "503"}
+
+    assert shape_tool_result("get_taxi_availability", error) == error
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from tools.snapshot_cache import SnapshotCache
+
+
+def test_latest_snapshot_is_reused_until_ttl_expires(monkeypatch):
+    cache = SnapshotCache()
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_fetch("taxi", None, fetch, ttl=30) == {"n": 1}
+    now[0] += 29
+    assert cache.get_or_fetch("taxi", None, fetch, ttl=30) == {"n": 1}
+    now[0] += 1
+    assert cache.get_or_fetch("taxi", None, fetch, ttl=30) == {"n": 2}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_historical_snapshots_are_lru_bounded():
+    cache = SnapshotCache(max_historical=2)
+    for stamp in ("t1", "t2"):
+        cache.get_or_fetch("taxi", stamp, lambda stamp=stamp: stamp, ttl=0)
+    cache.get_or_fetch("taxi", "t1", lambda: "refetched", ttl=0)  # t1 becomes most recent
+    cache.get_or_fetch("taxi", "t3", lambda: "t3", ttl=0)  # evicts t2
+
+    assert cache.get_or_fetch("taxi", "t1", lambda: "refetched", ttl=0) == "t1"
+    assert cache.get_or_fetch("taxi", "t2", lambda: "refetched", ttl=0) == "refetched"
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = SnapshotCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "snapshot"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("carpark", None, fetch, ttl=60)))
+               for _ in range(8)]
+    threads[0].start()
+    assert started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["misses"] < len(threads):
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["snapshot"] * len(threads)
+
+
+def test_failed_fetch_is_shared_and_not_cached():
+    cache = SnapshotCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_fetch():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def waiter():
+        try:
+            cache.get_or_fetch("rainfall", None, failing_fetch, ttl=60)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    owner = threading.Thread(target=waiter)
+    owner.start()
+    assert started.wait(5)
+    other = threading.Thread(target=waiter)
+    other.start()
+    while cache.stats()["misses"] < 2:
+        time.sleep(0.001)
+    release.set()
+    owner.join(5)
+    other.join(5)
+
+    assert errors == ["upstream down", "upstream down"]
+    assert cache.get_or_fetch("rainfall", None, lambda: "recovered", ttl=60) == "recovered"
+
+
+def test_invalidate_drops_one_endpoint():
+    cache = SnapshotCache()
+    cache.get_or_fetch("taxi", None, lambda: "taxi", ttl=60)
+    cache.get_or_fetch("carpark", "t1", lambda: "carpark", ttl=60)
+    cache.invalidate("taxi")
+
+    assert cache.stats()["latest_entries"] == 0
+    assert cache.stats()["historical_entries"] == 1
+    assert cache.get_or_fetch("taxi", None, lambda: "refetched", ttl=60) == "refetched"
+    assert cache.get_or_fetch("carpark", "t1", lambda: "refetched", ttl=60) == "carpark"
@@ -0,0 +1,56 @@
+import json
+
+from chat_sessions import ChatSession
+
+def parse_events(stream) -> list:
+    """(event, data) pairs of a server-sent event stream."""
+    events = []
+    for frame in "".join(stream).split("\n\n"):
+        if frame:
+            event_line, data_line = frame.split("\n")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def test_done_result_includes_text_streamed_before_tool_calls(offline_gemini):
+    offline_gemini.script({"Weather": [
+        ["Let me check the forecast.", ("get_current_weather", {"location": "Tampines"})],
+        "It is cloudy in Tampines.",
+    ]})
+    offline_gemini.tool("get_current_weather", lambda location: {"area": location, "forecast": "Cloudy"})
+
+    events = parse_events(offline_gemini.gemini.stream_conversation_with_tools("Weather in Tampines?"))
+    names = [event for event, _ in events]
+    streamed = "".join(data["text"] for event, data in events if event == "token")
+    done = events[-1][1]
+
+    assert names[0] == "start" and names[-1] == "done"
+    assert names.index("tool_start") < names.index("tool_end")
+    assert streamed == "Let me check the forecast.It is cloudy in Tampines."
+    assert done["result"] == streamed
+    assert offline_gemini.stored == [("Weather in Tampines?", streamed)]
+
+
+
+def test_stream_route_sends_server_sent_events(offline_gemini):
+    offline_gemini.script({})
+    client = offline_gemini.gemini.app.test_client()
+
+    response = client.post("/gemini-response/stream", json={"text": "Hello"})
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = parse_events(response.get_data(as_text=True))
+    assert events[0][0] == "start" and events[-1][0] == "done"
+    assert "".join(data["text"] for event, data in events if event == "token") == "Hello! How can I help you today?"
+
+
+def test_stream_releases_the_session_lock(offline_gemini):
+    offline_gemini.script({})
+    session = ChatSession("s1")
+
+    events = parse_events(offline_gemini.gemini.stream_conversation_with_tools("Hello", session))
+
+    assert events[-1][0] == "done"
+    assert session.lock.acquire(blocking=False)
+    assert session.turns == 1
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+import pytest
+
+from tools import taxi_spatial_index
+from tools.taxi_spatial_index import TaxiSpatialIndex, to_metres
+
+
+@pytest.fixture(scope="module")
+def taxis():
+    rng = random.Random(7)
+    return [[rng.uniform(103.62, 104.0), rng.uniform(1.25, 1.45)] for _ in range(3000)]
+
+
+def brute_force_distances(coordinates, latitude, longitude):
+    lonlat = np.asarray(coordinates)
+    x, y = to_metres(lonlat[:, 1], lonlat[:, 0])
+    qx, qy = to_metres(latitude, longitude)
+    return np.hypot(x - qx, y - qy)
+
+
+@pytest.mark.parametrize("radius_m", [50, 500, 1234, 5000])
+@pytest.mark.parametrize("point", [(1.2903, 103.8520), (1.25, 103.62), (1.5, 104.1)])
+def test_count_within_matches_brute_force(taxis, point, radius_m):
+    index = TaxiSpatialIndex(taxis)
+
+    expected = int(np.count_nonzero(brute_force_distances(taxis, *point) <= radius_m))
+
+    assert index.count_within(*point, radius_m) == expected
+
+
+@pytest.mark.parametrize("n", [1, 5, 40])
+@pytest.mark.parametrize("point", [(1.2903, 103.8520), (1.6, 103.5)])
+def test_nearest_matches_brute_force(taxis, point, n):
+    index = TaxiSpatialIndex(taxis)
+
+    _, distances = index.nearest(*point, n)
+
+    expected = np.sort(brute_force_distances(taxis, *point))[:n]
+    np.testing.assert_allclose(distances, expected)
+    assert list(distances) == sorted(distances)
+
+
+def test_density_grid_counts_every_taxi_once(taxis):
+    index = TaxiSpatialIndex(taxis)
+
+    cells = index.density_grid(cell_size_m=2000, top_n=10_000)
+
+    assert sum(cell["taxi_count"] for cell in cells) == len(taxis)
+    assert [cell["taxi_count"] for cell in cells] == sorted((cell["taxi_count"] for cell in cells), reverse=True)
+
+
+def test_empty_snapshot():
+    index = TaxiSpatialIndex([])
+
+    assert index.count_within(1.29, 103.85, 1000) == 0
+    assert len(index.nearest(1.29, 103.85, 5)[0]) == 0
+    assert index.density_grid(2000, 5) == []
+
+
+@pytest.mark.parametrize("query", [
+    lambda index: index.count_within(1.29, 103.85, -1),
+    lambda index: index.count_within(1.29, 103.85, float("nan")),
+    lambda index: index.count_within(1.29, 103.85, float("inf")),
+    lambda index: index.nearest(1.29, 103.85, 0),
+    lambda index: index.density_grid(0, 5),
+    lambda index: index.density_grid(-500, 5),
+    lambda index: index.density_grid(2000, 0),
+])
+def test_invalid_query_arguments_raise(taxis, query):
+    with pytest.raises(ValueError):
+        query(TaxiSpatialIndex(taxis))
+
+
+@pytest.mark.parametrize("call", [
+    lambda: taxi_spatial_index.count_taxis_within_radius(1.29, 103.85, radius_m=-5),
+    lambda: taxi_spatial_index.count_taxis_within_radius(1.29, 103.85, radius_m=float("inf")),
+    lambda: taxi_spatial_index.get_nearest_taxis(1.29, 103.85, n=0),
+    lambda: taxi_spatial_index.get_taxi_density_grid(cell_size_m=0),
+    lambda: taxi_spatial_index.get_taxi_density_grid(top_n=-3),
+    lambda: taxi_spatial_index.get_taxi_density_grid(top_n=float("inf")),
+])
+def test_tools_return_invalid_argument_before_fetching(monkeypatch, call):
+    monkeypatch.setattr(taxi_spatial_index, "get_taxi_availability", lambda date_time=None: pytest.fail("fetched a snapshot"))
+
+    result = call()
+
+    assert result["error"] == "InvalidArgument"
+    assert result["message"]
@@ -0,0 +1,48 @@
+import pytest
+
+# Needs deepsearcher (for its Chunk type) and langchain-text-splitters to be installed
+text_splitter = pytest.importorskip("tools.text_splitter")
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+split_with_offsets = text_splitter.split_with_offsets
+split_docs_to_chunks = text_splitter.split_docs_to_chunks
+WINDOW_OFFSET = text_splitter.WINDOW_OFFSET
+
+
+def splitter(chunk_size: int = 80, chunk_overlap: int = 20) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def test_offsets_point_at_each_chunk():
+    text = "\n\n".join(f"Section {i}. " + "word " * (i % 7 + 5) for i in range(40))
+
+    spans = split_with_offsets(text, splitter())
+
+    assert [chunk for chunk, _, _ in spans] == splitter().split_text(text)
+    for chunk, start, end in spans:
+        assert text[start:end] == chunk
+    assert [start for _, start, _ in spans] == sorted(start for _, start, _ in spans)
+
+
+def test_repeated_passages_get_their_own_offsets():
+    passage = "The same disclaimer appears on every page of the report."
+    text = "\n\n".join([passage, "Page one has unique content.", passage, "Page two differs again.", passage])
+
+    spans = split_with_offsets(text, splitter(chunk_size=60, chunk_overlap=0))
+
+    starts = [start for chunk, start, _ in spans if chunk == passage]
+    assert len(starts) == 3 and len(set(starts)) == 3
+
+
+def test_chunks_carry_reference_metadata_and_window():
+    text = "".join(f"Sentence number {i} of a long document. " for i in range(100))
+    doc = Document(page_content=text, metadata={"reference": "report.pdf", "page": 3})
+
+    chunks = split_docs_to_chunks([doc], chunk_size=200, chunk_overlap=0)
+
+    assert chunks and all(chunk.reference == "report.pdf" for chunk in chunks)
+    for chunk in chunks:
+        assert "reference" not in chunk.metadata and chunk.metadata["page"] == 3
+        assert chunk.text in chunk.metadata["wider_text"]
+        assert len(chunk.metadata["wider_text"]) <= len(chunk.text) + 2 * WINDOW_OFFSET
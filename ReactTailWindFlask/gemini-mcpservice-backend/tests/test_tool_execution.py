@@ -0,0 +1,55 @@
+import pytest
+
+
+def call(name, args):
+    return type("FunctionCall", (), {"name": name, "args": args})()
+
+
+def test_run_tool_reports_each_outcome(offline_gemini):
+    gemini = offline_gemini.gemini
+    offline_gemini.tool("fake_ok", lambda: {"value": 1})
+    offline_gemini.tool("fake_error", lambda: {"error": "HTTPError", "message": "503 from upstream"})
+    offline_gemini.tool("fake_raises", lambda: 1 / 0)
+
+    assert gemini.run_tool("fake_ok", {}) == ({"result": {"value": 1}}, "ok")
+    assert gemini.run_tool("fake_error", {})[1] == "error"
+    assert gemini.run_tool("fake_raises", {})[1] == "exception"
+    assert gemini.run_tool("no_such_tool", {})[1] == "not_found"
+
+
+def test_error_results_count_as_failed_turns(offline_gemini):
+    gemini = offline_gemini.gemini
+    offline_gemini.tool("fake_ok", lambda: {"value": 1})
+    offline_gemini.tool("fake_error", lambda: {"error": "HTTPError", "message": "503 from upstream"})
+
+    parts, outcomes = gemini.execute_tools([call("fake_ok", {}), call("fake_error", {})])
+
+    assert [part["function_response"]["name"] for part in parts] == ["fake_ok", "fake_error"]
+    assert outcomes == ["ok", "error"]
+    assert gemini.any_tool_failed(outcomes)
+    assert not gemini.any_tool_failed(["ok", "ok"])
+
+
+def test_answers_built_on_failed_fetches_are_not_cached(offline_gemini):
+    cache = offline_gemini.enable_answer_cache()
+    offline_gemini.script({"Carparks": [[("fake_carparks", {})], "No carpark data right now."]})
+    offline_gemini.tool("fake_carparks", lambda: {"error": "RequestException", "message": "timed out"})
+
+    offline_gemini.gemini.run_conversation_with_tools("Carparks near Bishan?")
+    assert cache.stats()["entries"] == 0
+
+    offline_gemini.tool("fake_carparks", lambda: {"carparks": []})
+    offline_gemini.gemini.run_conversation_with_tools("Carparks near Bishan?")
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("result, ok", [({"value": 1}, True), ({"error": "HTTPError", "message": "503"}, False)])
+def test_stream_tool_end_reports_the_outcome(offline_gemini, result, ok):
+    from tests.test_streaming import parse_events
+
+    offline_gemini.script({"Taxis": [[("fake_taxis", {})], "Done."]})
+    offline_gemini.tool("fake_taxis", lambda: result)
+
+    events = parse_events(offline_gemini.gemini.stream_conversation_with_tools("Taxis?"))
+
+    assert [data["ok"] for event, data in events if event == "tool_end"] == [ok]
@@ -0,0 +1,157 @@
+import importlib
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import uuid
+
+import pytest
+
+from tools.registry import ToolRegistry, TOOL_IMPORT_SECONDS
+
+# Imports of the "slow" tool module below block on this until the test releases them
+RELEASE = threading.Event()
+
+
+@pytest.fixture
+def write_module(tmp_path, monkeypatch):
+    """write_module(source) writes a uniquely named module into an importable directory and returns its name."""
+    monkeypatch.syspath_prepend(str(tmp_path))
+    names = []
+
+    def write(source: str) -> str:
+        name = f"fake_tools_{uuid.uuid4().hex[:8]}"
+        (tmp_path / f"{name}.py").write_text(textwrap.dedent(source))
+        importlib.invalidate_caches()
+        names.append(name)
+        return name
+
+    yield write
+    for name in names:
+        sys.modules.pop(name, None)
+
+
+LOOKUP = """
+def lookup(key):
+    return {"key": key}
+"""
+
+
+def test_declarations_are_available_without_importing_tools(write_module):
+    module = write_module(LOOKUP)
+    registry = ToolRegistry({"lookup": module}, ["lookup declaration"])
+
+    assert registry.declarations == ["lookup declaration"]
+    assert "lookup" in registry and "missing" not in registry
+    assert module not in sys.modules
+    assert registry.stats()["loaded"] == []
+
+
+def test_first_call_imports_the_module_once(write_module):
+    module = write_module(LOOKUP)
+    registry = ToolRegistry({"lookup": module}, [])
+
+    function = registry.get("lookup")
+
+    assert function("a") == {"key": "a"}
+    assert registry.get("lookup") is function
+    assert list(registry.import_seconds) == [module]
+    assert registry.stats()["loaded"] == ["lookup"]
+
+
+def test_unknown_tools_raise_key_error(write_module):
+    registry = ToolRegistry({"lookup": write_module(LOOKUP)}, [])
+
+    with pytest.raises(KeyError):
+        registry.get("missing")
+
+
+def test_concurrent_first_calls_share_one_import_without_blocking_other_modules(write_module):
+    slow = write_module(f"""
+        import {__name__} as test_module
+        test_module.RELEASE.wait(5)
+
+        def slow_a():
+            return "a"
+
+        def slow_b():
+            return "b"
+    """)
+    fast = write_module(LOOKUP)
+    registry = ToolRegistry({"slow_a": slow, "slow_b": slow, "lookup": fast}, [])
+    imports_before = TOOL_IMPORT_SECONDS.count(module=slow)
+    RELEASE.clear()
+    results = {}
+    threads = [threading.Thread(target=lambda name=name: results.update({name: registry.get(name)()}))
+               for name in ("slow_a", "slow_b", "slow_a")]
+    for thread in threads:
+        thread.start()
+
+    try:
+        deadline = time.monotonic() + 5
+        while slow not in sys.modules and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Another module imports while the slow one is still blocked
+        assert registry.get("lookup")("x") == {"key": "x"}
+        assert results == {}
+    finally:
+        RELEASE.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {"slow_a": "a", "slow_b": "b"}
+    assert TOOL_IMPORT_SECONDS.count(module=slow) == imports_before + 1
+
+
+def test_override_replaces_and_restores_an_implementation(write_module):
+    registry = ToolRegistry({"lookup": write_module(LOOKUP)}, [])
+    stand_in = lambda key: {"stand_in": key}
+
+    assert registry.override("lookup", stand_in) is None
+    assert registry.get("lookup")("a") == {"stand_in": "a"}
+
+    assert registry.override("lookup", None) is stand_in
+    assert registry.get("lookup")("a") == {"key": "a"}
+
+
+def test_override_can_add_a_tool(write_module):
+    registry = ToolRegistry({"lookup": write_module(LOOKUP)}, [])
+
+    registry.override("extra", lambda: "extra")
+
+    assert "extra" in registry and registry.get("extra")() == "extra"
+
+
+def test_load_all_skips_failing_modules_and_retries_them_on_first_call(write_module, tmp_path):
+    dependency = f"fake_dependency_{uuid.uuid4().hex[:8]}"
+    broken = write_module(f"""
+        import {dependency}
+
+        def broken():
+            return {dependency}.VALUE
+    """)
+    registry = ToolRegistry({"lookup": write_module(LOOKUP), "broken": broken}, [])
+
+    registry.load_all()
+
+    assert registry.stats()["loaded"] == ["lookup"]
+    (tmp_path / f"{dependency}.py").write_text("VALUE = 42\n")
+    importlib.invalidate_caches()
+    try:
+        assert registry.get("broken")() == 42
+    finally:
+        sys.modules.pop(dependency, None)
+
+
+@pytest.mark.parametrize("poll", ["0", "1"])
+def test_feed_history_is_only_offered_while_the_poller_runs(poll):
+    # The tool set is fixed at import time, so check it in a fresh interpreter
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = "from tools.registry import tool_registry, FEED_HISTORY_TOOL\n" \
+             "print('get_feed_history' in tool_registry, FEED_HISTORY_TOOL in tool_registry.declarations)"
+    output = subprocess.run([sys.executable, "-c", script], cwd=backend_dir, capture_output=True, text=True, check=True,
+                            env={**os.environ, "FEED_HISTORY_POLL": poll}).stdout
+
+    assert output.split() == [str(poll == "1")] * 2
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from tests.fakes import make_traffic_payload
+from tools.taxi_spatial_index import to_metres
+from tools.traffic_cameras import CachedImage, CameraImageCache, CameraImageUnavailable, CameraIndex
+
+
+def fake_download(cache, size=1000, thumb_size=100, delay=0.0):
+    """Replaces the cache's download with local bytes; returns the list of fetched urls."""
+    fetched = []
+
+    def download(url, md5, image_timestamp):
+        fetched.append(url)
+        time.sleep(delay)
+        original = CachedImage(b"o" * size, "image/jpeg", md5 or url, image_timestamp)
+        if thumb_size is None:
+            return original, original
+        return original, CachedImage(b"t" * thumb_size, "image/jpeg", (md5 or url) + "-thumb", image_timestamp)
+
+    cache._download = download
+    return fetched
+
+
+def test_hit_after_miss_downloads_once():
+    cache = CameraImageCache(max_bytes=10_000)
+    fetched = fake_download(cache)
+
+    assert cache.get("a").size == 100
+    assert cache.get("a", thumbnail=False).size == 1000
+
+    assert fetched == ["a"]
+    assert cache.stats()["bytes"] == 1100
+
+
+def test_image_without_thumbnail_is_stored_once():
+    cache = CameraImageCache(max_bytes=10_000)
+    fetched = fake_download(cache, thumb_size=None)
+
+    thumb = cache.get("a")
+    full = cache.get("a", thumbnail=False)
+
+    assert thumb is full
+    assert fetched == ["a"]
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 1000
+
+
+def test_thumbnail_alias_is_dropped_with_its_original():
+    cache = CameraImageCache(max_bytes=2500)
+    fetched = fake_download(cache, thumb_size=None)
+
+    cache.get("a")
+    cache.get("b")
+    cache.get("c")  # evicts a
+
+    assert cache.get("a") is not None
+    assert fetched == ["a", "b", "c", "a"]
+    assert cache.stats()["bytes"] <= 2500
+
+
+def test_eviction_keeps_bytes_within_budget():
+    cache = CameraImageCache(max_bytes=3000)
+    fetched = fake_download(cache)
+
+    for url in "abcdef":
+        cache.get(url)
+    assert cache.stats()["bytes"] <= 3000
+
+    cache.get("f", thumbnail=False)
+    cache.get("a")
+    assert fetched == list("abcdef") + ["a"]
+
+
+def test_concurrent_misses_share_one_download():
+    cache = CameraImageCache(max_bytes=10_000)
+    fetched = fake_download(cache, delay=0.05)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fetched == ["a"]
+    assert len(results) == 8
+    assert cache.stats()["misses"] == 1
+
+
+def test_failed_download_raises_for_every_waiter():
+    cache = CameraImageCache(max_bytes=10_000)
+
+    def download(url, md5, image_timestamp):
+        time.sleep(0.05)
+        raise CameraImageUnavailable(url)
+
+    cache._download = download
+    errors = []
+
+    def get():
+        try:
+            cache.get("a")
+        except CameraImageUnavailable as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 4
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    return make_traffic_payload(random.Random(3))
+
+
+def test_find_returns_position_by_camera_id(snapshot):
+    index = CameraIndex.from_snapshot(snapshot)
+    cameras = snapshot["items"][0]["cameras"]
+
+    assert len(index) == len(cameras)
+    assert index.find(cameras[5]["camera_id"]) == 5
+    assert index.find("no-such-camera") is None
+
+
+@pytest.mark.parametrize("n", [1, 5, 200])
+def test_nearest_matches_brute_force(snapshot, n):
+    index = CameraIndex.from_snapshot(snapshot)
+    cameras = snapshot["items"][0]["cameras"]
+
+    idx, distances = index.nearest(1.2903, 103.8520, n)
+
+    x, y = to_metres(np.array([c["location"]["latitude"] for c in cameras]),
+                     np.array([c["location"]["longitude"] for c in cameras]))
+    qx, qy = to_metres(1.2903, 103.8520)
+    expected = np.sort(np.hypot(x - qx, y - qy))[:n]
+    np.testing.assert_allclose(distances, expected)
+    assert index.camera(idx[0], distances[0])["distance_m"] == round(float(expected[0]))
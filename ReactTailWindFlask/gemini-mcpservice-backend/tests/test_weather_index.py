@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from tests.fakes import make_forecast_payload, make_station_payload
+from tools import weather_tool
+from tools.snapshot_cache import SnapshotCache
+from tools.weather_index import AmbiguousArea, WeatherIndex
+
+
+@pytest.fixture(scope="module")
+def payloads():
+    rng = random.Random(11)
+    return make_forecast_payload(rng), make_station_payload(rng, 12, "S", "deg C", 25, 33)
+
+
+@pytest.fixture
+def index(payloads):
+    return WeatherIndex(*payloads)
+
+
+def name_of(index, position):
+    return None if position is None else index.area_name[position]
+
+
+@pytest.mark.parametrize("query, area", [
+    ("Jurong West", "Jurong West"),
+    ("  jurong   WEST ", "Jurong West"),
+    ("Tampines Mall", "Tampines"),
+    ("near Bukit Timah road", "Bukit Timah"),
+    ("Tamp", "Tampines"),
+    ("Pasir", "Pasir Ris"),
+])
+def test_find_area_resolves(index, query, area):
+    assert name_of(index, index.find_area(query)) == area
+
+
+@pytest.mark.parametrize("query", ["Atlantis", "ng", "mpines", "ong East"])
+def test_find_area_does_not_match_inside_words(index, query):
+    assert index.find_area(query) is None
+
+
+def test_find_area_prefers_the_longest_contained_name(index):
+    assert name_of(index, index.find_area("Western Water Catchment reservoir")) == "Western Water Catchment"
+
+
+@pytest.mark.parametrize("query, candidates", [
+    ("Jurong", ["Jurong East", "Jurong Island", "Jurong West"]),
+    ("Bukit", ["Bukit Batok", "Bukit Merah", "Bukit Panjang", "Bukit Timah"]),
+    ("Pulau", ["Pulau Tekong", "Pulau Ubin"]),
+])
+def test_find_area_raises_when_ambiguous(index, query, candidates):
+    with pytest.raises(AmbiguousArea) as raised:
+        index.find_area(query)
+
+    assert raised.value.candidates == candidates
+
+
+def test_every_area_is_paired_with_its_nearest_station(index):
+    row = index.area(index.find_area("Bedok"))
+
+    assert row["temperature_station"].startswith("Station S")
+    assert 25 <= row["temperature_c"] <= 33
+
+
+@pytest.fixture
+def weather(payloads, monkeypatch):
+    forecast, temperature = payloads
+    monkeypatch.setattr(weather_tool, "snapshot_cache", SnapshotCache())
+    monkeypatch.setattr(weather_tool, "_fetch_forecast", lambda params: forecast)
+    monkeypatch.setattr(weather_tool, "_fetch_air_temperature", lambda params: temperature)
+    return weather_tool.get_current_weather
+
+
+def test_tool_returns_ambiguous_location_error(weather):
+    result = weather(location="Jurong")
+
+    assert result["error"] == "AmbiguousLocation"
+    assert result["candidates"] == ["Jurong East", "Jurong Island", "Jurong West"]
+
+
+def test_tool_prefers_coordinates_over_ambiguous_name(weather, payloads):
+    location = payloads[0]["area_metadata"][0]["label_location"]
+
+    result = weather(location="Jurong", **location)
+
+    assert "error" not in result
+    assert result["area"] == payloads[0]["area_metadata"][0]["name"]
+
+
+def test_tool_falls_back_to_island_wide_summary(weather):
+    result = weather(location="Atlantis")
+
+    assert "forecast_counts" in result
+    assert "note" in result
+    assert weather(location="Singapore").get("note") is None
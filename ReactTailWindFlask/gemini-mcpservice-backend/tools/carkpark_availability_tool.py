@@ -1,16 +1,35 @@
 # server/tools/carpark_availability_tool.py
 import requests
+from tools import http_client
+from tools.snapshot_cache import snapshot_cache, CARPARK_AVAILABILITY_TTL
+from tools.carpark_store import get_carpark_store
 
-def get_carpark_availability(date_time: str = None) -> dict:
+# Rows returned when the caller does not ask for specific carparks or a top_n
+DEFAULT_TOP_N = 20
+
+BASE_URL = "https://api.data.gov.sg/v1/transport/carpark-availability"
+
+
+def _fetch_carpark_availability(params: dict) -> dict:
+    response = http_client.get(BASE_URL, params=params)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
+    return response.json()
+
+
+def get_carpark_availability(date_time: str = None, carpark_numbers: list = None, lot_type: str = None,
+                             min_available: int = None, top_n: int = None) -> dict:
     """
-    Fetches carpark availability from the data.gov.sg API.
+    Fetches carpark availability from the data.gov.sg API and returns only the matching rows.
 
     This function retrieves carpark availability information.
     - Data is typically retrieved every minute.
     - The `date_time` parameter (YYYY-MM-DDTHH:mm:ss SGT) can be used to get data for a specific moment.
+    - Rows are one per (carpark, lot type) and can be filtered by `carpark_numbers`, `lot_type`
+      ('C' car, 'Y' motorcycle, 'H' heavy vehicle) and `min_available` lots.
+    - Rows are sorted by lots available, most first. Unless specific carparks are requested,
+      at most `top_n` rows (default 20) are returned; `total_matches` gives the full count.
     - For detailed information about carparks, refer to: https://data.gov.sg/dataset/hdb-carpark-information
     """
-    base_url = "https://api.data.gov.sg/v1/transport/carpark-availability"
     params = {}
     if date_time:
         params["date_time"] = date_time
@@ -22,22 +41,36 @@ def get_carpark_availability(date_time: str = None) -> dict:
         tool_call_msg += " for latest data."
     print(tool_call_msg)
 
+    # Checked before fetching: a negative top_n would otherwise slice rows off the end
+    if top_n is not None and top_n < 1:
+        return {"error": "InvalidArgument", "message": f"top_n must be at least 1, got {top_n}."}
+
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-        
-        data = response.json()
-        print(f"TOOL SERVER: Successfully retrieved data. Returning {len(data.get('items', []))} items.")
-        # print(f"TOOL SERVER: Responding with: {data}") # Potentially very verbose
-        return data
+        data = snapshot_cache.get_or_fetch(BASE_URL, date_time, lambda: _fetch_carpark_availability(params), CARPARK_AVAILABILITY_TTL)
+        store = get_carpark_store(data)
+        if top_n is None and not carpark_numbers:
+            top_n = DEFAULT_TOP_N
+        rows, total_matches = store.query(
+            carpark_numbers=list(carpark_numbers) if carpark_numbers else None,
+            lot_type=lot_type,
+            min_available=min_available,
+            top_n=top_n,
+        )
+        print(f"TOOL SERVER: Successfully retrieved data. Returning {len(rows)} of {total_matches} matching rows ({len(store)} total).")
+        return {"timestamp": store.timestamp, "total_matches": total_matches, "carparks": rows}
     except requests.exceptions.HTTPError as http_err:
-        error_message = f"HTTP error occurred: {http_err} - {response.text}"
+        response = http_err.response
+        error_message = f"HTTP error occurred: {http_err} - {response.text if response is not None else 'No response body'}"
         print(f"TOOL SERVER: {error_message}")
-        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response else "No response body"}
+        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response is not None else "No response body"}
     except requests.exceptions.RequestException as req_err:
         error_message = f"Request error occurred: {req_err}"
         print(f"TOOL SERVER: {error_message}")
         return {"error": "RequestException", "message": str(req_err)}
+    except (KeyError, IndexError) as data_err:
+        error_message = f"Unexpected response format: {data_err}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "InvalidResponse", "message": "Carpark availability response has no items."}
     except ValueError as json_err: # Includes JSONDecodeError
         error_message = f"JSON decoding error: {json_err}"
         print(f"TOOL SERVER: {error_message}")
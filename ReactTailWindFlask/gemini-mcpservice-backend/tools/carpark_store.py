@@ -0,0 +1,98 @@
+# server/tools/carpark_store.py
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAX_CACHED_STORES = 8
+
+
+class CarparkAvailabilityStore:
+    """
+    Columnar, array-backed view of one carpark availability snapshot.
+
+    Each row is one (carpark, lot type) pair; the nested `carpark_info` lists of the
+    upstream payload are flattened once when the store is built, so queries are
+    vectorised filters over NumPy arrays.
+    """
+
+    def __init__(self, carpark_data: list, timestamp: str = None):
+        numbers, lot_types, total_lots, available, updated = [], [], [], [], []
+        for carpark in carpark_data:
+            for info in carpark.get("carpark_info", []):
+                numbers.append(carpark.get("carpark_number", ""))
+                lot_types.append(info.get("lot_type", ""))
+                total_lots.append(int(info.get("total_lots") or 0))
+                available.append(int(info.get("lots_available") or 0))
+                updated.append(carpark.get("update_datetime", ""))
+
+        self.timestamp = timestamp
+        self.carpark_number = np.array(numbers, dtype=np.str_)
+        self.lot_type = np.array(lot_types, dtype=np.str_)
+        self.total_lots = np.array(total_lots, dtype=np.int32)
+        self.lots_available = np.array(available, dtype=np.int32)
+        self.update_datetime = np.array(updated, dtype=np.str_)
+
+    @classmethod
+    def from_snapshot(cls, data: dict):
+        item = data["items"][0]
+        return cls(item.get("carpark_data", []), item.get("timestamp"))
+
+    def __len__(self):
+        return len(self.carpark_number)
+
+    def query(self, carpark_numbers=None, lot_type: str = None, min_available: int = None, top_n: int = None):
+        """
+        Returns (rows, total_matches) for the rows matching every given filter.
+
+        Rows are ordered by lots available, most first, and truncated to `top_n` when given.
+        Raises ValueError if `top_n` is less than 1.
+        """
+        if top_n is not None and int(top_n) < 1:
+            raise ValueError(f"top_n must be at least 1, got {top_n}.")
+        mask = np.ones(len(self), dtype=bool)
+        if carpark_numbers:
+            mask &= np.isin(self.carpark_number, [str(n).upper() for n in carpark_numbers])
+        if lot_type:
+            mask &= self.lot_type == lot_type.upper()
+        if min_available is not None:
+            mask &= self.lots_available >= int(min_available)
+
+        idx = np.flatnonzero(mask)
+        total_matches = len(idx)
+        idx = idx[np.argsort(-self.lots_available[idx], kind="stable")]
+        if top_n is not None:
+            idx = idx[:int(top_n)]
+
+        rows = [
+            {
+                "carpark_number": str(self.carpark_number[i]),
+                "lot_type": str(self.lot_type[i]),
+                "total_lots": int(self.total_lots[i]),
+                "lots_available": int(self.lots_available[i]),
+                "update_datetime": str(self.update_datetime[i]),
+            }
+            for i in idx
+        ]
+        return rows, total_matches
+
+
+_stores = OrderedDict()  # snapshot timestamp -> CarparkAvailabilityStore
+_stores_lock = threading.Lock()
+
+
+def get_carpark_store(data: dict) -> CarparkAvailabilityStore:
+    """Returns the store for a carpark snapshot, memoised per snapshot timestamp."""
+    timestamp = data["items"][0].get("timestamp")
+    with _stores_lock:
+        store = _stores.get(timestamp)
+        if store is not None:
+            _stores.move_to_end(timestamp)
+            return store
+
+    store = CarparkAvailabilityStore.from_snapshot(data)
+    with _stores_lock:
+        _stores[timestamp] = store
+        while len(_stores) > MAX_CACHED_STORES:
+            _stores.popitem(last=False)
+    return store
@@ -0,0 +1,142 @@
+# server/tools/deepsearch_rerank.py
+import asyncio
+import os
+from typing import List
+
+import numpy as np
+from deepsearcher.agent import DeepSearch
+from deepsearcher.agent.deep_search import RERANK_PROMPT
+from deepsearcher.utils import log
+from deepsearcher.vector_db import RetrievalResult
+
+from tools.metrics import DEEPSEARCHER_PHASE_SECONDS
+
+# Maximum number of rerank LLM calls in flight per search step
+DEEPSEARCH_RERANK_CONCURRENCY = int(os.getenv("DEEPSEARCH_RERANK_CONCURRENCY", "8"))
+# Chunks whose cosine similarity to the query is below this never reach the LLM reranker
+# (text-embedding-ada-002 similarities for unrelated text sit around 0.7).
+DEEPSEARCH_MIN_VECTOR_SIMILARITY = float(os.getenv("DEEPSEARCH_MIN_VECTOR_SIMILARITY", "0.75"))
+
+
+def cosine_similarities(query_vector, results: List[RetrievalResult]) -> np.ndarray:
+    """Cosine similarity between the query and every retrieved chunk, independent of the collection metric."""
+    if not results:
+        return np.empty(0, dtype=np.float32)
+    q = np.asarray(query_vector, dtype=np.float32)
+    m = np.asarray([result.embedding for result in results], dtype=np.float32)
+    norms = np.linalg.norm(m, axis=1) * np.linalg.norm(q)
+    return (m @ q) / np.where(norms == 0, 1, norms)
+
+
+class ConcurrentRerankDeepSearch(DeepSearch):
+    """
+    DeepSearch whose retrieval step no longer makes one blocking LLM call per chunk in series.
+
+    - All selected collections are searched concurrently.
+    - Chunks below DEEPSEARCH_MIN_VECTOR_SIMILARITY are dropped before any LLM rerank.
+    - The remaining rerank judgements run concurrently, at most `rerank_concurrency` at a time.
+    """
+
+    def __init__(self, *args, rerank_concurrency: int = DEEPSEARCH_RERANK_CONCURRENCY,
+                 min_vector_similarity: float = DEEPSEARCH_MIN_VECTOR_SIMILARITY, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rerank_concurrency = rerank_concurrency
+        self.min_vector_similarity = min_vector_similarity
+
+    @classmethod
+    def from_agent(cls, agent: DeepSearch, **kwargs):
+        return cls(
+            llm=agent.llm,
+            embedding_model=agent.embedding_model,
+            vector_db=agent.vector_db,
+            max_iter=agent.max_iter,
+            route_collection=agent.route_collection,
+            text_window_splitter=agent.text_window_splitter,
+            **kwargs,
+        )
+
+    @staticmethod
+    def _timed(phase: str, func, *args, **kwargs):
+        with DEEPSEARCHER_PHASE_SECONDS.time(phase=phase):
+            return func(*args, **kwargs)
+
+    async def _rerank_one(self, semaphore, query: str, sub_queries: List[str], retrieved_result: RetrievalResult):
+        async with semaphore:
+            chat_response = await asyncio.to_thread(
+                self._timed, "rerank", self.llm.chat,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": RERANK_PROMPT.format(
+                            query=[query] + sub_queries,
+                            retrieved_chunk=f"<chunk>{retrieved_result.text}</chunk>",
+                        ),
+                    }
+                ],
+            )
+        response_content = self.llm.remove_think(chat_response.content).strip()
+        accepted = "YES" in response_content and "NO" not in response_content
+        return accepted, chat_response.total_tokens
+
+    async def _search_collection(self, semaphore, collection: str, query: str, sub_queries: List[str], query_vector):
+        log.color_print(f"<search> Search [{query}] in [{collection}]...  </search>\n")
+        retrieved_results = await asyncio.to_thread(
+            self._timed, "vector_search", self.vector_db.search_data, collection=collection, vector=query_vector, query_text=query
+        )
+        if not retrieved_results:
+            log.color_print(f"<search> No relevant document chunks found in '{collection}'! </search>\n")
+            return [], 0
+
+        similarities = cosine_similarities(query_vector, retrieved_results)
+        candidates = [r for r, s in zip(retrieved_results, similarities) if s >= self.min_vector_similarity]
+        skipped = len(retrieved_results) - len(candidates)
+        if skipped:
+            log.color_print(f"<search> Skipped {skipped} chunk(s) below vector similarity {self.min_vector_similarity} </search>\n")
+
+        judgements = await asyncio.gather(*(
+            self._rerank_one(semaphore, query, sub_queries, result) for result in candidates
+        ))
+        accepted = [result for result, (ok, _) in zip(candidates, judgements) if ok]
+        consume_tokens = sum(tokens for _, tokens in judgements)
+
+        if accepted:
+            references = {result.reference for result in accepted}
+            log.color_print(
+                f"<search> Accept {len(accepted)} document chunk(s) from references: {list(references)} </search>\n"
+            )
+        else:
+            log.color_print(f"<search> No document chunk accepted from '{collection}'! </search>\n")
+        return accepted, consume_tokens
+
+    async def _search_chunks_from_vectordb(self, query: str, sub_queries: List[str]):
+        consume_tokens = 0
+        if self.route_collection:
+            selected_collections, n_token_route = await asyncio.to_thread(
+                self.collection_router.invoke, query=query, dim=self.embedding_model.dimension
+            )
+        else:
+            selected_collections = self.collection_router.all_collections
+            n_token_route = 0
+        consume_tokens += n_token_route
+
+        query_vector = await asyncio.to_thread(self.embedding_model.embed_query, query)
+        semaphore = asyncio.Semaphore(self.rerank_concurrency)
+        collection_results = await asyncio.gather(*(
+            self._search_collection(semaphore, collection, query, sub_queries, query_vector)
+            for collection in selected_collections
+        ))
+
+        all_retrieved_results = []
+        for accepted, tokens in collection_results:
+            all_retrieved_results.extend(accepted)
+            consume_tokens += tokens
+        return all_retrieved_results, consume_tokens
+
+
+def install_concurrent_rerank(searcher):
+    """Replaces every plain DeepSearch agent of a RAGRouter with ConcurrentRerankDeepSearch."""
+    searcher.rag_agents = [
+        ConcurrentRerankDeepSearch.from_agent(agent)
+        if type(agent) is DeepSearch else agent
+        for agent in searcher.rag_agents
+    ]
@@ -0,0 +1,593 @@
+# server/tools/deepsearcher_ingest.py
+#
+# Streaming ingestion into Milvus: load/crawl -> split -> embed -> insert run as concurrent
+# stages connected by bounded queues, so memory stays bounded by the queue sizes rather than
+# the corpus, and chunks become searchable batch by batch while later documents still load.
+#
+# In incremental mode every chunk carries `doc_hash` (fingerprint of its source document) and
+# `chunk_hash` (fingerprint of its text and window) in its metadata, so a reload only embeds
+# and inserts what changed. A per-reference manifest records the document fingerprint once
+# all of its chunks are stored, which lets unchanged documents skip splitting entirely.
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Union
+
+from tools.deepsearcher_tool import deepsearcher_runtime
+from tools.text_splitter import split_docs_to_chunks
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_EMBED_WORKERS = int(os.getenv("INGEST_EMBED_WORKERS", "4"))
+INGEST_EMBED_REQUESTS_PER_MINUTE = int(os.getenv("INGEST_EMBED_REQUESTS_PER_MINUTE", "500"))
+INGEST_PROGRESS_INTERVAL = 5.0  # seconds between progress reports
+# Rows per Milvus query when reading a document's stored chunks (offset + limit may not exceed 16384)
+INGEST_QUERY_PAGE_SIZE = int(os.getenv("INGEST_QUERY_PAGE_SIZE", "1000"))
+INGEST_MANIFEST_PATH = os.getenv(
+    "INGEST_MANIFEST_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ingest_manifest.sqlite3")
+)
+
+_DONE = object()
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with OpenAI tokenizers
+    return max(1, len(text) // 4)
+
+
+def document_fingerprint(docs: list) -> str:
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def chunk_fingerprint(chunk) -> str:
+    # The window is part of what gets stored and returned to the agents, so it is hashed too
+    wider_text = chunk.metadata.get("wider_text", "")
+    return hashlib.sha256(f"{chunk.text}\x00{wider_text}".encode("utf-8")).hexdigest()
+
+
+class IngestManifest:
+    """
+    (collection, reference) -> fingerprint and chunk count of the document version that is fully
+    stored. An entry is only written after every chunk of that version has been inserted and the
+    chunks of the previous version deleted, so a matching entry means nothing is left to sync.
+    """
+
+    def __init__(self, path: str = INGEST_MANIFEST_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS manifest (collection TEXT NOT NULL, reference TEXT NOT NULL, "
+            "doc_hash TEXT NOT NULL, chunk_count INTEGER NOT NULL, PRIMARY KEY (collection, reference))"
+        )
+        self._db.commit()
+
+    def get(self, collection: str, reference: str):
+        """Returns (doc_hash, chunk_count) of the stored version, or None."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT doc_hash, chunk_count FROM manifest WHERE collection = ? AND reference = ?", (collection, reference)
+            ).fetchone()
+
+    def put(self, collection: str, reference: str, doc_hash: str, chunk_count: int):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO manifest (collection, reference, doc_hash, chunk_count) VALUES (?, ?, ?, ?)",
+                (collection, reference, doc_hash, chunk_count),
+            )
+            self._db.commit()
+
+    def forget(self, collection: str, keep_references=None):
+        """Drops the entries of a collection, except those of `keep_references` when given."""
+        with self._lock:
+            rows = self._db.execute("SELECT reference FROM manifest WHERE collection = ?", (collection,)).fetchall()
+            stale = [(collection, reference) for (reference,) in rows
+                     if keep_references is None or reference not in keep_references]
+            self._db.executemany("DELETE FROM manifest WHERE collection = ? AND reference = ?", stale)
+            self._db.commit()
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest() -> IngestManifest:
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = IngestManifest()
+        return _manifest
+
+
+class StageStats:
+    """Counts work done by one pipeline stage and reports its throughput."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.chunks = 0
+        self.tokens = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int = 0, chunks: int = 0, tokens: int = 0, busy_seconds: float = 0.0):
+        with self._lock:
+            self.items += items
+            self.chunks += chunks
+            self.tokens += tokens
+            self.busy_seconds += busy_seconds
+
+    def as_dict(self, elapsed: float) -> dict:
+        elapsed = max(elapsed, 1e-9)
+        return {
+            "items": self.items,
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "busy_s": round(self.busy_seconds, 2),
+            "chunks_per_s": round(self.chunks / elapsed, 2),
+            "tokens_per_s": round(self.tokens / elapsed, 2),
+        }
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls to at most `per_minute` per minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class IngestPipeline:
+    """
+    Runs one ingestion as four concurrent stages:
+
+    1. load   - iterates the document source (one crawl/file load at a time)
+    2. split  - splits documents into chunks and groups them into batches of `batch_size`
+    3. embed  - `embed_workers` threads embed batches in parallel, rate limited
+    4. insert - writes each embedded batch into Milvus as soon as it is ready
+
+    With `incremental=True` the split stage diffs every source document against what the
+    collection already holds for its reference: documents whose manifest entry matches (and
+    whose chunks are all present) are skipped before splitting, and only new chunks move on
+    to the embed and insert stages. Chunks that no longer exist are deleted only after every
+    new chunk of their document has been inserted, so a failed or interrupted run never
+    leaves a document with less content than before; the next run picks up what is missing.
+    With `prune_missing=True` as well, chunks of references that were not part of this load
+    are deleted once the run completes. A reference that the source yields again later in
+    the same run is skipped (counted as `duplicate_documents`): its first copy is the one stored.
+
+    Any stage error stops the whole pipeline and is re-raised from `run()`.
+    """
+
+    def __init__(self, collection_name: str, chunk_size: int = 1500, chunk_overlap: int = 100,
+                 batch_size: int = 64, embed_workers: int = INGEST_EMBED_WORKERS,
+                 embed_requests_per_minute: int = INGEST_EMBED_REQUESTS_PER_MINUTE,
+                 queue_size: int = INGEST_QUEUE_SIZE, incremental: bool = False, prune_missing: bool = False,
+                 manifest: IngestManifest = None):
+        configuration = deepsearcher_runtime.get()
+        self.embedding_model = configuration.embedding_model
+        self.vector_db = configuration.vector_db
+        self.collection_name = collection_name
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.embed_workers = embed_workers
+        self.rate_limiter = RateLimiter(embed_requests_per_minute)
+        self.incremental = incremental
+        self.prune_missing = prune_missing
+        self.manifest = (manifest or get_manifest()) if incremental else None
+        self.seen_references = set()
+        # reference -> document version waiting for its new chunks to be inserted
+        self._pending = {}
+        # Guards _pending and the sync counters, which the split and insert stages both update
+        self._pending_lock = threading.Lock()
+        self.sync = {
+            "unchanged_documents": 0,
+            "changed_documents": 0,
+            "new_documents": 0,
+            "duplicate_documents": 0,
+            "kept_chunks": 0,
+            "deleted_chunks": 0,
+            "new_chunks": 0,
+        }
+
+        self.docs_queue = queue.Queue(maxsize=queue_size)
+        self.batch_queue = queue.Queue(maxsize=queue_size)
+        self.insert_queue = queue.Queue(maxsize=queue_size)
+        self.stats = {name: StageStats(name) for name in ("load", "split", "embed", "insert")}
+        self._stop = threading.Event()
+        self._error = None
+        self._embedders_left = embed_workers
+        self._embedders_lock = threading.Lock()
+
+    def run(self, documents: Iterable[list]) -> dict:
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._guard, args=(self._load, documents), name="ingest-load"),
+            threading.Thread(target=self._guard, args=(self._split,), name="ingest-split"),
+            threading.Thread(target=self._guard, args=(self._insert,), name="ingest-insert"),
+        ] + [
+            threading.Thread(target=self._guard, args=(self._embed,), name=f"ingest-embed-{i}")
+            for i in range(self.embed_workers)
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        # The insert stage is the last to finish, whether the run completes or a stage fails
+        insert_thread = threads[2]
+        while insert_thread.is_alive():
+            insert_thread.join(INGEST_PROGRESS_INTERVAL)
+            if insert_thread.is_alive():
+                self._report(time.perf_counter() - start)
+        self._stop.set()
+        for thread in threads:
+            thread.join()
+
+        if self._error is not None:
+            self._report(time.perf_counter() - start)
+            raise self._error
+        if self.incremental and self.prune_missing:
+            self._prune_missing_references()
+        report = self._report(time.perf_counter() - start)
+        if self.incremental:
+            with self._pending_lock:
+                report["sync"] = dict(self.sync)
+            print(f"INGEST [{self.collection_name}] sync: {report['sync']}")
+        return report
+
+    def _report(self, elapsed: float) -> dict:
+        report = {name: stats.as_dict(elapsed) for name, stats in self.stats.items()}
+        summary = "  ".join(
+            f"{name}: {r['items']} items, {r['chunks']} chunks ({r['chunks_per_s']}/s, {r['tokens_per_s']} tok/s)"
+            for name, r in report.items()
+        )
+        print(f"INGEST [{self.collection_name}] {elapsed:.1f}s  {summary}")
+        report["elapsed_s"] = round(elapsed, 2)
+        return report
+
+    def _guard(self, target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+            print(f"INGEST: Stage {threading.current_thread().name} failed: {e}")
+            self._stop.set()
+
+    def _put(self, q: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _load(self, documents: Iterable[list]):
+        try:
+            iterator = iter(documents)
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    docs = next(iterator)
+                except StopIteration:
+                    break
+                self.stats["load"].record(
+                    items=len(docs),
+                    tokens=sum(estimate_tokens(doc.page_content) for doc in docs),
+                    busy_seconds=time.perf_counter() - started,
+                )
+                self._put(self.docs_queue, docs)
+        finally:
+            self._put(self.docs_queue, _DONE)
+
+    def _split(self):
+        batch = []
+        try:
+            while True:
+                docs = self._get(self.docs_queue)
+                if docs is _DONE:
+                    break
+                started = time.perf_counter()
+                if self.incremental:
+                    chunks = self._changed_chunks(docs)
+                else:
+                    chunks = split_docs_to_chunks(docs, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+                self.stats["split"].record(
+                    items=len(docs),
+                    chunks=len(chunks),
+                    tokens=sum(estimate_tokens(chunk.text) for chunk in chunks),
+                    busy_seconds=time.perf_counter() - started,
+                )
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) >= self.batch_size:
+                        self._put(self.batch_queue, batch)
+                        batch = []
+            if batch:
+                self._put(self.batch_queue, batch)
+        finally:
+            for _ in range(self.embed_workers):
+                self._put(self.batch_queue, _DONE)
+
+    def _existing_rows(self, reference: str) -> list:
+        rows = []
+        while True:
+            page = self.vector_db.client.query(
+                collection_name=self.collection_name,
+                filter=f"reference == {json.dumps(reference)}",
+                output_fields=["id", "metadata"],
+                limit=INGEST_QUERY_PAGE_SIZE,
+                offset=len(rows),
+            )
+            rows.extend(page)
+            if len(page) < INGEST_QUERY_PAGE_SIZE:
+                return rows
+
+    def _count(self, **amounts):
+        with self._pending_lock:
+            for name, amount in amounts.items():
+                self.sync[name] += amount
+
+    def _delete_ids(self, ids: list):
+        if ids:
+            self.vector_db.client.delete(collection_name=self.collection_name, ids=ids)
+            self._count(deleted_chunks=len(ids))
+
+    def _complete(self, reference: str, version: dict):
+        """Every new chunk of a document is stored: drop its stale chunks, then record the version."""
+        self._delete_ids(version["stale_ids"])
+        self.manifest.put(self.collection_name, reference, version["doc_hash"], version["chunk_count"])
+
+    def _changed_chunks(self, docs: list) -> list:
+        """Diffs one loaded source against the collection and returns only the chunks to embed."""
+        groups = {}
+        for doc in docs:
+            groups.setdefault(doc.metadata.get("reference", ""), []).append(doc)
+
+        new_chunks = []
+        for reference, group in groups.items():
+            if reference in self.seen_references:
+                # Diffing it again would race the first copy's pending inserts and stale deletes
+                print(f"INGEST [{self.collection_name}] Skipping repeated reference {reference!r}")
+                self._count(duplicate_documents=1)
+                continue
+            self.seen_references.add(reference)
+            doc_hash = document_fingerprint(group)
+            existing = self._existing_rows(reference)
+            if existing and self.manifest.get(self.collection_name, reference) == (doc_hash, len(existing)):
+                self._count(unchanged_documents=1, kept_chunks=len(existing))
+                continue
+            self._count(**{"changed_documents" if existing else "new_documents": 1})
+
+            # chunk_hash -> ids of rows already stored with that content
+            stored = {}
+            for row in existing:
+                stored.setdefault((row.get("metadata") or {}).get("chunk_hash"), []).append(row["id"])
+
+            seen_hashes = set()
+            document_chunks = []
+            kept = 0
+            for chunk in split_docs_to_chunks(group, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap):
+                chunk_hash = chunk_fingerprint(chunk)
+                if chunk_hash in seen_hashes:
+                    continue
+                seen_hashes.add(chunk_hash)
+                chunk.metadata["doc_hash"] = doc_hash
+                chunk.metadata["chunk_hash"] = chunk_hash
+                chunk.reference = reference
+                if stored.get(chunk_hash):
+                    stored[chunk_hash].pop()
+                    kept += 1
+                else:
+                    document_chunks.append(chunk)
+
+            version = {
+                "doc_hash": doc_hash,
+                "chunk_count": len(seen_hashes),
+                "stale_ids": [row_id for ids in stored.values() for row_id in ids],
+                "chunks_left": len(document_chunks),
+            }
+            self._count(kept_chunks=kept, new_chunks=len(document_chunks))
+            if document_chunks:
+                with self._pending_lock:
+                    self._pending[reference] = version
+                new_chunks.extend(document_chunks)
+            else:
+                self._complete(reference, version)
+        return new_chunks
+
+    def _inserted(self, batch: list):
+        """Counts a stored batch against its documents and completes those with nothing left to insert."""
+        completed = []
+        with self._pending_lock:
+            for chunk in batch:
+                version = self._pending.get(chunk.reference)
+                if version is None:
+                    continue
+                version["chunks_left"] -= 1
+                if version["chunks_left"] == 0:
+                    completed.append((chunk.reference, self._pending.pop(chunk.reference)))
+        for reference, version in completed:
+            self._complete(reference, version)
+
+    def _prune_missing_references(self):
+        if not self.seen_references:
+            # An empty load is far more likely a crawl/loader failure than an emptied source
+            print(f"INGEST [{self.collection_name}] Nothing was loaded, skipping prune")
+            return
+        references = json.dumps(sorted(self.seen_references))
+        result = self.vector_db.client.delete(
+            collection_name=self.collection_name, filter=f"reference not in {references}"
+        )
+        if isinstance(result, dict):
+            self._count(deleted_chunks=result.get("delete_count", 0))
+        self.manifest.forget(self.collection_name, keep_references=self.seen_references)
+
+    def _embed(self):
+        try:
+            while True:
+                batch = self._get(self.batch_queue)
+                if batch is _DONE:
+                    break
+                self.rate_limiter.acquire()
+                started = time.perf_counter()
+                embeddings = self.embedding_model.embed_documents([chunk.text for chunk in batch])
+                for chunk, embedding in zip(batch, embeddings):
+                    chunk.embedding = embedding
+                self.stats["embed"].record(
+                    items=1,
+                    chunks=len(batch),
+                    tokens=sum(estimate_tokens(chunk.text) for chunk in batch),
+                    busy_seconds=time.perf_counter() - started,
+                )
+                self._put(self.insert_queue, batch)
+        finally:
+            with self._embedders_lock:
+                self._embedders_left -= 1
+                last = self._embedders_left == 0
+            if last:
+                self._put(self.insert_queue, _DONE)
+
+    def _insert(self):
+        while True:
+            batch = self._get(self.insert_queue)
+            if batch is _DONE:
+                break
+            started = time.perf_counter()
+            self.vector_db.insert_data(collection=self.collection_name, chunks=batch)
+            if self.incremental:
+                self._inserted(batch)
+            self.stats["insert"].record(
+                items=1,
+                chunks=len(batch),
+                tokens=sum(estimate_tokens(chunk.text) for chunk in batch),
+                busy_seconds=time.perf_counter() - started,
+            )
+
+
+def _init_collection(collection_name: str, collection_description: str, force_new_collection: bool) -> str:
+    configuration = deepsearcher_runtime.get()
+    vector_db = configuration.vector_db
+    if collection_name is None:
+        collection_name = vector_db.default_collection
+    collection_name = collection_name.replace(" ", "_").replace("-", "_")
+    if force_new_collection:
+        get_manifest().forget(collection_name)
+    vector_db.init_collection(
+        dim=configuration.embedding_model.dimension,
+        collection=collection_name,
+        description=collection_description,
+        force_new_collection=force_new_collection,
+    )
+    return collection_name
+
+
+def stream_load_from_website(
+    urls: Union[str, List[str]],
+    collection_name: str = None,
+    collection_description: str = None,
+    force_new_collection: bool = False,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 100,
+    batch_size: int = 64,
+    embed_workers: int = INGEST_EMBED_WORKERS,
+    incremental: bool = False,
+    prune_missing: bool = False,
+    **crawl_kwargs,
+) -> dict:
+    """
+    Streaming counterpart of deepsearcher's `load_from_website`.
+
+    URLs are crawled one at a time and flow through the pipeline as soon as each is crawled.
+    With `incremental=True` only changed content is re-embedded; with `prune_missing=True` as
+    well, pages that are not in `urls` are removed from the collection, so only pass it when
+    `urls` is the complete set of pages the collection should hold.
+    Returns the per-stage throughput report.
+    """
+    if isinstance(urls, str):
+        urls = [urls]
+    collection_name = _init_collection(collection_name, collection_description, force_new_collection)
+    web_crawler = deepsearcher_runtime.get().web_crawler
+
+    def documents():
+        for url in urls:
+            yield web_crawler.crawl_url(url, **crawl_kwargs)
+
+    pipeline = IngestPipeline(
+        collection_name, chunk_size, chunk_overlap, batch_size, embed_workers,
+        incremental=incremental, prune_missing=prune_missing,
+    )
+    return pipeline.run(documents())
+
+
+def stream_load_from_local_files(
+    paths_or_directory: Union[str, List[str]],
+    collection_name: str = None,
+    collection_description: str = None,
+    force_new_collection: bool = False,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 100,
+    batch_size: int = 64,
+    embed_workers: int = INGEST_EMBED_WORKERS,
+    incremental: bool = False,
+    prune_missing: bool = False,
+) -> dict:
+    """
+    Streaming counterpart of deepsearcher's `load_from_local_files`.
+
+    Files are loaded one at a time (directories are expanded file by file) and flow through
+    the pipeline as soon as each is loaded. With `incremental=True` only changed content is
+    re-embedded; with `prune_missing=True` as well, files that were not loaded this time are
+    removed from the collection, so only pass it when the paths cover the whole collection.
+    Returns the per-stage throughput report.
+    """
+    if isinstance(paths_or_directory, str):
+        paths_or_directory = [paths_or_directory]
+    for path in paths_or_directory:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Error: File or directory '{path}' does not exist.")
+    collection_name = _init_collection(collection_name, collection_description, force_new_collection)
+    file_loader = deepsearcher_runtime.get().file_loader
+
+    def documents():
+        for path in paths_or_directory:
+            if os.path.isdir(path):
+                for root, _, files in os.walk(path):
+                    for name in sorted(files):
+                        if any(name.endswith(suffix) for suffix in file_loader.supported_file_types):
+                            yield file_loader.load_file(os.path.join(root, name))
+            else:
+                yield file_loader.load_file(path)
+
+    pipeline = IngestPipeline(
+        collection_name, chunk_size, chunk_overlap, batch_size, embed_workers,
+        incremental=incremental, prune_missing=prune_missing,
+    )
+    return pipeline.run(documents())
@@ -1,9 +1,16 @@
 import logging
 import os, sys
+import threading
+import time
+import types
+from types import SimpleNamespace
 from dotenv import load_dotenv
-from deepsearcher.offline_loading import load_from_website
+from deepsearcher import configuration
 from deepsearcher.online_query import query
 from deepsearcher.configuration import Configuration, init_config
+from tools.deepsearch_rerank import install_concurrent_rerank
+from tools.embedding_cache import EmbeddingCache, install_embedding_cache
+from tools.metrics import DEEPSEARCHER_PHASE_SECONDS
 
 
 # Suppress unnecessary logging from third-party libraries
@@ -20,62 +27,157 @@ load_dotenv()
 # GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # os.environ['GEMINI_API_KEY'] = GEMINI_API_KEY
 
-def get_deepsearcher(search_info: str):
-    # # Step 1: Initialize configuration
-    # config = Configuration()
-
-    # # Set up Vector Database (Milvus) and Web Crawler (Crawl4AI)
-    # config.set_provider_config("vector_db", "Milvus", {})
-    # # config.set_provider_config('llm', 'Gemini', { 'model': 'gemini-2.0-flash' })
-    # config.set_provider_config("web_crawler", "Crawl4AICrawler", {"browser_config": {"headless": True, "verbose": True}})
-
-
-    # # Apply the configuration
-    # init_config(config)
+# How often (in seconds) the refresher thread verifies the Milvus connection (0 disables it)
+DEEPSEARCHER_HEALTH_CHECK_INTERVAL = float(os.getenv("DEEPSEARCHER_HEALTH_CHECK_INTERVAL", "60"))
 
-    # # Step 2: Load data from a website into Milvus
-    # website_url = ["https://media.aws.singtel.com/info-singtel/sr2024/Singtel-Group-Sustainability-Report-2024.pdf"]  # Replace with your target website, can be a list of URLs
-    # collection_name = "Singtel_PDF" # No Spacing Allowed
-    # collection_description = "Singtel Sustainability Efforts"
-
-    # # crawl a single webpage
-    # load_from_website(urls=website_url, collection_name=collection_name, collection_description=collection_description)
-    # # only applicable if using Firecrawl: deepsearcher can crawl multiple webpages, by setting max_depth, limit, allow_backward_links
-    # # load_from_website(urls=website_url, max_depth=2, limit=20, allow_backward_links=True, collection_name=collection_name, collection_description=collection_description)
-
-    # # Step 3: Query the loaded data
-    # result = query(search_info)
-    
 
+def build_config() -> Configuration:
     config = Configuration()
 
     # Set providers with API keys
     config.set_provider_config("vector_db", "Milvus", {})
     config.set_provider_config("llm", "OpenAI", {
         "model": "o1-mini",
-     
+
     })
     config.set_provider_config("embedding", "OpenAIEmbedding", {
         "model": "text-embedding-ada-002",
-        
+
     })
     config.set_provider_config("web_crawler", "Crawl4AICrawler", {"browser_config": {"headless": True, "verbose": True}})
-    init_config(config)
+    return config
+
+
+# Globals that init_config assigns in deepsearcher.configuration
+RUNTIME_ATTRIBUTES = ("module_factory", "llm", "embedding_model", "file_loader", "vector_db",
+                      "web_crawler", "default_searcher", "naive_rag")
+
+
+def _build_runtime(config: Configuration) -> SimpleNamespace:
+    """
+    Builds the clients and agents for `config` without touching deepsearcher.configuration.
+
+    init_config writes straight into the module's globals, so it is run against a copy of them;
+    queries keep using the current runtime until the new one is swapped in.
+    """
+    staging = dict(vars(configuration))
+    types.FunctionType(init_config.__code__, staging)(config)
+    return SimpleNamespace(**{name: staging[name] for name in RUNTIME_ATTRIBUTES})
+
+
+class DeepSearcherRuntime:
+    """
+    Process-wide deepsearcher runtime (LLM, embedding and crawler clients, Milvus connection
+    and RAG agents), initialised once on first use instead of on every tool call.
+
+    - `get()` is thread-safe; concurrent first callers wait for a single initialisation.
+      After that it returns immediately: the request path never checks the connection.
+    - A refresher thread, started by the first initialisation, health-checks the Milvus
+      connection every DEEPSEARCHER_HEALTH_CHECK_INTERVAL seconds. If the check fails it builds
+      a new runtime and swaps it in; until then, and if the rebuild fails, queries keep the old one.
+    """
+
+    def __init__(self, health_check_interval: float = DEEPSEARCHER_HEALTH_CHECK_INTERVAL):
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._embedding_cache = None
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def get(self):
+        """Returns the initialised `deepsearcher.configuration` module."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._initialize()
+                    self._start_refresher()
+        return configuration
+
+    def _initialize(self):
+        start = time.perf_counter()
+        runtime = _build_runtime(build_config())
+        if self._embedding_cache is None:
+            self._embedding_cache = EmbeddingCache()
+        install_embedding_cache(runtime, self._embedding_cache)
+        install_concurrent_rerank(runtime.default_searcher)
+        # One dict update swaps every client and agent at once
+        vars(configuration).update(vars(runtime))
+        self._initialized = True
+        DEEPSEARCHER_PHASE_SECONDS.observe(time.perf_counter() - start, phase="init")
+        print(f"DEEPSEARCHER: Runtime initialised in {time.perf_counter() - start:.2f}s")
+
+    def _start_refresher(self):
+        if self._refresher is None and self.health_check_interval > 0:
+            self._refresher = threading.Thread(target=self._refresh_loop, name="deepsearcher-refresher", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            if self._is_healthy():
+                continue
+            print("DEEPSEARCHER: Milvus health check failed, reconnecting...")
+            try:
+                with self._lock:
+                    self._initialize()
+            except Exception as e:
+                print(f"DEEPSEARCHER: Reconnect failed, keeping the current runtime: {e}")
+
+    def stop(self):
+        """Stops the refresher thread."""
+        self._stop.set()
+
+    def _is_healthy(self) -> bool:
+        try:
+            configuration.vector_db.client.list_collections()
+            return True
+        except Exception as e:
+            print(f"DEEPSEARCHER: Health check error: {e}")
+            return False
+
+
+deepsearcher_runtime = DeepSearcherRuntime()
+
+
+def warm_up_deepsearcher():
+    """Initialises the runtime on a background thread so the first tool call is fast."""
+    threading.Thread(target=deepsearcher_runtime.get, name="deepsearcher-warmup", daemon=True).start()
+
 
-    # # Collection configuration
-    # collection_name = "Singtel_PDF"
-    # collection_description = "Singtel Sustainability Efforts 2024"
+def get_deepsearcher(search_info: str):
+    """
+    Answers a question from the Milvus knowledge base using the warm deepsearcher runtime.
 
-    # # Load into Milvus
-    # load_from_website(
-    #     urls=["https://media.aws.singtel.com/info-singtel/sr2024/Singtel-Group-Sustainability-Report-2024.pdf"],
-    #     collection_name=collection_name,
-    #     collection_description=collection_description
-    # )
+    Returns the answer, the distinct source references of the chunks it was built from,
+    and the number of LLM tokens consumed.
+    """
+    print(f"TOOL SERVER: Called get_deepsearcher for: {search_info}")
+    deepsearcher_runtime.get()
 
     # Query from Milvus
-    result = query(search_info)
+    with DEEPSEARCHER_PHASE_SECONDS.time(phase="query"):
+        answer, retrieved_results, consume_tokens = query(search_info)
+
+    references = {}
+    for result in retrieved_results:
+        references[result.reference] = references.get(result.reference, 0) + 1
+
+    return {
+        "answer": answer,
+        "references": [{"reference": reference, "chunks": count} for reference, count in references.items()],
+        "token_usage": consume_tokens,
+    }
+
+
+# # Loading data into Milvus (run once, offline):
+# from deepsearcher.offline_loading import load_from_website
+# deepsearcher_runtime.get()
+# load_from_website(
+#     urls=["https://media.aws.singtel.com/info-singtel/sr2024/Singtel-Group-Sustainability-Report-2024.pdf"],
+#     collection_name="Singtel_PDF",  # No Spacing Allowed
+#     collection_description="Singtel Sustainability Efforts 2024"
+# )
 
 
 if __name__ == "__main__":
-    get_deepsearcher(search_info = "What is Singtel Sustainability Efforts in 2024? Are you pulling chunks from milvus or just webcrawling?")
\ No newline at end of file
+    print(get_deepsearcher(search_info = "What is Singtel Sustainability Efforts in 2024? Are you pulling chunks from milvus or just webcrawling?"))
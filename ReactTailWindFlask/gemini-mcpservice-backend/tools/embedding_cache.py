@@ -0,0 +1,160 @@
+# server/tools/embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from deepsearcher.embedding.base import BaseEmbedding
+
+from tools.metrics import DEEPSEARCHER_PHASE_SECONDS
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "embedding_cache.sqlite3")
+)
+# Resident size of the in-memory LRU, per process. A float32 vector takes 4 bytes per dimension
+# (6 KiB at 1536 dims), so the default holds about 5,400 such vectors; the SQLite table below
+# it is unbounded and serves whatever the LRU has evicted.
+EMBEDDING_CACHE_MEMORY_BYTES = int(os.getenv("EMBEDDING_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+EMBEDDING_BATCH_SIZE = 256  # texts per upstream embedding request on a miss
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store: an in-memory LRU in front of a SQLite table.
+
+    Keys are "<namespace>:<sha256 of text>", where the namespace pins the model and dimension,
+    and vectors are stored as raw float32 bytes. The LRU is bounded by the total size of its
+    vectors (`memory_bytes`), not their number, so its footprint does not depend on the model.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, memory_bytes: int = EMBEDDING_CACHE_MEMORY_BYTES):
+        self.memory_bytes = memory_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(namespace: str, text: str) -> str:
+        return f"{namespace}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+
+            missing = [key for key in keys if key not in found]
+            # SQLite limits the number of bound parameters, so look up in slices
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: dict):
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in items.items()],
+            )
+            self._db.commit()
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_entries": len(self._memory),
+                    "memory_bytes": self._memory_used, "memory_limit_bytes": self.memory_bytes}
+
+    def _remember(self, key, vector):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_used -= previous.nbytes
+        if vector.nbytes > self.memory_bytes:
+            return
+        self._memory[key] = vector
+        self._memory_used += vector.nbytes
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= evicted.nbytes
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Wraps any deepsearcher embedding model with an EmbeddingCache.
+
+    Both query embeddings and document/chunk embeddings (and therefore `embed_chunks` during
+    ingestion) are served from the cache; misses are de-duplicated and sent upstream in batches.
+    """
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache):
+        self.inner = inner
+        self.cache = cache
+        model = getattr(inner, "model", None) or getattr(inner, "model_name", None) or type(inner).__name__
+        self.namespace = f"{model}:{inner.dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self.inner.dimension
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache.make_key(f"q:{self.namespace}", text)
+        found = self.cache.get_many([key])
+        if key not in found:
+            with DEEPSEARCHER_PHASE_SECONDS.time(phase="embed"):
+                found[key] = np.asarray(self.inner.embed_query(text), dtype=np.float32)
+            self.cache.put_many({key: found[key]})
+        return found[key].tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.make_key(f"d:{self.namespace}", text) for text in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        missing_keys = list(missing)
+        for i in range(0, len(missing_keys), EMBEDDING_BATCH_SIZE):
+            batch_keys = missing_keys[i:i + EMBEDDING_BATCH_SIZE]
+            with DEEPSEARCHER_PHASE_SECONDS.time(phase="embed"):
+                vectors = self.inner.embed_documents([missing[key] for key in batch_keys])
+            new_items = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(batch_keys, vectors)}
+            self.cache.put_many(new_items)
+            found.update(new_items)
+
+        return [found[key].tolist() for key in keys]
+
+
+def install_embedding_cache(configuration, cache: EmbeddingCache = None) -> CachedEmbedding:
+    """
+    Wraps `configuration.embedding_model` with the cache and points every agent at it, so both
+    the query path (agents) and the ingest path (offline_loading) go through the cache.
+    """
+    embedding_model = configuration.embedding_model
+    if not isinstance(embedding_model, CachedEmbedding):
+        embedding_model = CachedEmbedding(embedding_model, cache or EmbeddingCache())
+    configuration.embedding_model = embedding_model
+    for agent in list(configuration.default_searcher.rag_agents) + [configuration.naive_rag]:
+        agent.embedding_model = embedding_model
+    return embedding_model
@@ -0,0 +1,344 @@
+# server/tools/feed_history.py
+#
+# Local time series of the data.gov.sg transport feeds. A background poller records every new
+# taxi, carpark and traffic camera snapshot into SQLite (one row per snapshot, keyed by its
+# epoch second, with the per-item columns stored as compact NumPy/zlib blobs), so questions
+# about a time window are answered by one local range scan instead of one upstream request
+# per timestamp.
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from tools import carkpark_availability_tool, taxi_availability_tool, traffic_images_tool
+from tools.snapshot_cache import snapshot_cache, CARPARK_AVAILABILITY_TTL, TAXI_AVAILABILITY_TTL, TRAFFIC_IMAGES_TTL
+from tools.taxi_spatial_index import to_metres
+
+FEED_HISTORY_PATH = os.getenv(
+    "FEED_HISTORY_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "feed_history.sqlite3")
+)
+FEED_HISTORY_POLL_INTERVAL = float(os.getenv("FEED_HISTORY_POLL_INTERVAL", "60"))  # seconds
+FEED_HISTORY_RETENTION_DAYS = float(os.getenv("FEED_HISTORY_RETENTION_DAYS", "7"))
+DEFAULT_WINDOW = timedelta(hours=1)
+MAX_SERIES_POINTS = 24
+
+SGT = timezone(timedelta(hours=8))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS taxi_snapshots (
+    ts INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, taxi_count INTEGER NOT NULL, positions BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS carpark_snapshots (
+    ts INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, lots_available_total INTEGER NOT NULL,
+    carpark_numbers BLOB NOT NULL, lot_types BLOB NOT NULL, total_lots BLOB NOT NULL, lots_available BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS camera_snapshots (
+    ts INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, camera_count INTEGER NOT NULL, cameras BLOB NOT NULL
+);
+"""
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parses feed timestamps and tool arguments; naive values are taken as SGT."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=SGT)
+
+
+def _pack_strings(values) -> bytes:
+    return zlib.compress("\n".join(values).encode("utf-8"))
+
+
+def _unpack_strings(blob: bytes) -> np.ndarray:
+    text = zlib.decompress(blob).decode("utf-8")
+    return np.array(text.split("\n") if text else [], dtype=np.str_)
+
+
+def _stats(values: np.ndarray) -> dict:
+    return {
+        "first": int(values[0]),
+        "last": int(values[-1]),
+        "change": int(values[-1] - values[0]),
+        "min": int(values.min()),
+        "max": int(values.max()),
+        "mean": round(float(values.mean()), 1),
+    }
+
+
+def _sample_indices(n: int, max_points: int = MAX_SERIES_POINTS) -> np.ndarray:
+    """Evenly spaced indices into a sequence of length n, always including the first and last."""
+    if n == 0:
+        return np.empty(0, dtype=int)
+    return np.unique(np.linspace(0, n - 1, min(max_points, n)).round().astype(int))
+
+
+def _series(timestamps: list, values: np.ndarray) -> list:
+    return [{"timestamp": timestamps[i], "value": int(values[i])} for i in _sample_indices(len(values))]
+
+
+class FeedHistoryStore:
+    """SQLite-backed snapshot store; every table is indexed by snapshot time (ts, epoch seconds)."""
+
+    def __init__(self, path: str = FEED_HISTORY_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def record_taxi(self, data: dict) -> bool:
+        feature = data["features"][0]
+        timestamp = feature["properties"]["timestamp"]
+        positions = np.asarray(feature["geometry"]["coordinates"], dtype=np.float32).reshape(-1, 2)
+        return self._insert(
+            "INSERT OR IGNORE INTO taxi_snapshots VALUES (?, ?, ?, ?)",
+            (int(parse_timestamp(timestamp).timestamp()), timestamp, len(positions), positions.tobytes()),
+        )
+
+    def record_carpark(self, data: dict) -> bool:
+        item = data["items"][0]
+        numbers, lot_types, total_lots, available = [], [], [], []
+        for carpark in item.get("carpark_data", []):
+            for info in carpark.get("carpark_info", []):
+                numbers.append(carpark.get("carpark_number", ""))
+                lot_types.append(info.get("lot_type", ""))
+                total_lots.append(int(info.get("total_lots") or 0))
+                available.append(int(info.get("lots_available") or 0))
+        available = np.array(available, dtype=np.int32)
+        return self._insert(
+            "INSERT OR IGNORE INTO carpark_snapshots VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                int(parse_timestamp(item["timestamp"]).timestamp()), item["timestamp"], int(available.sum()),
+                _pack_strings(numbers), _pack_strings(lot_types),
+                np.array(total_lots, dtype=np.int32).tobytes(), available.tobytes(),
+            ),
+        )
+
+    def record_cameras(self, data: dict) -> bool:
+        item = data["items"][0]
+        cameras = [
+            {
+                "camera_id": camera.get("camera_id"),
+                "latitude": camera.get("location", {}).get("latitude"),
+                "longitude": camera.get("location", {}).get("longitude"),
+                "image": camera.get("image"),
+                "timestamp": camera.get("timestamp"),
+            }
+            for camera in item.get("cameras", [])
+        ]
+        return self._insert(
+            "INSERT OR IGNORE INTO camera_snapshots VALUES (?, ?, ?, ?)",
+            (
+                int(parse_timestamp(item["timestamp"]).timestamp()), item["timestamp"], len(cameras),
+                zlib.compress(json.dumps(cameras, separators=(",", ":")).encode("utf-8")),
+            ),
+        )
+
+    def scan(self, table: str, columns: str, start_ts: int, end_ts: int) -> list:
+        with self._lock:
+            return self._db.execute(
+                f"SELECT {columns} FROM {table} WHERE ts BETWEEN ? AND ? ORDER BY ts", (start_ts, end_ts)
+            ).fetchall()
+
+    def prune(self, older_than_ts: int):
+        with self._lock:
+            for table in ("taxi_snapshots", "carpark_snapshots", "camera_snapshots"):
+                self._db.execute(f"DELETE FROM {table} WHERE ts < ?", (older_than_ts,))
+            self._db.commit()
+
+    def _insert(self, sql: str, row: tuple) -> bool:
+        with self._lock:
+            inserted = self._db.execute(sql, row).rowcount > 0
+            self._db.commit()
+        return inserted
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feed_history_store() -> FeedHistoryStore:
+    """Returns the process-wide store, opening the database on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = FeedHistoryStore()
+    return _store
+
+
+# Feed name -> (tool module, its fetch helper, snapshot TTL, store method)
+_FEEDS = {
+    "taxi": (taxi_availability_tool, taxi_availability_tool._fetch_taxi_availability, TAXI_AVAILABILITY_TTL, FeedHistoryStore.record_taxi),
+    "carpark": (carkpark_availability_tool, carkpark_availability_tool._fetch_carpark_availability, CARPARK_AVAILABILITY_TTL, FeedHistoryStore.record_carpark),
+    "traffic_cameras": (traffic_images_tool, traffic_images_tool._fetch_traffic_images, TRAFFIC_IMAGES_TTL, FeedHistoryStore.record_cameras),
+}
+
+
+class FeedPoller:
+    """Daemon thread that records the latest snapshot of every feed each `interval` seconds."""
+
+    def __init__(self, interval: float = FEED_HISTORY_POLL_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="feed-history-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def poll_once(self) -> dict:
+        store = get_feed_history_store()
+        recorded = {}
+        for feed, (module, fetch, ttl, record) in _FEEDS.items():
+            try:
+                # Goes through the snapshot cache, so polling also keeps the tools' latest data warm
+                data = snapshot_cache.get_or_fetch(module.BASE_URL, None, lambda fetch=fetch: fetch({}), ttl)
+                recorded[feed] = record(store, data)
+            except Exception as e:
+                print(f"FEED HISTORY: Failed to record {feed} snapshot: {e}")
+                recorded[feed] = False
+        store.prune(int(time.time() - FEED_HISTORY_RETENTION_DAYS * 86400))
+        return recorded
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.poll_once()
+            self._stop.wait(self.interval)
+
+
+feed_poller = FeedPoller()
+
+
+def start_feed_history_poller():
+    feed_poller.start()
+    print(f"FEED HISTORY: Recording feed snapshots every {feed_poller.interval:.0f}s to {FEED_HISTORY_PATH}")
+
+
+def _taxi_history(rows, latitude, longitude, radius_m) -> dict:
+    timestamps = [row[0] for row in rows]
+    if latitude is None or longitude is None:
+        counts = np.array([row[1] for row in rows], dtype=np.int64)
+        label = "taxi_count"
+    else:
+        qx, qy = to_metres(latitude, longitude)
+        r2 = float(radius_m) ** 2
+        counts = np.empty(len(rows), dtype=np.int64)
+        for i, (_, _, blob) in enumerate(rows):
+            lonlat = np.frombuffer(blob, dtype=np.float32).reshape(-1, 2)
+            x, y = to_metres(lonlat[:, 1], lonlat[:, 0])
+            counts[i] = int(np.count_nonzero((x - qx) ** 2 + (y - qy) ** 2 <= r2))
+        label = f"taxis_within_{int(radius_m)}m"
+    return {"metric": label, "stats": _stats(counts), "series": _series(timestamps, counts)}
+
+
+def _carpark_history(rows, carpark_numbers, lot_type) -> dict:
+    timestamps = [row[0] for row in rows]
+    if not carpark_numbers and not lot_type:
+        totals = np.array([row[1] for row in rows], dtype=np.int64)
+        return {"metric": "lots_available_all_carparks", "stats": _stats(totals), "series": _series(timestamps, totals)}
+
+    wanted = [str(n).upper() for n in carpark_numbers or []]
+    totals = np.empty(len(rows), dtype=np.int64)
+    per_carpark = {}
+    for i, (timestamp, _, numbers_blob, types_blob, available_blob) in enumerate(rows):
+        numbers = _unpack_strings(numbers_blob)
+        available = np.frombuffer(available_blob, dtype=np.int32)
+        mask = np.ones(len(numbers), dtype=bool)
+        if wanted:
+            mask &= np.isin(numbers, wanted)
+        if lot_type:
+            mask &= _unpack_strings(types_blob) == lot_type.upper()
+        totals[i] = int(available[mask].sum())
+        if wanted:
+            for number in wanted:
+                per_carpark.setdefault(number, []).append(int(available[mask & (numbers == number)].sum()))
+
+    result = {"metric": "lots_available", "stats": _stats(totals), "series": _series(timestamps, totals)}
+    if per_carpark:
+        result["per_carpark"] = {number: _stats(np.array(values)) for number, values in per_carpark.items()}
+    return result
+
+
+def _camera_history(rows, camera_id) -> dict:
+    timestamps = [row[0] for row in rows]
+    counts = np.array([row[1] for row in rows], dtype=np.int64)
+    result = {"metric": "camera_count", "stats": _stats(counts), "series": _series(timestamps, counts)}
+    if camera_id:
+        images = []
+        for timestamp, _, blob in rows:
+            for camera in json.loads(zlib.decompress(blob)):
+                if camera["camera_id"] == str(camera_id):
+                    images.append({"timestamp": camera["timestamp"], "image": camera["image"]})
+        # Consecutive snapshots often repeat the same frame
+        unique = list({image["image"]: image for image in images}.values())
+        result["camera_images"] = [unique[i] for i in _sample_indices(len(unique))]
+    return result
+
+
+def get_feed_history(feed: str, start_time: str = None, end_time: str = None, latitude: float = None,
+                     longitude: float = None, radius_m: float = 1000, carpark_numbers: list = None,
+                     lot_type: str = None, camera_id: str = None) -> dict:
+    """
+    Summarises a feed over a time window from the locally recorded snapshots.
+
+    - `feed` is 'taxi', 'carpark' or 'traffic_cameras'.
+    - `start_time` / `end_time` are 'YYYY-MM-DDTHH:mm:ss' (SGT); the default window is the last hour.
+    - taxi: total available taxis, or taxis within `radius_m` of `latitude`/`longitude`.
+    - carpark: lots available over all carparks, or over `carpark_numbers` / `lot_type`.
+    - traffic_cameras: camera count, plus the image timeline of `camera_id` if given.
+
+    Returns first/last/change/min/max/mean over the window and a downsampled series.
+    """
+    print(f"TOOL SERVER: Called get_feed_history for {feed} from {start_time} to {end_time}")
+    try:
+        end = parse_timestamp(end_time) if end_time else datetime.now(SGT)
+        start = parse_timestamp(start_time) if start_time else end - DEFAULT_WINDOW
+    except ValueError as e:
+        return {"error": "InvalidTime", "message": f"Times must be 'YYYY-MM-DDTHH:mm:ss': {e}"}
+    start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+
+    store = get_feed_history_store()
+    if feed == "taxi":
+        columns = "timestamp, taxi_count"
+        if latitude is not None and longitude is not None:
+            columns += ", positions"
+        rows = store.scan("taxi_snapshots", columns, start_ts, end_ts)
+    elif feed == "carpark":
+        columns = "timestamp, lots_available_total"
+        if carpark_numbers or lot_type:
+            columns += ", carpark_numbers, lot_types, lots_available"
+        rows = store.scan("carpark_snapshots", columns, start_ts, end_ts)
+    elif feed == "traffic_cameras":
+        rows = store.scan("camera_snapshots", "timestamp, camera_count, cameras", start_ts, end_ts)
+    else:
+        return {"error": "UnknownFeed", "message": "feed must be 'taxi', 'carpark' or 'traffic_cameras'."}
+
+    if not rows:
+        return {
+            "error": "NoHistory",
+            "message": "No snapshots were recorded in this window (the history poller runs when FEED_HISTORY_POLL=1).",
+        }
+
+    if feed == "taxi":
+        summary = _taxi_history(rows, latitude, longitude, radius_m)
+    elif feed == "carpark":
+        summary = _carpark_history(rows, carpark_numbers, lot_type)
+    else:
+        summary = _camera_history(rows, camera_id)
+
+    return {
+        "feed": feed,
+        "start": rows[0][0],
+        "end": rows[-1][0],
+        "snapshots": len(rows),
+        **summary,
+    }
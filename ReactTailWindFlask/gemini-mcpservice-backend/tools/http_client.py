@@ -0,0 +1,109 @@
+# server/tools/http_client.py
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tools.metrics import UPSTREAM_SECONDS, UPSTREAM_RESPONSE_BYTES
+
+# All settings can be overridden from .env.
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.3"))
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER", "0.2"))
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # number of per-host pools
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))  # keep-alive sockets per host
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes "br" responses when brotli is installed)
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies the default (connect, read) timeout when the caller sets none."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        return super().send(request, **kwargs)
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        connect=HTTP_MAX_RETRIES,
+        read=HTTP_MAX_RETRIES,
+        status=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the final 429/5xx back so raise_for_status() reports it
+    )
+    adapter = _TimeoutHTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide pooled session shared by every tool and Flask route.
+
+    - Connections are kept alive and pooled per host, so repeat calls to api.data.gov.sg
+      skip the TCP+TLS handshake.
+    - Every request gets a (connect, read) timeout unless the caller passes its own.
+    - Idempotent requests are retried with exponential backoff and jitter on connection
+      errors and on 429/5xx responses, honouring Retry-After.
+    - gzip (and brotli, when the `brotli` package is installed) responses are decoded transparently.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url: str, params: dict = None, timeout=None, **kwargs) -> requests.Response:
+    """Drop-in replacement for `requests.get` that goes through the shared session."""
+    host = urlsplit(url).hostname or "unknown"
+    start = time.perf_counter()
+    status = "error"
+    try:
+        response = get_session().get(url, params=params, timeout=timeout, **kwargs)
+        status = str(response.status_code)
+        if not kwargs.get("stream"):
+            UPSTREAM_RESPONSE_BYTES.observe(len(response.content), host=host)
+        return response
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, host=host, status=status)
+
+
+def close():
+    """Closes all pooled connections; the next call builds a fresh session."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,218 @@
+# server/tools/metrics.py
+#
+# In-process counters and latency/size histograms for every stage of a chat (Gemini calls,
+# tool executions, upstream HTTP fetches, Supabase writes, deepsearcher phases), rendered
+# in the Prometheus text exposition format by the /metrics route.
+import bisect
+import contextvars
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TRACE_HEADER = "X-Trace-Id"
+
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Trace id of the request being handled; set per request by the web layer
+trace_id = contextvars.ContextVar("trace_id", default=None)
+
+
+def new_trace_id(incoming: str = None) -> str:
+    """Adopts a well-formed trace id sent by the client, or generates one, and makes it current."""
+    value = incoming if incoming and _VALID_TRACE_ID.match(incoming) else uuid.uuid4().hex[:16]
+    trace_id.set(value)
+    return value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}  # label values tuple -> series state
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for values, state in series:
+            lines.extend(self._render_series(values, state))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, values, total):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(total)}"]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._series.get(key)
+            if state is None:
+                state = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][position] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the `with` block, in seconds (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            state = self._series.get(self._key(labels))
+            return state["count"] if state else 0
+
+    def _render_series(self, values, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+            cumulative += count
+            le = f'le="{_format_value(float(bound))}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+        lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of this process; registering the same name twice returns the existing metric."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+
+registry = MetricsRegistry()
+
+# --- Gemini ---
+GEMINI_SEND_SECONDS = registry.histogram(
+    "gemini_send_message_seconds", "Duration of one Gemini send_message call (streamed calls until fully consumed).", ["mode"])
+GEMINI_REQUEST_BYTES = registry.histogram(
+    "gemini_request_bytes", "Encoded size of the message sent to Gemini.", ["kind"], buckets=BYTES_BUCKETS)
+GEMINI_TOKENS = registry.counter(
+    "gemini_tokens_total", "Gemini tokens reported in usage_metadata.", ["kind"])
+
+# --- Tools ---
+TOOL_SECONDS = registry.histogram(
+    "tool_execution_seconds", "Duration of one execute_tool call, including result shaping.", ["tool", "outcome"])
+TOOL_QUEUE_SECONDS = registry.histogram(
+    "tool_queue_seconds", "Time a tool call waited for a free worker thread before it started.", ["pool"])
+TOOL_RESULT_BYTES = registry.histogram(
+    "tool_result_bytes", "Encoded size of tool results before and after shaping.", ["tool", "stage"], buckets=BYTES_BUCKETS)
+
+# --- Upstream HTTP (data.gov.sg, camera CDN, ...) ---
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_http_seconds", "Duration of one upstream HTTP fetch, including retries.", ["host", "status"])
+UPSTREAM_RESPONSE_BYTES = registry.histogram(
+    "upstream_http_response_bytes", "Decoded size of upstream HTTP response bodies.", ["host"], buckets=BYTES_BUCKETS)
+
+# --- Supabase ---
+CHAT_STORE_WRITE_SECONDS = registry.histogram(
+    "chat_store_write_seconds", "Duration of one batched Supabase chat write.", ["outcome"])
+CHAT_STORE_ROWS = registry.counter(
+    "chat_store_rows_total", "Prompt/response pairs handed to the chat store backend.", ["outcome"])
+
+# --- deepsearcher ---
+DEEPSEARCHER_PHASE_SECONDS = registry.histogram(
+    "deepsearcher_phase_seconds", "Duration of deepsearcher phases (init, query, embed, vector_search, rerank).", ["phase"])
+
+# --- Web layer ---
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "Time to produce a response (for streams, until the headers are sent).", ["route", "method", "status"])
+HTTP_REQUEST_BYTES = registry.histogram(
+    "http_request_bytes", "Size of request bodies.", ["route"], buckets=BYTES_BUCKETS)
+HTTP_RESPONSE_BYTES = registry.histogram(
+    "http_response_bytes", "Size of non-streamed response bodies.", ["route"], buckets=BYTES_BUCKETS)
+
+
+def record_gemini_usage(response):
+    """Adds the token counts of a Gemini response (blocking, or fully consumed stream) to GEMINI_TOKENS."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("candidates", "candidates_token_count"),
+                        ("total", "total_token_count")):
+        count = getattr(usage, field, 0) or 0
+        if count:
+            GEMINI_TOKENS.inc(count, kind=kind)
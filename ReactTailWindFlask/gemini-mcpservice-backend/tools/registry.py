@@ -0,0 +1,131 @@
+# server/tools/registry.py
+#
+# Tool declarations are cheap (tool_definitions.py only needs google.generativeai.types), but
+# the tool implementations are not: tools.deepsearcher_tool pulls in deepsearcher, langchain,
+# pymilvus, crawl4ai and the OpenAI SDK, and tools.websearch_tool pulls in duckduckgo_search.
+# The registry hands Gemini every declaration up front and imports each implementation module
+# only when its tool is first called (or when warmed up in the background).
+import importlib
+import os
+import threading
+import time
+
+from tools.metrics import registry as metrics_registry
+from tools.tool_definitions import (
+    WEATHER_TOOL, WEB_SEARCH_TOOL, CARPARK_AVAILABILITY_TOOL, TRAFFIC_IMAGES_TOOL, TAXI_AVAILABILITY_TOOL,
+    DEEPSEARCHER_TOOL, TAXI_SPATIAL_TOOL, FEED_HISTORY_TOOL,
+)
+
+# Import every tool module at startup instead of on first call
+TOOL_REGISTRY_EAGER = os.getenv("TOOL_REGISTRY_EAGER") == "1"
+# Import every tool module on a background thread after startup
+TOOL_REGISTRY_WARMUP = os.getenv("TOOL_REGISTRY_WARMUP") == "1"
+# Record feed snapshots in the background; get_feed_history has no data otherwise, so it is
+# only offered to Gemini when the poller runs
+FEED_HISTORY_POLL = os.getenv("FEED_HISTORY_POLL") == "1"
+
+TOOL_DECLARATIONS = [
+    WEATHER_TOOL, WEB_SEARCH_TOOL, CARPARK_AVAILABILITY_TOOL, TRAFFIC_IMAGES_TOOL, TAXI_AVAILABILITY_TOOL,
+    DEEPSEARCHER_TOOL, TAXI_SPATIAL_TOOL,
+]
+
+# Tool name -> module implementing a function of the same name
+TOOL_MODULES = {
+    "get_current_weather": "tools.weather_tool",
+    "perform_web_search": "tools.websearch_tool",
+    "get_carpark_availability": "tools.carkpark_availability_tool",
+    "get_taxi_availability": "tools.taxi_availability_tool",
+    "get_traffic_images": "tools.traffic_images_tool",
+    "get_deepsearcher": "tools.deepsearcher_tool",
+    "count_taxis_within_radius": "tools.taxi_spatial_index",
+    "get_nearest_taxis": "tools.taxi_spatial_index",
+    "get_taxi_density_grid": "tools.taxi_spatial_index",
+}
+
+if FEED_HISTORY_POLL:
+    TOOL_DECLARATIONS.append(FEED_HISTORY_TOOL)
+    TOOL_MODULES["get_feed_history"] = "tools.feed_history"
+
+TOOL_IMPORT_SECONDS = metrics_registry.histogram(
+    "tool_import_seconds", "Time to import a tool implementation module on first use.", ["module"])
+
+
+class ToolRegistry:
+    """
+    Tool name -> implementation, resolved on first use.
+
+    - `get(name)` imports the tool's module the first time and caches the function; concurrent
+      first callers of the same module wait for one import, other modules are not blocked.
+    - `warm_up()` does the same for every tool on a background thread.
+    - `override(name, func)` swaps in another implementation (benchmarks, local stand-ins).
+    """
+
+    def __init__(self, modules: dict, declarations: list):
+        self.modules = dict(modules)
+        self.declarations = list(declarations)
+        self._functions = {}
+        self._lock = threading.Lock()
+        self._module_locks = {module: threading.Lock() for module in set(self.modules.values())}
+        self.import_seconds = {}  # module -> seconds its first import took
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.modules or name in self._functions
+
+    def get(self, name: str):
+        """Returns the implementation of a tool, importing its module if needed. Raises KeyError for unknown tools."""
+        function = self._functions.get(name)
+        if function is None:
+            function = getattr(self.module(name), name)
+            with self._lock:
+                function = self._functions.setdefault(name, function)
+        return function
+
+    def module(self, name: str):
+        """Returns the (imported) module implementing a tool."""
+        module_name = self.modules[name]
+        with self._module_locks[module_name]:
+            if module_name not in self.import_seconds:
+                start = time.perf_counter()
+                importlib.import_module(module_name)
+                elapsed = time.perf_counter() - start
+                self.import_seconds[module_name] = elapsed
+                TOOL_IMPORT_SECONDS.observe(elapsed, module=module_name)
+                print(f"TOOL REGISTRY: Imported {module_name} in {elapsed:.2f}s")
+        return importlib.import_module(module_name)
+
+    def override(self, name: str, function):
+        """
+        Swaps in another implementation of a tool and returns the one it replaced (None if the
+        tool was not resolved yet). `function=None` drops the override, so the next call resolves
+        the tool from its module again.
+        """
+        with self._lock:
+            previous = self._functions.pop(name, None)
+            if function is not None:
+                self._functions[name] = function
+        return previous
+
+    def load_all(self):
+        """Imports every tool module now; a module that fails to import is reported and retried on first call."""
+        for name in self.modules:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"TOOL REGISTRY: Could not load {name}: {e}")
+
+    def warm_up(self) -> threading.Thread:
+        thread = threading.Thread(target=self.load_all, name="tool-registry-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = sorted(self._functions)
+        return {
+            "tools": len(self.modules),
+            "loaded": loaded,
+            "import_seconds": {module: round(seconds, 3) for module, seconds in self.import_seconds.items()},
+        }
+
+
+tool_registry = ToolRegistry(TOOL_MODULES, TOOL_DECLARATIONS)
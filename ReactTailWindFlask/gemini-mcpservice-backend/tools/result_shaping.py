@@ -0,0 +1,244 @@
+# server/tools/result_shaping.py
+#
+# Shapes tool results before they are sent back to Gemini as function_response payloads:
+# a per-tool projection first drops fields the model never needs (GeoJSON wrappers, image
+# metadata, ...), then the result is fitted into TOOL_RESULT_MAX_BYTES by truncating its
+# largest lists (keeping the head, plus aggregates over the full list) and long strings.
+import json
+import os
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+from tools.metrics import TOOL_RESULT_BYTES
+
+TOOL_RESULT_MAX_BYTES = int(os.getenv("TOOL_RESULT_MAX_BYTES", "8000"))  # ~2k tokens
+TAXI_SAMPLE_SIZE = 25
+MAX_STRING_CHARS = 500
+# Numeric fields for which a sum over a truncated list would be meaningless
+NON_AGGREGATE_FIELDS = {"latitude", "longitude", "lat", "lon"}
+
+
+def dumps(value) -> bytes:
+    """Compact JSON encoding, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _evenly_sampled(items: list, n: int) -> list:
+    if len(items) <= n:
+        return list(items)
+    step = len(items) / n
+    return [items[int(i * step)] for i in range(n)]
+
+
+def project_taxi_availability(data: dict) -> dict:
+    """Replaces the full taxi GeoJSON with the count, bounds and an even sample of positions."""
+    feature = data["features"][0]
+    coordinates = feature["geometry"]["coordinates"]  # GeoJSON order: [longitude, latitude]
+    properties = feature.get("properties", {})
+    result = {
+        "timestamp": properties.get("timestamp"),
+        "taxi_count": properties.get("taxi_count", len(coordinates)),
+        "api_status": properties.get("api_info", {}).get("status"),
+    }
+    if coordinates:
+        lons = [c[0] for c in coordinates]
+        lats = [c[1] for c in coordinates]
+        result["bounds"] = {"min_lat": min(lats), "max_lat": max(lats), "min_lon": min(lons), "max_lon": max(lons)}
+        result["sample_positions"] = [
+            {"latitude": lat, "longitude": lon} for lon, lat in _evenly_sampled(coordinates, TAXI_SAMPLE_SIZE)
+        ]
+    result["note"] = "Positions are a sample; use count_taxis_within_radius or get_nearest_taxis for location questions."
+    return result
+
+
+def project_traffic_images(data: dict) -> dict:
+    """Keeps id, position, image URLs and timestamp per camera; drops image metadata."""
+    if "items" not in data:
+        return data  # already filtered to the relevant cameras by the tool
+    item = data["items"][0]
+    return {
+        "timestamp": item.get("timestamp"),
+        "camera_count": len(item.get("cameras", [])),
+        "cameras": [
+            {
+                "camera_id": camera.get("camera_id"),
+                "latitude": camera.get("location", {}).get("latitude"),
+                "longitude": camera.get("location", {}).get("longitude"),
+                "image": camera.get("image"),
+                "thumbnail_url": f"/traffic-cameras/{camera.get('camera_id')}/image",
+                "timestamp": camera.get("timestamp"),
+            }
+            for camera in item.get("cameras", [])
+        ],
+    }
+
+
+def project_web_search(data: dict) -> dict:
+    return {
+        "results": [
+            {**result, "summary": (result.get("summary") or "")[:300]}
+            for result in data.get("results", [])
+        ]
+    }
+
+
+# Tool name -> projection applied to successful results before size budgeting
+TOOL_PROJECTIONS = {
+    "get_taxi_availability": project_taxi_availability,
+    "get_traffic_images": project_traffic_images,
+    "perform_web_search": project_web_search,
+}
+
+
+def _aggregates(items: list) -> dict:
+    """Sum/min/max of every numeric field of a list of dicts, over the full list."""
+    columns = {}
+    for item in items:
+        if not isinstance(item, dict):
+            return {}
+        for key, value in item.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and key not in NON_AGGREGATE_FIELDS:
+                columns.setdefault(key, []).append(value)
+    return {
+        key: {"sum": round(sum(values), 6), "min": min(values), "max": max(values)}
+        for key, values in columns.items()
+    }
+
+
+def _largest_list(value, parent=None, key=None):
+    """Returns (parent, key, list) for the list with the largest encoded size, searching depth-first."""
+    best = (None, None, None, 0)
+    if isinstance(value, list):
+        if parent is not None and len(value) > 1:
+            best = (parent, key, value, len(dumps(value)))
+        for index, item in enumerate(value):
+            candidate = _largest_list(item, value, index)
+            if candidate[3] > best[3]:
+                best = candidate
+    elif isinstance(value, dict):
+        for child_key, item in value.items():
+            candidate = _largest_list(item, value, child_key)
+            if candidate[3] > best[3]:
+                best = candidate
+    return best
+
+
+def _truncate_strings(value, max_chars: int):
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "…"
+    if isinstance(value, list):
+        return [_truncate_strings(item, max_chars) for item in value]
+    if isinstance(value, dict):
+        return {key: _truncate_strings(item, max_chars) for key, item in value.items()}
+    return value
+
+
+def fit_to_budget(value, max_bytes: int = TOOL_RESULT_MAX_BYTES):
+    """
+    Shrinks `value` until its compact JSON encoding fits in `max_bytes`.
+
+    The largest list is cut to the number of items that fit (lists from the tools are already
+    ranked, so the head is kept) and a `<key>_truncated` sibling records how many items were
+    shown, the total, and numeric aggregates over the full list. Long strings are cut next;
+    if nothing else helps, a text preview is returned.
+    """
+    size = len(dumps(value))
+    if size <= max_bytes:
+        return value
+    # Private copy that can be edited in place, wrapped so a top-level list can be cut too
+    wrapper = {"root": json.loads(dumps(value))}
+
+    while size > max_bytes:
+        parent, key, items, list_size = _largest_list(wrapper)
+        if items is None:
+            break
+        overshoot = size - max_bytes
+        keep = int(len(items) * max(0.0, 1 - overshoot / list_size))
+        keep = max(1, min(keep, len(items) - 1))
+        parent[key] = items[:keep]
+        if isinstance(parent, dict) and parent is not wrapper:
+            note = parent.get(f"{key}_truncated")
+            if note is None:
+                note = {"total": len(items)}
+                aggregates = _aggregates(items)
+                if aggregates:
+                    note["aggregates_over_all"] = aggregates
+                parent[f"{key}_truncated"] = note
+            note["shown"] = keep
+        size = len(dumps(wrapper["root"]))
+    value = wrapper["root"]
+
+    if size > max_bytes:
+        value = _truncate_strings(value, MAX_STRING_CHARS)
+        size = len(dumps(value))
+    if size > max_bytes:
+        # The preview is JSON inside a JSON string, so its quotes are escaped again; shorten
+        # it until the encoded result fits
+        preview = dumps(value).decode("utf-8")
+        limit = max_bytes
+        while True:
+            value = {"truncated": True, "preview": preview[:limit]}
+            excess = len(dumps(value)) - max_bytes
+            if excess <= 0 or limit == 0:
+                break
+            limit = max(0, limit - excess)
+    return value
+
+
+class ShapingStats:
+    """Running totals of payload sizes before and after shaping, per tool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = {}
+
+    def record(self, tool_name: str, bytes_before: int, bytes_after: int, seconds: float):
+        with self._lock:
+            stats = self._tools.setdefault(tool_name, {"calls": 0, "bytes_before": 0, "bytes_after": 0, "shape_seconds": 0.0})
+            stats["calls"] += 1
+            stats["bytes_before"] += bytes_before
+            stats["bytes_after"] += bytes_after
+            stats["shape_seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                tool_name: {
+                    **stats,
+                    "shape_seconds": round(stats["shape_seconds"], 4),
+                    "approx_tokens_saved": (stats["bytes_before"] - stats["bytes_after"]) // 4,
+                }
+                for tool_name, stats in self._tools.items()
+            }
+
+
+shaping_stats = ShapingStats()
+
+
+def shape_tool_result(tool_name: str, result, max_bytes: int = TOOL_RESULT_MAX_BYTES):
+    """Projects and size-budgets one tool result, recording its size before and after."""
+    start = time.perf_counter()
+    bytes_before = len(dumps(result))
+    shaped = result
+    projection = TOOL_PROJECTIONS.get(tool_name)
+    if projection is not None and isinstance(result, dict) and "error" not in result:
+        try:
+            shaped = projection(result)
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"TOOL SERVER: Could not project {tool_name} result, sending it unprojected: {e}")
+    shaped = fit_to_budget(shaped, max_bytes)
+    bytes_after = len(dumps(shaped))
+    elapsed = time.perf_counter() - start
+    shaping_stats.record(tool_name, bytes_before, bytes_after, elapsed)
+    TOOL_RESULT_BYTES.observe(bytes_before, tool=tool_name, stage="raw")
+    TOOL_RESULT_BYTES.observe(bytes_after, tool=tool_name, stage="shaped")
+    print(f"TOOL SERVER: {tool_name} result shaped {bytes_before} -> {bytes_after} bytes "
+          f"(~{bytes_before // 4} -> ~{bytes_after // 4} tokens) in {elapsed * 1000:.1f} ms")
+    return shaped
@@ -0,0 +1,143 @@
+# server/tools/snapshot_cache.py
+import threading
+import time
+from collections import OrderedDict
+
+# Refresh intervals (in seconds) of the data.gov.sg feeds. A "latest data" snapshot is
+# reused until the upstream feed would have produced a new one.
+CARPARK_AVAILABILITY_TTL = 60
+TAXI_AVAILABILITY_TTL = 30
+TRAFFIC_IMAGES_TTL = 20
+TWO_HOUR_FORECAST_TTL = 30 * 60
+AIR_TEMPERATURE_TTL = 60
+
+# Upper bound on the number of historical (date_time) snapshots kept in memory.
+MAX_HISTORICAL_SNAPSHOTS = 256
+
+_MISSING = object()
+
+
+class _InFlightFetch:
+    """A fetch that is currently running; other callers for the same key wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SnapshotCache:
+    """
+    Thread-safe cache of upstream feed snapshots keyed on (endpoint, date_time).
+
+    - Latest-data entries (no `date_time`) expire after the TTL given for their feed.
+    - Historical entries never change upstream, so they are kept indefinitely, bounded
+      by `max_historical` with least-recently-used eviction.
+    - Concurrent misses for the same key share a single in-flight fetch.
+    - Failed fetches are never cached; every waiter sees the same exception.
+
+    Cached snapshots are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_historical: int = MAX_HISTORICAL_SNAPSHOTS):
+        self.max_historical = max_historical
+        self._lock = threading.Lock()
+        self._latest = {}  # key -> (expires_at, snapshot)
+        self._historical = OrderedDict()  # key -> snapshot, in LRU order
+        self._in_flight = {}  # key -> _InFlightFetch
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, endpoint: str, date_time: str, fetch, ttl: float):
+        """
+        Returns the cached snapshot for (endpoint, date_time), calling `fetch()` on a miss.
+
+        `fetch` is a zero-argument callable returning the parsed snapshot. Any exception it
+        raises propagates to the caller (and to any callers waiting on the same fetch).
+        """
+        key = (endpoint, date_time or None)
+
+        with self._lock:
+            snapshot = self._lookup(key)
+            if snapshot is not _MISSING:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            in_flight = self._in_flight.get(key)
+            is_owner = in_flight is None
+            if is_owner:
+                in_flight = _InFlightFetch()
+                self._in_flight[key] = in_flight
+
+        if not is_owner:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value
+
+        try:
+            snapshot = fetch()
+        except Exception as e:
+            in_flight.error = e
+            raise
+        else:
+            in_flight.value = snapshot
+            with self._lock:
+                self._store(key, snapshot, ttl)
+            return snapshot
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.done.set()
+
+    def invalidate(self, endpoint: str = None):
+        """Drops cached snapshots for one endpoint, or everything if no endpoint is given."""
+        with self._lock:
+            if endpoint is None:
+                self._latest.clear()
+                self._historical.clear()
+                return
+            for store in (self._latest, self._historical):
+                for key in [k for k in store if k[0] == endpoint]:
+                    del store[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "latest_entries": len(self._latest),
+                "historical_entries": len(self._historical),
+                "in_flight": len(self._in_flight),
+            }
+
+    # Both helpers below expect self._lock to be held.
+    def _lookup(self, key):
+        if key[1] is None:
+            entry = self._latest.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, snapshot = entry
+            if time.monotonic() >= expires_at:
+                del self._latest[key]
+                return _MISSING
+            return snapshot
+
+        snapshot = self._historical.get(key, _MISSING)
+        if snapshot is not _MISSING:
+            self._historical.move_to_end(key)
+        return snapshot
+
+    def _store(self, key, snapshot, ttl):
+        if key[1] is None:
+            self._latest[key] = (time.monotonic() + ttl, snapshot)
+            return
+
+        self._historical[key] = snapshot
+        self._historical.move_to_end(key)
+        while len(self._historical) > self.max_historical:
+            self._historical.popitem(last=False)
+
+
+# Process-wide cache shared by all data.gov.sg tools.
+snapshot_cache = SnapshotCache()
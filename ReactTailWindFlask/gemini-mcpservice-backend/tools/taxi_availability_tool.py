@@ -1,5 +1,16 @@
 # server/tools/taxi_availability_tool.py
 import requests
+from tools import http_client
+from tools.snapshot_cache import snapshot_cache, TAXI_AVAILABILITY_TTL
+
+BASE_URL = "https://api.data.gov.sg/v1/transport/taxi-availability"
+
+
+def _fetch_taxi_availability(params: dict) -> dict:
+    response = http_client.get(BASE_URL, params=params)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
+    return response.json()
+
 
 def get_taxi_availability(date_time: str = None) -> dict:
     """
@@ -13,7 +24,6 @@ def get_taxi_availability(date_time: str = None) -> dict:
       available data at that moment in time.
     - It's recommended to call this endpoint about every minute.
     """
-    base_url = "https://api.data.gov.sg/v1/transport/taxi-availability"
     params = {}
     if date_time:
         params["date_time"] = date_time
@@ -26,11 +36,8 @@ def get_taxi_availability(date_time: str = None) -> dict:
     print(tool_call_msg)
 
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-        
         # GeoJSON is a specific format of JSON, so response.json() should work.
-        data = response.json() 
+        data = snapshot_cache.get_or_fetch(BASE_URL, date_time, lambda: _fetch_taxi_availability(params), TAXI_AVAILABILITY_TTL)
         
         taxi_count = 0
         if "features" in data and data["features"] and "properties" in data["features"][0] and "taxi_count" in data["features"][0]["properties"]:
@@ -40,9 +47,10 @@ def get_taxi_availability(date_time: str = None) -> dict:
         # print(f"TOOL SERVER: Responding with GeoJSON: {data}") # Potentially very verbose
         return data
     except requests.exceptions.HTTPError as http_err:
-        error_message = f"HTTP error occurred: {http_err} - {response.text if response else 'No response body'}"
+        response = http_err.response
+        error_message = f"HTTP error occurred: {http_err} - {response.text if response is not None else 'No response body'}"
         print(f"TOOL SERVER: {error_message}")
-        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response else "No response body"}
+        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response is not None else "No response body"}
     except requests.exceptions.RequestException as req_err:
         error_message = f"Request error occurred: {req_err}"
         print(f"TOOL SERVER: {error_message}")
@@ -0,0 +1,256 @@
+# server/tools/taxi_spatial_index.py
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from tools.taxi_availability_tool import get_taxi_availability
+
+# Taxi positions are projected to local metres around Singapore. An equirectangular
+# projection is accurate to well under 0.1% over the island's ~50 km extent.
+REF_LAT = 1.35
+REF_LON = 103.82
+METRES_PER_DEG_LAT = 111_320.0
+METRES_PER_DEG_LON = 111_320.0 * math.cos(math.radians(REF_LAT))
+
+DEFAULT_CELL_SIZE_M = 500.0
+MAX_CACHED_INDEXES = 8
+
+
+def to_metres(latitude, longitude):
+    """Projects lat/lon (scalars or arrays) to local x/y metres."""
+    x = (np.asarray(longitude, dtype=np.float64) - REF_LON) * METRES_PER_DEG_LON
+    y = (np.asarray(latitude, dtype=np.float64) - REF_LAT) * METRES_PER_DEG_LAT
+    return x, y
+
+
+def _check_cell_size(cell_size_m: float) -> float:
+    cell_size_m = float(cell_size_m)
+    if not math.isfinite(cell_size_m) or cell_size_m <= 0:
+        raise ValueError(f"cell_size_m must be a positive number of metres, got {cell_size_m}.")
+    return cell_size_m
+
+
+def _check_radius(radius_m: float) -> float:
+    radius_m = float(radius_m)
+    if not math.isfinite(radius_m) or radius_m < 0:
+        raise ValueError(f"radius_m must be a non-negative number of metres, got {radius_m}.")
+    return radius_m
+
+
+def _check_count(name: str, value: int) -> int:
+    number = float(value)
+    if not math.isfinite(number) or number < 1:
+        raise ValueError(f"{name} must be at least 1, got {value}.")
+    return int(number)
+
+
+class TaxiSpatialIndex:
+    """
+    Uniform-grid spatial index over one taxi availability snapshot.
+
+    Points are sorted by grid cell so that every cell is a contiguous slice of the
+    coordinate arrays; queries only compute distances for points in nearby cells.
+    Queries raise ValueError for a non-positive cell size or count, or a negative radius.
+    """
+
+    def __init__(self, coordinates, timestamp: str = None, cell_size_m: float = DEFAULT_CELL_SIZE_M):
+        cell_size_m = _check_cell_size(cell_size_m)
+        lonlat = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        self.timestamp = timestamp
+        self.cell_size_m = cell_size_m
+        self.size = len(lonlat)
+
+        x, y = to_metres(lonlat[:, 1], lonlat[:, 0])
+        if self.size:
+            cx = np.floor(x / cell_size_m).astype(np.int64)
+            cy = np.floor(y / cell_size_m).astype(np.int64)
+            self.cx0, self.cy0 = int(cx.min()), int(cy.min())
+            self.nx = int(cx.max()) - self.cx0 + 1
+            self.ny = int(cy.max()) - self.cy0 + 1
+            cell_ids = (cx - self.cx0) * self.ny + (cy - self.cy0)
+        else:
+            self.cx0 = self.cy0 = 0
+            self.nx = self.ny = 0
+            cell_ids = np.empty(0, dtype=np.int64)
+
+        order = np.argsort(cell_ids, kind="stable")
+        self.x = x[order]
+        self.y = y[order]
+        self.lonlat = lonlat[order]
+        # cell_starts[c]:cell_starts[c + 1] is the slice of points in cell c
+        self.cell_starts = np.searchsorted(cell_ids[order], np.arange(self.nx * self.ny + 1))
+
+    @classmethod
+    def from_geojson(cls, data: dict, cell_size_m: float = DEFAULT_CELL_SIZE_M):
+        feature = data["features"][0]
+        return cls(feature["geometry"]["coordinates"], feature["properties"].get("timestamp"), cell_size_m)
+
+    def _candidates(self, x: float, y: float, radius_m: float) -> np.ndarray:
+        """Indices of all points in cells overlapping the square of half-size radius_m around (x, y)."""
+        if not self.size:
+            return np.empty(0, dtype=np.int64)
+        cell = self.cell_size_m
+        x_lo = max(int(math.floor((x - radius_m) / cell)) - self.cx0, 0)
+        x_hi = min(int(math.floor((x + radius_m) / cell)) - self.cx0, self.nx - 1)
+        y_lo = max(int(math.floor((y - radius_m) / cell)) - self.cy0, 0)
+        y_hi = min(int(math.floor((y + radius_m) / cell)) - self.cy0, self.ny - 1)
+        if x_lo > x_hi or y_lo > y_hi:
+            return np.empty(0, dtype=np.int64)
+        # Cells of one grid column are contiguous, so each column is a single slice.
+        columns = np.arange(x_lo, x_hi + 1) * self.ny
+        starts = self.cell_starts[columns + y_lo]
+        ends = self.cell_starts[columns + y_hi + 1]
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def count_within(self, latitude: float, longitude: float, radius_m: float) -> int:
+        radius_m = _check_radius(radius_m)
+        x, y = to_metres(latitude, longitude)
+        idx = self._candidates(float(x), float(y), radius_m)
+        dx = self.x[idx] - x
+        dy = self.y[idx] - y
+        return int(np.count_nonzero(dx * dx + dy * dy <= radius_m * radius_m))
+
+    def nearest(self, latitude: float, longitude: float, n: int):
+        """Returns (indices, distances_m) of the n closest points, nearest first."""
+        x, y = to_metres(latitude, longitude)
+        x, y = float(x), float(y)
+        n = min(_check_count("n", n), self.size)
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        radius = self.cell_size_m
+        max_radius = self.cell_size_m * (max(self.nx, self.ny) + 1) + math.hypot(x, y)
+        while True:
+            idx = self._candidates(x, y, radius)
+            dist = np.hypot(self.x[idx] - x, self.y[idx] - y)
+            # Every point within `radius` is inside the searched square, so once n of them
+            # are found the n nearest are among the candidates.
+            if np.count_nonzero(dist <= radius) >= n or radius > max_radius:
+                break
+            radius *= 2
+
+        best = np.argpartition(dist, n - 1)[:n] if len(dist) > n else np.arange(len(dist))
+        best = best[np.argsort(dist[best])]
+        return idx[best], dist[best]
+
+    def density_grid(self, cell_size_m: float, top_n: int):
+        """Returns the top_n busiest cells of a cell_size_m grid as (lat, lon, count) rows."""
+        cell_size_m = _check_cell_size(cell_size_m)
+        top_n = _check_count("top_n", top_n)
+        if not self.size:
+            return []
+        gx = np.floor(self.x / cell_size_m).astype(np.int64)
+        gy = np.floor(self.y / cell_size_m).astype(np.int64)
+        cells, counts = np.unique(np.stack([gx, gy], axis=1), axis=0, return_counts=True)
+        top = np.argsort(-counts, kind="stable")[:top_n]
+        centre_x = (cells[top, 0] + 0.5) * cell_size_m
+        centre_y = (cells[top, 1] + 0.5) * cell_size_m
+        lats = REF_LAT + centre_y / METRES_PER_DEG_LAT
+        lons = REF_LON + centre_x / METRES_PER_DEG_LON
+        return [
+            {"latitude": round(float(lat), 5), "longitude": round(float(lon), 5), "taxi_count": int(count)}
+            for lat, lon, count in zip(lats, lons, counts[top])
+        ]
+
+
+_indexes = OrderedDict()  # snapshot timestamp -> TaxiSpatialIndex
+_indexes_lock = threading.Lock()
+
+
+def get_taxi_index(date_time: str = None):
+    """
+    Returns the spatial index for the taxi snapshot at `date_time` (latest if omitted),
+    or the tool's error dict if the snapshot could not be fetched.
+
+    Snapshots come from the shared snapshot cache; indexes are memoised per snapshot timestamp.
+    """
+    data = get_taxi_availability(date_time)
+    if "error" in data:
+        return data
+    try:
+        feature = data["features"][0]
+        timestamp = feature["properties"].get("timestamp")
+    except (KeyError, IndexError, TypeError):
+        return {"error": "InvalidGeoJSON", "message": "Taxi availability response has no features."}
+
+    with _indexes_lock:
+        index = _indexes.get(timestamp)
+        if index is not None:
+            _indexes.move_to_end(timestamp)
+            return index
+
+    index = TaxiSpatialIndex.from_geojson(data)
+    with _indexes_lock:
+        _indexes[timestamp] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def count_taxis_within_radius(latitude: float, longitude: float, radius_m: float = 1000, date_time: str = None) -> dict:
+    """
+    Counts available taxis within `radius_m` metres of a point in Singapore.
+    """
+    print(f"TOOL SERVER: Called count_taxis_within_radius for ({latitude}, {longitude}), radius {radius_m} m")
+    try:
+        radius_m = _check_radius(radius_m)
+    except (TypeError, ValueError) as e:
+        return {"error": "InvalidArgument", "message": str(e)}
+    index = get_taxi_index(date_time)
+    if isinstance(index, dict):
+        return index
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius_m": radius_m,
+        "taxi_count": index.count_within(float(latitude), float(longitude), radius_m),
+        "total_taxis": index.size,
+        "timestamp": index.timestamp,
+    }
+
+
+def get_nearest_taxis(latitude: float, longitude: float, n: int = 5, date_time: str = None) -> dict:
+    """
+    Returns the `n` available taxis closest to a point in Singapore, nearest first.
+    """
+    print(f"TOOL SERVER: Called get_nearest_taxis for ({latitude}, {longitude}), n={n}")
+    try:
+        n = _check_count("n", n)
+    except (TypeError, ValueError) as e:
+        return {"error": "InvalidArgument", "message": str(e)}
+    index = get_taxi_index(date_time)
+    if isinstance(index, dict):
+        return index
+    idx, dist = index.nearest(float(latitude), float(longitude), n)
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "taxis": [
+            {"latitude": float(lat), "longitude": float(lon), "distance_m": round(float(d))}
+            for (lon, lat), d in zip(index.lonlat[idx], dist)
+        ],
+        "timestamp": index.timestamp,
+    }
+
+
+def get_taxi_density_grid(cell_size_m: float = 2000, top_n: int = 10, date_time: str = None) -> dict:
+    """
+    Buckets available taxis into a square grid and returns the `top_n` busiest cells.
+    """
+    print(f"TOOL SERVER: Called get_taxi_density_grid with cell size {cell_size_m} m, top {top_n}")
+    try:
+        cell_size_m = _check_cell_size(cell_size_m)
+        top_n = _check_count("top_n", top_n)
+    except (TypeError, ValueError) as e:
+        return {"error": "InvalidArgument", "message": str(e)}
+    index = get_taxi_index(date_time)
+    if isinstance(index, dict):
+        return index
+    return {
+        "cell_size_m": cell_size_m,
+        "hotspots": index.density_grid(cell_size_m, top_n),
+        "total_taxis": index.size,
+        "timestamp": index.timestamp,
+    }
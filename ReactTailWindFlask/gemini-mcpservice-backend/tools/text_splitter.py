@@ -0,0 +1,55 @@
+# server/tools/text_splitter.py
+#
+# Drop-in replacement for deepsearcher's `split_docs_to_chunks`. The upstream version locates
+# every chunk with `original_text.index(chunk)`, which rescans the document from the start for
+# each chunk (quadratic on large PDFs) and maps repeated passages to their first occurrence.
+# Here chunk offsets are tracked with a forward cursor while splitting, so the whole document
+# is walked once and repeated passages get the window around their own position.
+from typing import List, Tuple
+
+from deepsearcher.loader.splitter import Chunk
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+WINDOW_OFFSET = 300  # characters of context kept on each side of a chunk, as upstream
+
+
+def split_with_offsets(text: str, splitter: RecursiveCharacterTextSplitter) -> List[Tuple[str, int, int]]:
+    """
+    Splits `text` and returns (chunk_text, start, end) for every chunk, in document order.
+
+    Chunks come out of the splitter in order with strictly increasing start offsets, so each
+    one is searched for only from just past the previous chunk's start.
+    """
+    spans = []
+    cursor = 0
+    for chunk_text in splitter.split_text(text):
+        start = text.find(chunk_text, cursor)
+        if start < 0:
+            # Not expected for the recursive splitter, but never worse than upstream
+            start = text.find(chunk_text)
+            if start < 0:
+                start = cursor
+        end = start + len(chunk_text)
+        spans.append((chunk_text, start, end))
+        cursor = start + 1
+    return spans
+
+
+def split_docs_to_chunks(documents: list, chunk_size: int = 1500, chunk_overlap: int = 100,
+                         offset: int = WINDOW_OFFSET) -> List[Chunk]:
+    """
+    Splits documents into deepsearcher Chunks with `wider_text` context windows.
+
+    Chunk texts and windows match deepsearcher's splitter for text without repeated passages.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunks = []
+    for doc in documents:
+        text = doc.page_content
+        metadata = {key: value for key, value in doc.metadata.items() if key != "reference"}
+        reference = doc.metadata.get("reference", "")
+        for chunk_text, start, end in split_with_offsets(text, splitter):
+            # Upstream's window ends `offset` characters past the chunk's last character
+            wider_text = text[max(0, start - offset):min(len(text), end - 1 + offset)]
+            chunks.append(Chunk(text=chunk_text, reference=reference, metadata={**metadata, "wider_text": wider_text}))
+    return chunks
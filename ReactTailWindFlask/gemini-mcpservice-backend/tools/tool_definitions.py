@@ -5,7 +5,12 @@ from google.generativeai.types import FunctionDeclaration, Tool
 get_current_weather_func = FunctionDeclaration(
     name="get_current_weather",
     description=(
-        "Retrieves the current weather conditions for a specified location. "
+        "Retrieves the current weather in Singapore from the official 2-hour forecast and air temperature readings. "
+        "Returns the forecast (e.g. 'Partly Cloudy', 'Thundery Showers') for the matching forecast area and the "
+        "temperature at the nearest weather station. Prefer passing 'latitude' and 'longitude' for a place; "
+        "otherwise pass a Singapore area name such as 'Tampines' or 'Bukit Timah'. "
+        "Location 'Singapore' returns an island-wide summary. "
+        "A name matching several areas (e.g. 'Jurong') returns an 'AmbiguousLocation' error with the candidate areas. "
         "This tool can provide temperatures in either Celsius or Fahrenheit. "
         "If no unit is specified, Celsius is used by default."
     ),
@@ -15,10 +20,18 @@ get_current_weather_func = FunctionDeclaration(
             "location": {
                 "type": "STRING",
                 "description": (
-                    "The city name, or city and state/country, for which to fetch the weather. "
-                    "Examples: 'London, UK', 'Tokyo', 'New York City'."
+                    "The Singapore area or place to fetch the weather for, or 'Singapore' for the whole island. "
+                    "Examples: 'Ang Mo Kio', 'Jurong West', 'Changi'."
                 )
             },
+            "latitude": {
+                "type": "NUMBER",
+                "description": "Optional. Latitude of the place; the nearest forecast area is used."
+            },
+            "longitude": {
+                "type": "NUMBER",
+                "description": "Optional. Longitude of the place; the nearest forecast area is used."
+            },
             "unit": {
                 "type": "STRING",
                 "description": (
@@ -69,7 +82,10 @@ get_carpark_availability_func = FunctionDeclaration(
     description=(
         "Retrieves carpark availability data for Singapore from data.gov.sg. "
         "Data is updated approximately every minute. This tool can fetch the most current data "
-        "or data for a specific past date and time if provided."
+        "or data for a specific past date and time if provided. "
+        "Returns one row per carpark and lot type (carpark number, lot type, total lots, lots available), "
+        "sorted by lots available. Use the filters to fetch only the carparks you need; without "
+        "carpark_numbers only the top_n (default 20) most available rows are returned."
     ),
     parameters={
         "type": "OBJECT",
@@ -82,9 +98,27 @@ get_carpark_availability_func = FunctionDeclaration(
                     "Example: '2023-10-26T10:30:00'. "
                     "If omitted, the API returns the latest available data."
                 )
+            },
+            "carpark_numbers": {
+                "type": "ARRAY",
+                "items": {"type": "STRING"},
+                "description": "Optional. HDB carpark numbers to return, e.g. ['HE12', 'BM29']."
+            },
+            "lot_type": {
+                "type": "STRING",
+                "description": "Optional. Lot type: 'C' (car), 'Y' (motorcycle) or 'H' (heavy vehicle).",
+                "enum": ["C", "Y", "H"]
+            },
+            "min_available": {
+                "type": "INTEGER",
+                "description": "Optional. Only return rows with at least this many lots available."
+            },
+            "top_n": {
+                "type": "INTEGER",
+                "description": "Optional. Maximum number of rows to return, most available first."
             }
         },
-        "required": [] # date_time is optional as per the OpenAPI schema (required: false)
+        "required": [] # all filters are optional
     }
 )
 
@@ -96,7 +130,9 @@ get_traffic_images_func = FunctionDeclaration(
         "Data is sourced from LTA's Datamall and updated approximately every 20 seconds. "
         "Locations of the cameras are provided in the response. "
         "Use the optional 'date_time' parameter to fetch images for a specific moment in time; "
-        "otherwise, the most current images are returned."
+        "otherwise, the most current images are returned. "
+        "For questions about a place or road, pass its 'latitude' and 'longitude' to get only the "
+        "nearest cameras (with distance in metres) instead of all ~90 cameras."
     ),
     parameters={
         "type": "OBJECT",
@@ -109,9 +145,26 @@ get_traffic_images_func = FunctionDeclaration(
                     "Example: '2023-10-27T14:00:00'. "
                     "If omitted, the API returns the latest available image data."
                 )
+            },
+            "latitude": {
+                "type": "NUMBER",
+                "description": "Optional. Latitude of the place or road to find the nearest cameras to."
+            },
+            "longitude": {
+                "type": "NUMBER",
+                "description": "Optional. Longitude of the place or road to find the nearest cameras to."
+            },
+            "limit": {
+                "type": "INTEGER",
+                "description": "Optional. Number of nearest cameras to return when a location is given (default 5)."
+            },
+            "camera_ids": {
+                "type": "ARRAY",
+                "items": {"type": "STRING"},
+                "description": "Optional. Specific camera ids to return, e.g. ['1701', '4703']."
             }
         },
-        "required": [] # date_time is optional as per the OpenAPI schema (required: false)
+        "required": [] # all parameters are optional
     }
 )
 
@@ -123,7 +176,9 @@ get_taxi_availability_func = FunctionDeclaration(
         "Data is sourced from LTA's Datamall and updated approximately every 30 seconds. "
         "The response is a valid GeoJSON object suitable for mapping tools. "
         "Use the optional 'date_time' parameter to fetch data for a specific moment in time; "
-        "otherwise, the most current data is returned. The timestamp in the response indicates the scrape time."
+        "otherwise, the most current data is returned. The timestamp in the response indicates the scrape time. "
+        "The full GeoJSON is large: for counts near a place, nearest taxis or busy areas, use "
+        "count_taxis_within_radius, get_nearest_taxis or get_taxi_density_grid instead."
     ),
     parameters={
         "type": "OBJECT",
@@ -166,6 +221,116 @@ get_deepsearcher_func = FunctionDeclaration(
 )
 
 
+# Define the schemas for the taxi spatial query tools
+count_taxis_within_radius_func = FunctionDeclaration(
+    name="count_taxis_within_radius",
+    description=(
+        "Counts the available taxis in Singapore within a radius of a given point. "
+        "Prefer this over get_taxi_availability for questions like 'how many taxis are near X'. "
+        "Estimate the latitude and longitude of the place the user mentions."
+    ),
+    parameters={
+        "type": "OBJECT",
+        "properties": {
+            "latitude": {"type": "NUMBER", "description": "Latitude of the point, e.g. 1.2834 for Raffles Place."},
+            "longitude": {"type": "NUMBER", "description": "Longitude of the point, e.g. 103.8513 for Raffles Place."},
+            "radius_m": {"type": "NUMBER", "description": "Optional. Search radius in metres. Defaults to 1000."},
+            "date_time": {
+                "type": "STRING",
+                "description": "Optional. 'YYYY-MM-DDTHH:mm:ss' (SGT) to query a past snapshot; latest data if omitted."
+            }
+        },
+        "required": ["latitude", "longitude"]
+    }
+)
+
+get_nearest_taxis_func = FunctionDeclaration(
+    name="get_nearest_taxis",
+    description=(
+        "Returns the locations of the N available taxis closest to a point in Singapore, "
+        "with their distance in metres, nearest first."
+    ),
+    parameters={
+        "type": "OBJECT",
+        "properties": {
+            "latitude": {"type": "NUMBER", "description": "Latitude of the point."},
+            "longitude": {"type": "NUMBER", "description": "Longitude of the point."},
+            "n": {"type": "INTEGER", "description": "Optional. Number of taxis to return. Defaults to 5."},
+            "date_time": {
+                "type": "STRING",
+                "description": "Optional. 'YYYY-MM-DDTHH:mm:ss' (SGT) to query a past snapshot; latest data if omitted."
+            }
+        },
+        "required": ["latitude", "longitude"]
+    }
+)
+
+get_taxi_density_grid_func = FunctionDeclaration(
+    name="get_taxi_density_grid",
+    description=(
+        "Buckets available taxis in Singapore into a square grid and returns the busiest cells "
+        "(cell centre coordinates and taxi count). Use it to find where taxis are concentrated."
+    ),
+    parameters={
+        "type": "OBJECT",
+        "properties": {
+            "cell_size_m": {"type": "NUMBER", "description": "Optional. Grid cell size in metres. Defaults to 2000."},
+            "top_n": {"type": "INTEGER", "description": "Optional. Number of busiest cells to return. Defaults to 10."},
+            "date_time": {
+                "type": "STRING",
+                "description": "Optional. 'YYYY-MM-DDTHH:mm:ss' (SGT) to query a past snapshot; latest data if omitted."
+            }
+        },
+        "required": []
+    }
+)
+
+
+# Define the schema for the feed history tool
+get_feed_history_func = FunctionDeclaration(
+    name="get_feed_history",
+    description=(
+        "Summarises how a Singapore transport feed changed over a time window, from locally recorded "
+        "snapshots, in a single call. Use it for questions like 'how did taxi availability change over "
+        "the last hour' instead of calling the live tools once per timestamp. Returns first/last/change/"
+        "min/max/mean over the window and a downsampled time series."
+    ),
+    parameters={
+        "type": "OBJECT",
+        "properties": {
+            "feed": {
+                "type": "STRING",
+                "enum": ["taxi", "carpark", "traffic_cameras"],
+                "description": "Which feed to summarise."
+            },
+            "start_time": {
+                "type": "STRING",
+                "description": "Optional. Window start, 'YYYY-MM-DDTHH:mm:ss' (SGT). Defaults to one hour before end_time."
+            },
+            "end_time": {
+                "type": "STRING",
+                "description": "Optional. Window end, 'YYYY-MM-DDTHH:mm:ss' (SGT). Defaults to now."
+            },
+            "latitude": {"type": "NUMBER", "description": "Optional, taxi feed only. Count taxis near this point."},
+            "longitude": {"type": "NUMBER", "description": "Optional, taxi feed only. Count taxis near this point."},
+            "radius_m": {"type": "NUMBER", "description": "Optional, taxi feed only. Radius in metres around the point. Defaults to 1000."},
+            "carpark_numbers": {
+                "type": "ARRAY",
+                "items": {"type": "STRING"},
+                "description": "Optional, carpark feed only. Carpark numbers to sum over, e.g. ['HE12', 'BM29']."
+            },
+            "lot_type": {
+                "type": "STRING",
+                "enum": ["C", "Y", "H"],
+                "description": "Optional, carpark feed only. 'C' car, 'Y' motorcycle, 'H' heavy vehicle."
+            },
+            "camera_id": {"type": "STRING", "description": "Optional, traffic_cameras feed only. Returns this camera's images over the window."}
+        },
+        "required": ["feed"]
+    }
+)
+
+
 # Create a Tool object that contains our function declaration
 WEATHER_TOOL = Tool(function_declarations=[get_current_weather_func])
 WEB_SEARCH_TOOL = Tool(function_declarations=[web_search_func])
@@ -173,6 +338,8 @@ CARPARK_AVAILABILITY_TOOL = Tool(function_declarations=[get_carpark_availability
 TRAFFIC_IMAGES_TOOL = Tool(function_declarations=[get_traffic_images_func])
 TAXI_AVAILABILITY_TOOL = Tool(function_declarations=[get_taxi_availability_func])
 DEEPSEARCHER_TOOL = Tool(function_declarations=[get_deepsearcher_func])
+TAXI_SPATIAL_TOOL = Tool(function_declarations=[count_taxis_within_radius_func, get_nearest_taxis_func, get_taxi_density_grid_func])
+FEED_HISTORY_TOOL = Tool(function_declarations=[get_feed_history_func])
 
 # For the server to know which function to call (not directly used by Gemini in this client)
 AVAILABLE_TOOLS_GEMINI_SCHEMA = {
@@ -182,4 +349,8 @@ AVAILABLE_TOOLS_GEMINI_SCHEMA = {
     "get_traffic_images": get_traffic_images_func,
     "get_taxi_availability": get_taxi_availability_func,
     "get_deepsearcher": get_deepsearcher_func,
+    "count_taxis_within_radius": count_taxis_within_radius_func,
+    "get_nearest_taxis": get_nearest_taxis_func,
+    "get_taxi_density_grid": get_taxi_density_grid_func,
+    "get_feed_history": get_feed_history_func,
 }
\ No newline at end of file
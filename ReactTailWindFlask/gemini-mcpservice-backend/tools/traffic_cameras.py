@@ -0,0 +1,283 @@
+# server/tools/traffic_cameras.py
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from tools import http_client
+from tools.taxi_spatial_index import to_metres
+
+try:
+    from PIL import Image
+except ImportError:  # optional, thumbnails fall back to the original image without it
+    Image = None
+
+TRAFFIC_IMAGE_CACHE_BYTES = int(os.getenv("TRAFFIC_IMAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+THUMBNAIL_SIZE = (320, 240)
+THUMBNAIL_QUALITY = 70
+MAX_CACHED_INDEXES = 8
+
+
+class CameraIndex:
+    """Camera ids, positions and current image URLs of one traffic images snapshot, as arrays."""
+
+    def __init__(self, cameras: list, timestamp: str = None):
+        self.timestamp = timestamp
+        self.camera_id = np.array([str(c.get("camera_id")) for c in cameras], dtype=np.str_)
+        self.latitude = np.array([c.get("location", {}).get("latitude", np.nan) for c in cameras], dtype=np.float64)
+        self.longitude = np.array([c.get("location", {}).get("longitude", np.nan) for c in cameras], dtype=np.float64)
+        self.image = [c.get("image") for c in cameras]
+        self.image_timestamp = [c.get("timestamp") for c in cameras]
+        self.md5 = [c.get("image_metadata", {}).get("md5") for c in cameras]
+        self.x, self.y = to_metres(self.latitude, self.longitude)
+        self._position = {camera_id: i for i, camera_id in enumerate(self.camera_id)}
+
+    @classmethod
+    def from_snapshot(cls, data: dict):
+        item = data["items"][0]
+        return cls(item.get("cameras", []), item.get("timestamp"))
+
+    def __len__(self):
+        return len(self.camera_id)
+
+    def find(self, camera_id: str):
+        """Position of a camera in the arrays, or None."""
+        return self._position.get(str(camera_id))
+
+    def nearest(self, latitude: float, longitude: float, n: int):
+        """Returns (indices, distances_m) of the n closest cameras, nearest first."""
+        x, y = to_metres(latitude, longitude)
+        dist = np.hypot(self.x - x, self.y - y)
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        n = min(int(n), len(dist))
+        if n <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        idx = np.argpartition(dist, n - 1)[:n] if len(dist) > n else np.arange(len(dist))
+        idx = idx[np.argsort(dist[idx])]
+        return idx, dist[idx]
+
+    def camera(self, i: int, distance_m: float = None) -> dict:
+        camera_id = str(self.camera_id[i])
+        row = {
+            "camera_id": camera_id,
+            "latitude": float(self.latitude[i]),
+            "longitude": float(self.longitude[i]),
+            "timestamp": self.image_timestamp[i],
+            "image": self.image[i],
+            # Served by this backend from the image cache
+            "thumbnail_url": f"/traffic-cameras/{camera_id}/image",
+            "image_url": f"/traffic-cameras/{camera_id}/image?size=full",
+        }
+        if distance_m is not None:
+            row["distance_m"] = round(float(distance_m))
+        return row
+
+
+_indexes = OrderedDict()  # snapshot timestamp -> CameraIndex
+_indexes_lock = threading.Lock()
+
+
+def get_camera_index(data: dict) -> CameraIndex:
+    """Returns the camera index for a traffic images snapshot, memoised per snapshot timestamp."""
+    timestamp = data["items"][0].get("timestamp")
+    with _indexes_lock:
+        index = _indexes.get(timestamp)
+        if index is not None:
+            _indexes.move_to_end(timestamp)
+            return index
+
+    index = CameraIndex.from_snapshot(data)
+    with _indexes_lock:
+        _indexes[timestamp] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+class CameraNotFound(Exception):
+    """Raised when a camera id is not in the current snapshot."""
+
+
+class CameraImageUnavailable(Exception):
+    """Raised when a camera image could not be fetched from the upstream CDN."""
+
+
+class CachedImage:
+    def __init__(self, body: bytes, content_type: str, etag: str, image_timestamp: str = None):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.image_timestamp = image_timestamp
+        self.size = len(body)
+
+
+def make_thumbnail(body: bytes):
+    """Returns JPEG thumbnail bytes, or None if Pillow is not installed or the image cannot be decoded."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(body)) as image:
+            image = image.convert("RGB")
+            image.thumbnail(THUMBNAIL_SIZE)
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            return out.getvalue()
+    except Exception as e:
+        print(f"TRAFFIC CAMERAS: Could not create thumbnail: {e}")
+        return None
+
+
+class CameraImageCache:
+    """
+    Byte-bounded LRU of camera images, keyed by upstream image URL.
+
+    Every upstream frame has its own URL, so a cached entry never goes stale; new frames
+    simply get new keys and old ones age out. Each frame is stored as the original JPEG and
+    a thumbnail generated once when the original is fetched; when no thumbnail can be made,
+    thumbnail requests are served from the original entry instead of a second copy. Concurrent
+    misses for the same frame share one download.
+    """
+
+    def __init__(self, max_bytes: int = TRAFFIC_IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (url, variant) -> CachedImage
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # url -> threading.Event
+        self._no_thumbnail = set()  # urls whose thumbnail is the original entry
+        self.hits = 0
+        self.misses = 0
+        self.bytes_fetched = 0
+
+    def get(self, url: str, thumbnail: bool = True, md5: str = None, image_timestamp: str = None) -> CachedImage:
+        while True:
+            with self._lock:
+                key = self._key(url, thumbnail)
+                image = self._entries.get(key)
+                if image is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return image
+                waiter = self._inflight.get(url)
+                if waiter is None:
+                    self._inflight[url] = threading.Event()
+                    self.misses += 1
+                    break
+            waiter.wait()
+            if not self._has(url):
+                raise CameraImageUnavailable(f"Image {url} could not be fetched.")
+
+        try:
+            original, thumb = self._download(url, md5, image_timestamp)
+            with self._lock:
+                self._put((url, "full"), original)
+                if thumb is original:
+                    self._no_thumbnail.add(url)
+                    self._remove((url, "thumb"))
+                else:
+                    self._no_thumbnail.discard(url)
+                    self._put((url, "thumb"), thumb)
+            return thumb if thumbnail else original
+        finally:
+            with self._lock:
+                self._inflight.pop(url).set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes_fetched": self.bytes_fetched,
+            }
+
+    def _key(self, url: str, thumbnail: bool) -> tuple:
+        return (url, "thumb" if thumbnail and url not in self._no_thumbnail else "full")
+
+    def _has(self, url: str) -> bool:
+        with self._lock:
+            return (url, "full") in self._entries
+
+    def _download(self, url: str, md5: str, image_timestamp: str):
+        try:
+            response = http_client.get(url)
+            response.raise_for_status()
+        except Exception as e:
+            raise CameraImageUnavailable(f"Could not fetch {url}: {e}") from e
+        body = response.content
+        with self._lock:
+            self.bytes_fetched += len(body)
+        etag = md5 or hashlib.sha1(body).hexdigest()
+        original = CachedImage(body, response.headers.get("Content-Type", "image/jpeg"), etag, image_timestamp)
+        thumb_body = make_thumbnail(body)
+        thumb = CachedImage(thumb_body, "image/jpeg", etag + "-thumb", image_timestamp) if thumb_body else original
+        return original, thumb
+
+    def _remove(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+            if key[1] == "full":
+                self._no_thumbnail.discard(key[0])
+
+    def _put(self, key, image: CachedImage):
+        self._remove(key)
+        self._entries[key] = image
+        self._bytes += image.size
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+
+camera_image_cache = CameraImageCache()
+
+
+class CameraImagePrefetcher:
+    """
+    Daemon thread that, on the feed's cadence, downloads every camera's new frame and its
+    thumbnail into the image cache, so proxy requests are served from memory.
+    """
+
+    def __init__(self, snapshot_source, interval: float, max_workers: int = 8):
+        self.snapshot_source = snapshot_source  # zero-argument callable returning the latest snapshot
+        self.interval = interval
+        self.max_workers = max_workers
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="traffic-camera-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def prefetch_once(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        index = get_camera_index(self.snapshot_source())
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="camera-prefetch") as pool:
+            for i in range(len(index)):
+                if index.image[i]:
+                    pool.submit(self._prefetch, index.image[i], index.md5[i], index.image_timestamp[i])
+
+    def _prefetch(self, url, md5, image_timestamp):
+        try:
+            camera_image_cache.get(url, thumbnail=True, md5=md5, image_timestamp=image_timestamp)
+        except CameraImageUnavailable as e:
+            print(f"TRAFFIC CAMERAS: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.prefetch_once()
+            except Exception as e:
+                print(f"TRAFFIC CAMERAS: Prefetch failed: {e}")
+            self._stop.wait(max(1.0, self.interval - (time.monotonic() - started)))
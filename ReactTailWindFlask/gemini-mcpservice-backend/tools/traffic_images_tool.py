@@ -1,34 +1,64 @@
 # server/tools/traffic_images_tool.py
 import requests
+from tools import http_client
+from tools.snapshot_cache import snapshot_cache, TRAFFIC_IMAGES_TTL
+from tools.traffic_cameras import get_camera_index, camera_image_cache, CameraImagePrefetcher, CameraNotFound, CameraImageUnavailable
 
-def get_traffic_images(date_time: str = None) -> dict:
+# Cameras returned when the caller gives a location but no limit
+DEFAULT_NEAREST_CAMERAS = 5
+
+BASE_URL = "https://api.data.gov.sg/v1/transport/traffic-images"
+
+
+def _fetch_traffic_images(params: dict) -> dict:
+    response = http_client.get(BASE_URL, params=params)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
+    return response.json()
+
+
+def get_traffic_snapshot(date_time: str = None) -> dict:
+    """Raw traffic images snapshot, shared through the snapshot cache."""
+    params = {"date_time": date_time} if date_time else {}
+    return snapshot_cache.get_or_fetch(BASE_URL, date_time, lambda: _fetch_traffic_images(params), TRAFFIC_IMAGES_TTL)
+
+
+def get_traffic_images(date_time: str = None, latitude: float = None, longitude: float = None,
+                       limit: int = None, camera_ids: list = None) -> dict:
     """
-    Fetches the latest images from traffic cameras in Singapore from data.gov.sg.
+    Fetches traffic camera images in Singapore from data.gov.sg and returns only the relevant cameras.
 
     This function retrieves traffic image data.
     - Data is sourced from LTA's Datamall and updated approximately every 20 seconds.
     - Camera locations are also provided in the response.
     - The `date_time` parameter (YYYY-MM-DDTHH:mm:ss SGT) can be used to retrieve the latest
       available data at that moment in time.
-    - It's recommended to call this endpoint about every minute.
+    - With `latitude`/`longitude`, the `limit` (default 5) nearest cameras are returned, nearest
+      first, with their distance in metres. `camera_ids` selects specific cameras.
+    - Each camera carries `thumbnail_url`/`image_url` paths served by this backend's image proxy.
+    - Without any filter the full snapshot is returned.
     """
-    base_url = "https://api.data.gov.sg/v1/transport/traffic-images"
-    params = {}
-    if date_time:
-        params["date_time"] = date_time
-
     tool_call_msg = f"TOOL SERVER: Called get_traffic_images"
     if date_time:
         tool_call_msg += f" for date_time: {date_time}"
     else:
         tool_call_msg += " for latest data."
+    if latitude is not None and longitude is not None:
+        tool_call_msg += f" Nearest to ({latitude}, {longitude})."
     print(tool_call_msg)
 
     try:
-        response = requests.get(base_url, params=params)
-        response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-        
-        data = response.json()
+        data = get_traffic_snapshot(date_time)
+        if camera_ids or (latitude is not None and longitude is not None):
+            index = get_camera_index(data)
+            if camera_ids:
+                positions = [index.find(camera_id) for camera_id in camera_ids]
+                cameras = [index.camera(i) for i in positions if i is not None]
+            else:
+                idx, dist = index.nearest(float(latitude), float(longitude), limit or DEFAULT_NEAREST_CAMERAS)
+                cameras = [index.camera(i, d) for i, d in zip(idx, dist)]
+            print(f"TOOL SERVER: Successfully retrieved data. Returning {len(cameras)} of {len(index)} cameras.")
+            return {"timestamp": index.timestamp, "camera_count_total": len(index), "cameras": cameras}
+
         items_count = 0
         if "items" in data and len(data["items"]) > 0 and "cameras" in data["items"][0]:
             items_count = len(data["items"][0]["cameras"])
@@ -37,14 +67,44 @@ def get_traffic_images(date_time: str = None) -> dict:
         # print(f"TOOL SERVER: Responding with: {data}") # Potentially very verbose for image data
         return data
     except requests.exceptions.HTTPError as http_err:
-        error_message = f"HTTP error occurred: {http_err} - {response.text if response else 'No response body'}"
+        response = http_err.response
+        error_message = f"HTTP error occurred: {http_err} - {response.text if response is not None else 'No response body'}"
         print(f"TOOL SERVER: {error_message}")
-        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response else "No response body"}
+        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response is not None else "No response body"}
     except requests.exceptions.RequestException as req_err:
         error_message = f"Request error occurred: {req_err}"
         print(f"TOOL SERVER: {error_message}")
         return {"error": "RequestException", "message": str(req_err)}
+    except (KeyError, IndexError) as data_err:
+        error_message = f"Unexpected response format: {data_err}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "InvalidResponse", "message": "Traffic images response has no items."}
     except ValueError as json_err: # Includes JSONDecodeError
         error_message = f"JSON decoding error: {json_err}"
         print(f"TOOL SERVER: {error_message}")
-        return {"error": "JSONDecodeError", "message": "Failed to parse JSON response from API."}
\ No newline at end of file
+        return {"error": "JSONDecodeError", "message": "Failed to parse JSON response from API."}
+
+
+def get_camera_image(camera_id: str, thumbnail: bool = True):
+    """
+    Returns the cached image (thumbnail or original) of a camera's latest frame.
+
+    Raises CameraNotFound for an unknown camera and CameraImageUnavailable if the frame could not be fetched.
+    """
+    try:
+        index = get_camera_index(get_traffic_snapshot())
+    except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+        raise CameraImageUnavailable(f"Could not fetch the traffic images snapshot: {e}") from e
+    i = index.find(camera_id)
+    if i is None or not index.image[i]:
+        raise CameraNotFound(camera_id)
+    return camera_image_cache.get(index.image[i], thumbnail=thumbnail, md5=index.md5[i],
+                                  image_timestamp=index.image_timestamp[i])
+
+
+camera_prefetcher = CameraImagePrefetcher(get_traffic_snapshot, TRAFFIC_IMAGES_TTL)
+
+
+def start_camera_prefetcher():
+    """Keeps the image cache filled with every camera's latest frame and thumbnail."""
+    camera_prefetcher.start()
@@ -0,0 +1,159 @@
+# server/tools/weather_index.py
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from tools.taxi_spatial_index import to_metres
+
+MAX_CACHED_INDEXES = 8
+MIN_PARTIAL_MATCH_CHARS = 3  # shorter names only resolve by exact match
+
+
+class AmbiguousArea(ValueError):
+    """Raised when a location name partially matches several forecast areas."""
+
+    def __init__(self, name: str, candidates: list):
+        super().__init__(f"'{name}' matches several forecast areas: {', '.join(candidates)}.")
+        self.name = name
+        self.candidates = candidates
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+class WeatherIndex:
+    """
+    Forecast areas and temperature stations of one pair of weather snapshots, as arrays.
+
+    Area and station positions are projected to metres once when the index is built, and
+    every area is paired with its nearest reporting station, so resolving a location is one
+    vectorised distance computation over the ~47 forecast areas.
+    """
+
+    def __init__(self, forecast_data: dict, temperature_data: dict):
+        areas = forecast_data.get("area_metadata", [])
+        item = forecast_data["items"][0]
+        forecasts = {f.get("area"): f.get("forecast") for f in item.get("forecasts", [])}
+        self.forecast_timestamp = item.get("update_timestamp") or item.get("timestamp")
+        self.valid_period = item.get("valid_period")
+        self.area_name = [a.get("name", "") for a in areas]
+        self.area_forecast = [forecasts.get(name) for name in self.area_name]
+        self.area_latitude = np.array([a.get("label_location", {}).get("latitude", np.nan) for a in areas], dtype=np.float64)
+        self.area_longitude = np.array([a.get("label_location", {}).get("longitude", np.nan) for a in areas], dtype=np.float64)
+        self.area_x, self.area_y = to_metres(self.area_latitude, self.area_longitude)
+        self._area_position = {_normalize(name): i for i, name in enumerate(self.area_name)}
+
+        # Only stations with a reading in this snapshot take part in the lookup
+        temperature_item = temperature_data["items"][0]
+        readings = {r.get("station_id"): r.get("value") for r in temperature_item.get("readings", [])}
+        stations = [s for s in temperature_data.get("metadata", {}).get("stations", []) if readings.get(s.get("id")) is not None]
+        self.temperature_timestamp = temperature_item.get("timestamp")
+        self.station_name = [s.get("name", "") for s in stations]
+        self.station_value = np.array([readings[s.get("id")] for s in stations], dtype=np.float64)
+        station_lat = np.array([s.get("location", {}).get("latitude", np.nan) for s in stations], dtype=np.float64)
+        station_lon = np.array([s.get("location", {}).get("longitude", np.nan) for s in stations], dtype=np.float64)
+        self.station_x, self.station_y = to_metres(station_lat, station_lon)
+
+        # Nearest station per area, from one (areas x stations) distance matrix
+        if len(stations) and len(areas):
+            dist = np.hypot(self.area_x[:, None] - self.station_x[None, :], self.area_y[:, None] - self.station_y[None, :])
+            dist = np.where(np.isnan(dist), np.inf, dist)
+            self.area_station = np.argmin(dist, axis=1)
+            self.area_station_distance = dist[np.arange(len(areas)), self.area_station]
+        else:
+            self.area_station = np.full(len(areas), -1, dtype=np.int64)
+            self.area_station_distance = np.full(len(areas), np.inf)
+
+    def __len__(self):
+        return len(self.area_name)
+
+    def find_area(self, name: str):
+        """
+        Position of a forecast area by name, case-insensitive, or None if nothing matches:
+
+        1. the exact area name ('Jurong West')
+        2. the longest area name found as whole words in `name` ('Tampines Mall' -> Tampines)
+        3. the one area with a word starting with `name` ('Tamp' -> Tampines)
+
+        Raises AmbiguousArea when the best match is not unique ('Jurong' -> Jurong East,
+        Jurong Island, Jurong West).
+        """
+        key = _normalize(name)
+        if key in self._area_position:
+            return self._area_position[key]
+        if len(key) < MIN_PARTIAL_MATCH_CHARS:
+            return None
+
+        contained = [(len(area), area) for area in self._area_position
+                     if re.search(rf"\b{re.escape(area)}\b", key)]
+        if contained:
+            longest = max(length for length, _ in contained)
+            candidates = [area for length, area in contained if length == longest]
+        else:
+            candidates = [area for area in self._area_position if re.search(rf"\b{re.escape(key)}", area)]
+        if len(candidates) > 1:
+            raise AmbiguousArea(name, sorted(self.area_name[self._area_position[area]] for area in candidates))
+        return self._area_position[candidates[0]] if candidates else None
+
+    def nearest_area(self, latitude: float, longitude: float):
+        """Returns (position, distance_m) of the forecast area closest to a point."""
+        x, y = to_metres(latitude, longitude)
+        dist = np.hypot(self.area_x - x, self.area_y - y)
+        dist = np.where(np.isnan(dist), np.inf, dist)
+        i = int(np.argmin(dist))
+        return i, float(dist[i])
+
+    def area(self, i: int) -> dict:
+        station = int(self.area_station[i])
+        row = {
+            "area": self.area_name[i],
+            "forecast": self.area_forecast[i],
+            "latitude": float(self.area_latitude[i]),
+            "longitude": float(self.area_longitude[i]),
+        }
+        if station >= 0:
+            row["temperature_c"] = float(self.station_value[station])
+            row["temperature_station"] = self.station_name[station]
+            row["station_distance_m"] = round(float(self.area_station_distance[i]))
+        return row
+
+    def summary(self) -> dict:
+        """Island-wide forecast counts and temperature range."""
+        counts = {}
+        for forecast in self.area_forecast:
+            if forecast:
+                counts[forecast] = counts.get(forecast, 0) + 1
+        result = {"forecast_counts": dict(sorted(counts.items(), key=lambda kv: -kv[1]))}
+        if len(self.station_value):
+            result["temperature_c"] = {
+                "mean": round(float(self.station_value.mean()), 1),
+                "min": float(self.station_value.min()),
+                "max": float(self.station_value.max()),
+                "stations": len(self.station_value),
+            }
+        return result
+
+
+_indexes = OrderedDict()  # (forecast timestamp, temperature timestamp) -> WeatherIndex
+_indexes_lock = threading.Lock()
+
+
+def get_weather_index(forecast_data: dict, temperature_data: dict) -> WeatherIndex:
+    """Returns the weather index for a pair of snapshots, memoised per snapshot timestamps."""
+    key = (forecast_data["items"][0].get("update_timestamp") or forecast_data["items"][0].get("timestamp"),
+           temperature_data["items"][0].get("timestamp"))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = WeatherIndex(forecast_data, temperature_data)
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -1,35 +1,102 @@
 # server/tools/weather_tool.py
-import random
 import requests
-          
+from tools import http_client
+from tools.snapshot_cache import snapshot_cache, TWO_HOUR_FORECAST_TTL, AIR_TEMPERATURE_TTL
+from tools.weather_index import get_weather_index, AmbiguousArea
 
-def get_current_weather(location: str, unit: str = "celsius") -> dict:
+FORECAST_URL = "https://api.data.gov.sg/v1/environment/2-hour-weather-forecast"
+AIR_TEMPERATURE_URL = "https://api.data.gov.sg/v1/environment/air-temperature"
+
+# Location names that mean the whole island rather than one forecast area
+ISLAND_WIDE = {"", "singapore", "sg", "all", "island-wide", "islandwide"}
+
+
+def _fetch_forecast(params: dict) -> dict:
+    response = http_client.get(FORECAST_URL, params=params)
+    response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
+    return response.json()
+
+
+def _fetch_air_temperature(params: dict) -> dict:
+    response = http_client.get(AIR_TEMPERATURE_URL, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_current_weather(location: str = None, unit: str = "celsius", latitude: float = None, longitude: float = None) -> dict:
     """
-    Simulates fetching weather for a given location.
-    In a real application, this would call a weather API.
+    Fetches the current weather in Singapore from the data.gov.sg 2-hour forecast and air temperature feeds.
+
+    - The forecast feed is updated every 30 minutes and the temperature readings every minute;
+      both snapshots are shared through the snapshot cache, so concurrent chats cost at most one
+      upstream fetch per feed per refresh window.
+    - The location resolves to a forecast area: by `latitude`/`longitude` (nearest area), else
+      by area name (e.g. 'Tampines', 'Bukit Timah'). A name matching several areas (e.g.
+      'Jurong') returns an error listing them. The temperature is the reading of the station
+      nearest to that area.
+    - 'Singapore' (or no location) returns an island-wide summary instead.
     """
-    print(f"TOOL SERVER: Called get_current_weather for {location} with unit {unit}")
-    
-    # Simulate some weather data
-    conditions = ["Sunny", "Cloudy", "Rainy", "Windy", "Snowy"]
-    temp_c = random.randint(-5, 35)
-    
-    if unit == "fahrenheit":
-        temp = (temp_c * 9/5) + 32
-        unit_symbol = "°F"
-    else:
-        temp = temp_c
-        unit_symbol = "°C"
-        
-    weather_info = {
-        "location": location,
-        "temperature": f"{temp:.1f}{unit_symbol}",
-        "condition": random.choice(conditions),
-        "unit_used": unit
-    }
-
-  
-        
-    print(f"TOOL SERVER: Responding with: {weather_info}")
-    return weather_info
-    
\ No newline at end of file
+    print(f"TOOL SERVER: Called get_current_weather for {location} ({latitude}, {longitude}) with unit {unit}")
+
+    try:
+        forecast_data = snapshot_cache.get_or_fetch(FORECAST_URL, None, lambda: _fetch_forecast({}), TWO_HOUR_FORECAST_TTL)
+        temperature_data = snapshot_cache.get_or_fetch(AIR_TEMPERATURE_URL, None, lambda: _fetch_air_temperature({}), AIR_TEMPERATURE_TTL)
+        index = get_weather_index(forecast_data, temperature_data)
+        has_point = latitude is not None and longitude is not None
+        island_wide = not location or location.strip().lower() in ISLAND_WIDE
+        area = None if island_wide or has_point else index.find_area(location)
+
+        result = {
+            "location": location,
+            "forecast_timestamp": index.forecast_timestamp,
+            "forecast_valid_period": index.valid_period,
+            "temperature_timestamp": index.temperature_timestamp,
+            "unit_used": unit,
+        }
+        if has_point:
+            i, distance_m = index.nearest_area(float(latitude), float(longitude))
+            result.update(index.area(i))
+            result["area_distance_m"] = round(distance_m)
+        elif area is not None:
+            result.update(index.area(area))
+        else:
+            result.update(index.summary())
+            if not island_wide:
+                result["note"] = (f"'{location}' is not a forecast area; showing island-wide weather. "
+                                  f"Pass latitude/longitude for the nearest area.")
+
+        if unit == "fahrenheit":
+            _to_fahrenheit(result)
+        print(f"TOOL SERVER: Responding with weather for {result.get('area', 'Singapore')}.")
+        return result
+    except AmbiguousArea as ambiguous:
+        print(f"TOOL SERVER: {ambiguous}")
+        return {"error": "AmbiguousLocation", "message": f"{ambiguous} Ask which one, or pass latitude/longitude.",
+                "candidates": ambiguous.candidates}
+    except requests.exceptions.HTTPError as http_err:
+        response = http_err.response
+        error_message = f"HTTP error occurred: {http_err} - {response.text if response is not None else 'No response body'}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "HTTPError", "message": str(http_err), "details": response.text if response is not None else "No response body"}
+    except requests.exceptions.RequestException as req_err:
+        error_message = f"Request error occurred: {req_err}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "RequestException", "message": str(req_err)}
+    except (KeyError, IndexError) as data_err:
+        error_message = f"Unexpected response format: {data_err}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "InvalidResponse", "message": "Weather response has no items."}
+    except ValueError as json_err: # Includes JSONDecodeError
+        error_message = f"JSON decoding error: {json_err}"
+        print(f"TOOL SERVER: {error_message}")
+        return {"error": "JSONDecodeError", "message": "Failed to parse JSON response from API."}
+
+
+def _to_fahrenheit(result: dict):
+    """Converts the temperature fields of a weather result in place."""
+    convert = lambda c: round(c * 9 / 5 + 32, 1)
+    temperature = result.pop("temperature_c", None)
+    if isinstance(temperature, dict):
+        result["temperature_f"] = {k: (convert(v) if k != "stations" else v) for k, v in temperature.items()}
+    elif temperature is not None:
+        result["temperature_f"] = convert(temperature)
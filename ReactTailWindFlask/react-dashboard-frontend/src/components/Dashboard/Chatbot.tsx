@@ -8,9 +8,26 @@ import TypingDiv from './TypingDiv';
 
 interface ChatEntry {
     role: 'user' | 'bot';
-    text: string
+    text: string;
+    streamed?: boolean
 }
 
+// Parses the server-sent event frames of /gemini-response/stream
+const parseEvents = (buffer: string) => {
+    const frames = buffer.split('\n\n');
+    const rest = frames.pop() ?? '';
+    const events = frames.map((frame) => {
+        let event = 'message';
+        let data = '';
+        for (const line of frame.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        return { event, data: data ? JSON.parse(data) : {} };
+    });
+    return { events, rest };
+};
+
 
 const Chatbot = () => {
     //state to control which component to display
@@ -20,12 +37,16 @@ const Chatbot = () => {
     // const [response, setResponse] = useState("");
     const [chatHistory, setChatHistory] = useState<ChatEntry[]>([]);
     const [loading, setLoading] = useState(false);
+    const [streamingText, setStreamingText] = useState('');
+    const [toolStatus, setToolStatus] = useState('');
+    // Server-side chat session, so follow-up questions keep the conversation's context
+    const [sessionId, setSessionId] = useState<string | null>(null);
 
     
     useEffect(() => {
         const fetchHistory = async () => {
             try {
-                const res = await fetch ('http://localhost:5000/supabase-info');
+                const res = await fetch ('http://localhost:5000/chat-history?limit=50');
                 const data = await res.json()
                 setChatHistory(data.history)
             } catch (error) {
@@ -46,20 +67,39 @@ const Chatbot = () => {
         setLoading(true);
 
         try {
-            const res = await fetch('http://localhost:5000/gemini-response', {
+            const res = await fetch('http://localhost:5000/gemini-response/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({text}),
+                body: JSON.stringify({text, session_id: sessionId}),
             });
-            if (!res.ok) {
+            if (!res.ok || !res.body) {
                 throw new Error('Network response was not ok');
             }
-            const data = await res.json();
-            // setResult(true);
-            // setResponse(data.result);
-            setChatHistory([...newHistory, { role: "bot", text: data.result }]);
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let partial = '';
+            let finalText: string | null = null;
+            while (finalText === null) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const { events, rest } = parseEvents(buffer);
+                buffer = rest;
+                for (const { event, data } of events) {
+                    if (event === 'start' && data.session_id) setSessionId(data.session_id);
+                    else if (event === 'tool_start') setToolStatus(`Calling ${data.name}...`);
+                    else if (event === 'tool_end') setToolStatus('');
+                    else if (event === 'token') {
+                        partial += data.text;
+                        setStreamingText(partial);
+                    } else if (event === 'done') finalText = data.result;
+                    else if (event === 'error') throw new Error(data.message);
+                }
+            }
+            setChatHistory([...newHistory, { role: "bot", text: finalText ?? partial, streamed: true }]);
         } catch (error) {
             // setResult(true);
             console.error('Error fetching response',error);
@@ -67,6 +107,8 @@ const Chatbot = () => {
             // setResponse('An error occurred while contacting the server');
         } finally {
             setLoading(false);
+            setStreamingText('');
+            setToolStatus('');
         }
     }
 
@@ -79,11 +121,15 @@ const Chatbot = () => {
              {chatHistory.map((entry, index) =>
           entry.role === 'user' ? (
             <Chatbox key={index} text={entry.text} />
+          ) : entry.streamed ? (
+            <div key={index} className="text-xl font-mono text-gray-800 ">{entry.text}</div>
           ) : (
             <TypingDiv key={index} text={entry.text} typingSpeed={20} />
           )
         )}
-        {loading && <Loading />}
+        {loading && streamingText && <div className="text-xl font-mono text-gray-800 ">{streamingText}</div>}
+        {loading && toolStatus && <div className="text-sm font-mono text-gray-500">{toolStatus}</div>}
+        {loading && !streamingText && <Loading />}
         </div>
         {chatHistory.length === 0 && !loading && <Introduction />}
         {/* {!showNewComponent && <Introduction></Introduction>} */}